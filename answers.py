@@ -0,0 +1,131 @@
+"""Reading the model's answers: cleanup, validation and numbered replies
+
+clean_translation strips the artifacts models add around a translation,
+validate_translation rejects answers that are empty, echoed or still in the
+source language, and the split_* / parse_* helpers take apart answers that
+number their segments, list several candidates or cover several targets.
+"""
+import re
+import json
+
+
+class TranslationValidationError(Exception):
+    """The model answered, but the answer is not a usable translation"""
+
+    def __init__(self, message, translated_text):
+        super().__init__(message)
+        self.translated_text = translated_text
+
+
+MARKER_PATTERN = re.compile(r'<<\s*/?\s*(?:INPUT|OUTPUT)\s*>>', re.IGNORECASE)
+PREAMBLE_PATTERN = re.compile(
+    r'^\s*(?:(?:here\s+is|here\'s|sure[,!]?\s+here\s+is)\s+(?:the|your|my)\s+(?:casual\s+|informal\s+)?'
+    r'translation[^:\n]*:|translation\s*:|tradução\s*:)\s*',
+    re.IGNORECASE
+)
+TRAILING_NOTE_PATTERN = re.compile(r'\n\s*\(?\s*(?:note|nota)\s*:.*\Z', re.IGNORECASE | re.DOTALL)
+QUOTE_PAIRS = {'"': '"', "'": "'", "\u201c": "\u201d", "\u00ab": "\u00bb", "`": "`"}
+
+
+# Numbers the alternatives in an n-best answer: <<1>> first translation <<2>> second ...
+CANDIDATE_MARKER_PATTERN = re.compile(r'<<\s*\d+\s*>>')
+
+
+def candidate_instruction(count):
+    return (f"For the next input, write {count} different translations, best first. Start each one "
+            f"with its number in double angle brackets (<<1>>, <<2>>, ...) and write nothing else.")
+
+
+def split_candidates(answer):
+    """Split a numbered n-best answer; an answer without numbers is a single candidate
+
+    Anything before the first number is a preamble ("Here are 3 options:")
+    and is dropped.
+    """
+    pieces = CANDIDATE_MARKER_PATTERN.split(answer)
+    if len(pieces) > 1:
+        pieces = pieces[1:]
+    pieces = [piece.strip() for piece in pieces]
+    return [piece for piece in pieces if piece] or [answer]
+
+
+# Numbers each segment of a batched request: <<1>> first segment, <<2>> second ...
+SEGMENT_NUMBER_PATTERN = re.compile(r'<<\s*(\d+)\s*>>')
+
+
+def number_segments(segments):
+    return "\n".join(f"<<{i + 1}>> {segment}" for i, segment in enumerate(segments))
+
+
+def split_numbered_segments(answer, count):
+    """{index: translation} for the numbered segments found in an answer"""
+    pieces = SEGMENT_NUMBER_PATTERN.split(answer)
+    found = {}
+    for number, text in zip(pieces[1::2], pieces[2::2]):
+        index = int(number) - 1
+        text = text.strip()
+        if 0 <= index < count and text and index not in found:
+            found[index] = text
+    return found
+
+
+def clean_translation(source_text, translated_text):
+    """Strip known model artifacts from a translation; returns (text, repaired)"""
+    cleaned = MARKER_PATTERN.sub("", translated_text)
+    cleaned = PREAMBLE_PATTERN.sub("", cleaned, count=1)
+    if "note" not in source_text.lower() and "nota" not in source_text.lower():
+        cleaned = TRAILING_NOTE_PATTERN.sub("", cleaned)
+    cleaned = cleaned.strip()
+
+    # Drop quotes wrapped around the whole answer unless the source was quoted too
+    source = source_text.strip()
+    while len(cleaned) >= 2 and QUOTE_PAIRS.get(cleaned[0]) == cleaned[-1] and not (
+            source and source[0] == cleaned[0]):
+        cleaned = cleaned[1:-1].strip()
+
+    return cleaned, cleaned != translated_text.strip()
+
+
+def validate_translation(source_text, translated_text, source_lang, target_lang, detect=None):
+    """Raise TranslationValidationError if the answer is empty, an echo or still in the source language
+
+    detect(text) returns a language code or None; without it the language
+    is not checked.
+    """
+    if not translated_text:
+        raise TranslationValidationError("Empty translation", translated_text)
+
+    source_normalized = " ".join(source_text.split()).casefold()
+    letters = sum(1 for ch in source_normalized if ch.isalpha())
+    # Short messages ("gg", names, emoji) legitimately come back unchanged
+    if letters < 20 or len(source_normalized.split()) < 3:
+        return
+
+    if " ".join(translated_text.split()).casefold() == source_normalized:
+        raise TranslationValidationError("Model echoed the source text", translated_text)
+
+    if detect is None:
+        return
+    output_lang = detect(translated_text)
+    expected_source = source_lang if source_lang != "auto" else detect(source_text)
+    if output_lang and output_lang != target_lang and output_lang == expected_source:
+        raise TranslationValidationError(
+            f"Translation is still in the source language ({output_lang})", translated_text
+        )
+
+
+def parse_fan_out_answer(answer, targets):
+    """{target: translation} from a fan-out answer; targets that are missing or not text are left out"""
+    start, end = answer.find("{"), answer.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        translations = json.loads(answer[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(translations, dict):
+        return {}
+    return {
+        target: translations[target] for target in targets
+        if isinstance(translations.get(target), str) and translations[target].strip()
+    }
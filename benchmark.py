@@ -0,0 +1,378 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import statistics
+import threading
+import tracemalloc
+import http.server
+
+import requests
+
+import main
+from main import TranslationThread, FanOutTranslationThread
+from config import default_config
+from chunking import split_chunks, chunk_budget, estimate_tokens
+from formatting import protect_formatting, restore_formatting
+from memory import FuzzyIndex
+from keys import ApiKeyPool
+from concurrency import AdaptiveConcurrencyLimiter
+
+WORDS = [
+    "bom", "dia", "pessoal", "galera", "vamos", "jogar", "hoje", "amanhã", "servidor",
+    "partida", "alguém", "quer", "time", "ranked", "agora", "depois", "noite", "valeu",
+    "obrigado", "mano", "beleza", "tudo", "certo", "evento", "começa", "às", "horas",
+    "regras", "canal", "voz", "mensagem", "novo", "patch", "atualização", "bug", "mapa"
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def random_sentence(generator):
+    return " ".join(generator.choice(WORDS) for _ in range(generator.randint(4, 12)))
+
+
+def perturb(sentence, generator):
+    """Apply the kind of noise that defeats an exact cache"""
+    choice = generator.randrange(5)
+    if choice == 0:
+        return sentence + "!!"
+    if choice == 1:
+        return sentence.upper()
+    if choice == 2:
+        return sentence + " 😄"
+    if choice == 3:
+        return sentence.replace(" ", "  ", 1)
+    position = generator.randrange(len(sentence))
+    return sentence[:position] + generator.choice("abcdefghijklmnopqrstuvwxyz") + sentence[position + 1:]
+
+
+def benchmark_fuzzy_index(entries=100000, queries=2000, threshold=0.6):
+    """Measure recall and lookup latency of the fuzzy translation index"""
+    print(f"=== Fuzzy Index ({entries} entries, {queries} queries) ===")
+    generator = random.Random(42)
+    sentences = list({random_sentence(generator) for _ in range(entries)})
+
+    start = time.perf_counter()
+    index = FuzzyIndex(max_entries=len(sentences))
+    for i, sentence in enumerate(sentences):
+        index.add(sentence, f"translation {i}", "pt", "en")
+    build_seconds = time.perf_counter() - start
+
+    # Tracing allocations is slow, so measure memory on a sample build
+    sample_size = min(len(sentences), 10000)
+    tracemalloc.start()
+    sample_index = FuzzyIndex(max_entries=sample_size)
+    for i, sentence in enumerate(sentences[:sample_size]):
+        sample_index.add(sentence, f"translation {i}", "pt", "en")
+    bytes_per_entry = tracemalloc.get_traced_memory()[0] / sample_size
+    tracemalloc.stop()
+    del sample_index
+
+    found = 0
+    latencies = []
+    for _ in range(queries):
+        target = generator.randrange(len(sentences))
+        query = perturb(sentences[target], generator)
+        start = time.perf_counter()
+        match = index.lookup(query, "pt", "en", threshold)
+        latencies.append(time.perf_counter() - start)
+        if match and match[2] == f"translation {target}":
+            found += 1
+
+    print(f"Build time: {build_seconds:.2f} s ({len(sentences) / build_seconds:.0f} entries/s)")
+    print(f"Memory: {bytes_per_entry:.0f} bytes/entry "
+          f"(~{bytes_per_entry * len(sentences) / 1024 / 1024:.1f} MB for this index)")
+    print(f"Recall at similarity {threshold}: {found / queries:.1%}")
+    print(f"Lookup latency: p50 {percentile(latencies, 0.5) * 1000:.3f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms")
+    print()
+
+
+class MockLatencyThread(TranslationThread):
+    """Translation thread whose API call is a sleep proportional to the chunk size"""
+
+    def _try_translation(self, text, examples=None, candidates=1):
+        time.sleep(0.2 + estimate_tokens(text) * 0.002)
+        return text.upper()
+
+
+def benchmark_chunking(size_kb=50, workers=4):
+    """Compare parallel chunk translation of a long input against serial translation"""
+    print(f"=== Chunked Translation ({size_kb} KB input) ===")
+    generator = random.Random(7)
+    paragraphs = []
+    while sum(len(p) + 2 for p in paragraphs) < size_kb * 1024:
+        lines = [random_sentence(generator).capitalize() + "." for _ in range(generator.randint(1, 6))]
+        paragraphs.append("\n".join(lines))
+    text = "\n\n".join(paragraphs)
+
+    api_config = dict(default_config()["api"], model="llama3-70b-8192", max_parallel_chunks=workers)
+    chunks, _ = split_chunks(text, chunk_budget(api_config))
+    print(f"Input: {len(text)} chars, ~{estimate_tokens(text)} tokens, {len(chunks)} chunks "
+          f"of at most {chunk_budget(api_config)} tokens")
+
+    results = {}
+    for label, parallel in (("serial", 1), ("parallel", workers)):
+        thread = MockLatencyThread(text, "pt", "en", dict(api_config, max_parallel_chunks=parallel))
+        start = time.perf_counter()
+        translated = thread.translate_chunked(text)
+        results[label] = time.perf_counter() - start
+        assert translated.count("\n") == text.count("\n"), "line breaks were not preserved"
+        print(f"{label.capitalize()}: {results[label]:.2f} s ({len(text) / 1024 / results[label]:.1f} KB/s)")
+
+    print(f"Speedup: {results['serial'] / results['parallel']:.1f}x with {workers} workers")
+    print()
+
+
+DISCORD_MESSAGE = (
+    "Hey <@123456789> and <@&987654321>, **patch notes** are up: https://example.com/notes?v=2 :tada:\n"
+    "Check `config.json` before <t:1700000000:R> <:pog:1122334455> ||no spoilers||\n"
+    "```py\nprint('hello')\n```\n"
+)
+
+
+def benchmark_formatting(sizes_kb=(1, 10, 100, 1000), repeats=5):
+    """Show that formatting protection and restoration scale linearly with message size"""
+    print("=== Formatting Protection ===")
+    for size_kb in sizes_kb:
+        text = DISCORD_MESSAGE * max(1, size_kb * 1024 // len(DISCORD_MESSAGE))
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            masked, spans = protect_formatting(text)
+            restored = restore_formatting(masked, spans)
+            timings.append(time.perf_counter() - start)
+        assert restored == text, "round trip changed the message"
+        best = min(timings)
+        print(f"{len(text) / 1024:7.0f} KB: {best * 1000:8.2f} ms ({len(text) / 1024 / 1024 / best:.1f} MB/s), "
+              f"{len(spans)} spans, {len(text) - len(masked)} chars kept from the model")
+    print()
+
+
+def benchmark_key_pool(key_counts=(1, 2, 4), requests_per_minute=120, seconds=3, workers=16):
+    """Show that throughput grows with the number of API keys in the pool"""
+    print(f"=== API Key Pool ({requests_per_minute} requests/minute per key, {seconds} s) ===")
+    baseline = None
+    for count in key_counts:
+        pool = ApiKeyPool([f"gsk_benchmark_{i:04d}" for i in range(count)], requests_per_minute)
+        for state in pool.keys:
+            # Start with empty buckets so the burst allowance doesn't hide the sustained rate
+            state.limiter.tokens = 0
+        completed = []
+        deadline = time.perf_counter() + seconds
+
+        def worker():
+            while time.perf_counter() < deadline:
+                state = pool.acquire()
+                if time.perf_counter() >= deadline:
+                    pool.release(state, 200)
+                    break
+                time.sleep(0.05)  # simulated API latency
+                pool.release(state, 200)
+                completed.append(state.label)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        rate = len(completed) / seconds
+        baseline = baseline or rate
+        spread = ", ".join(f"{label} {completed.count(label)}" for label in sorted(set(completed)))
+        print(f"{count} key{'s' if count > 1 else ' '}: {rate:6.1f} requests/s ({rate / baseline:.1f}x)  [{spread}]")
+    print()
+
+
+class CapacityLimitedHandler(http.server.BaseHTTPRequestHandler):
+    """Mock API that serves `capacity` requests at once, queues a few more and throttles the rest"""
+
+    protocol_version = "HTTP/1.1"
+    capacity = 8
+    queue_size = 8
+    service_time = 0.05
+    slots = threading.BoundedSemaphore(capacity)
+    waiting = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        cls = type(self)
+        with cls.lock:
+            if cls.waiting >= cls.capacity + cls.queue_size:
+                status = 429
+            else:
+                cls.waiting += 1
+                status = 200
+        if status == 200:
+            with cls.slots:
+                time.sleep(cls.service_time)
+            with cls.lock:
+                cls.waiting -= 1
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def benchmark_concurrency(seconds=4, clients=48):
+    """Compare the adaptive concurrency limit against fixed limits on a capacity-limited mock API"""
+    handler = CapacityLimitedHandler
+    print(f"=== Adaptive Concurrency (mock API: {handler.capacity} concurrent, "
+          f"{handler.queue_size} queued, {handler.service_time * 1000:.0f} ms each; {clients} clients) ===")
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+
+    setups = [(f"fixed {limit}", AdaptiveConcurrencyLimiter(limit, limit, limit)) for limit in (2, 8, 32)]
+    setups.append(("adaptive", AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64)))
+    for label, limiter in setups:
+        results = []
+        deadline = time.perf_counter() + seconds
+
+        def client():
+            session = requests.Session()
+            while time.perf_counter() < deadline:
+                queued = time.perf_counter()
+                limiter.acquire()
+                started = time.perf_counter()
+                status = session.post(url, json={"messages": []}, timeout=10).status_code
+                latency = time.perf_counter() - started
+                limiter.release(latency, dropped=status == 429)
+                results.append((status, latency, time.perf_counter() - queued))
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ok = [latency for status, latency, _ in results if status == 200]
+        waits = [total - latency for _, latency, total in results]
+        throttled = len(results) - len(ok)
+        print(f"{label:>9}: {len(ok) / seconds:6.1f} ok/s, {throttled / seconds:6.1f} throttled/s, "
+              f"API p50 {percentile(ok, 0.5) * 1000:4.0f} ms / p99 {percentile(ok, 0.99) * 1000:4.0f} ms, "
+              f"client queue p99 {percentile(waits, 0.99) * 1000:5.0f} ms, final limit {int(limiter.limit)}")
+    server.shutdown()
+    print()
+
+
+ANNOUNCEMENT = (
+    "Galera, o evento de hoje começa às nove da noite no canal de voz. Tragam os amigos, "
+    "vamos jogar partidas ranqueadas e depois tem sorteio de prêmios para quem ficar até o final!"
+)
+
+# Canned answers in each language, long enough to pass language validation
+CANNED_TRANSLATIONS = {
+    "en": "Guys, today's event starts at nine tonight in the voice channel. Bring your friends, "
+          "we'll play ranked matches and then there's a prize draw for whoever stays until the end!",
+    "pt": "Pessoal, o evento de hoje começa às nove da noite no canal de voz. Chamem os amigos, "
+          "vamos jogar ranqueada e depois tem sorteio de prêmios pra quem ficar até o fim!",
+    "ru": "Ребята, сегодняшнее событие начнётся в девять вечера в голосовом канале. Зовите друзей, "
+          "сыграем рейтинговые матчи, а потом будет розыгрыш призов для тех, кто останется до конца!",
+    "es": "Chicos, el evento de hoy empieza a las nueve de la noche en el canal de voz. Traigan a sus amigos, "
+          "jugaremos partidas clasificatorias y luego hay sorteo de premios para quien se quede hasta el final!",
+}
+
+
+class FanOutMockHandler(http.server.BaseHTTPRequestHandler):
+    """Mock chat API answering fan-out prompts, with latency that grows with the answer length"""
+
+    protocol_version = "HTTP/1.1"
+    base_latency = 0.15
+    seconds_per_token = 0.002
+    prompt_tokens = 0
+    completion_tokens = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        targets = re.findall(r"\((\w\w)\)", request["messages"][0]["content"])
+        answer = json.dumps({target: CANNED_TRANSLATIONS[target] for target in targets}, ensure_ascii=False)
+        usage = {
+            "prompt_tokens": sum(estimate_tokens(message["content"]) for message in request["messages"]),
+            "completion_tokens": estimate_tokens(answer),
+        }
+        cls = type(self)
+        with cls.lock:
+            cls.prompt_tokens += usage["prompt_tokens"]
+            cls.completion_tokens += usage["completion_tokens"]
+        time.sleep(cls.base_latency + usage["completion_tokens"] * cls.seconds_per_token)
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": answer}}], "usage": usage}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def benchmark_fan_out(targets=("en", "pt", "ru", "es"), rounds=5):
+    """Compare one fan-out request for all target languages against one request per language"""
+    handler = FanOutMockHandler
+    print(f"=== Multi-Target Fan-Out ({len(targets)} languages, mock API: {handler.base_latency * 1000:.0f} ms "
+          f"+ {handler.seconds_per_token * 1000:.0f} ms per output token) ===")
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    chat_url = main.GROQ_CHAT_URL
+    main.GROQ_CHAT_URL = f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+    os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark")
+    api_config = dict(default_config()["api"], model="llama3-70b-8192", request_timeout=10)
+
+    def translate(target_groups):
+        results = {}
+        for group in target_groups:
+            thread = FanOutTranslationThread(ANNOUNCEMENT, "auto", group, api_config)
+            thread.run()
+            results.update(thread.results)
+        assert not any(text.startswith("Translation error:") for text in results.values()), results
+        return results
+
+    try:
+        translate([targets])  # warm up the connection and language detection
+        modes = {}
+        for label, groups in (("sequential", [[target] for target in targets]), ("fan-out", [list(targets)])):
+            handler.prompt_tokens = handler.completion_tokens = 0
+            timings = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                translate(groups)
+                timings.append(time.perf_counter() - start)
+            modes[label] = (statistics.median(timings), handler.prompt_tokens / rounds, handler.completion_tokens / rounds)
+            print(f"{label:>10}: {len(groups)} request{'s' if len(groups) > 1 else ' '}, "
+                  f"median {modes[label][0] * 1000:5.0f} ms, "
+                  f"{modes[label][1]:.0f} prompt + {modes[label][2]:.0f} completion tokens per message")
+    finally:
+        main.GROQ_CHAT_URL = chat_url
+        server.shutdown()
+    sequential, fan_out = modes["sequential"], modes["fan-out"]
+    print(f"Fan-out is {sequential[0] / fan_out[0]:.1f}x faster and uses "
+          f"{1 - (fan_out[1] + fan_out[2]) / (sequential[1] + sequential[2]):.0%} fewer tokens")
+    print()
+
+
+BENCHMARKS = {
+    "fuzzy": benchmark_fuzzy_index,
+    "chunking": benchmark_chunking,
+    "formatting": benchmark_formatting,
+    "keys": benchmark_key_pool,
+    "concurrency": benchmark_concurrency,
+    "fanout": benchmark_fan_out,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
@@ -2,39 +2,40 @@ import os
 import subprocess
 import sys
 import shutil
+import json
+import time
+import zlib
+import marshal
+import argparse
+import statistics
 
-def build_executable():
-    """Build the executable with PyInstaller."""
-    print("Building AI Translator for Discord...")
-    
-    # Check if PyInstaller is installed
-    try:
-        import PyInstaller
-    except ImportError:
-        print("PyInstaller not found. Installing...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
-    
-    # Create a simple icon file if it doesn't exist
-    if not os.path.exists("icon.ico"):
-        print("Creating a placeholder icon...")
-        try:
-            subprocess.check_call([sys.executable, "create_icon.py"])
-        except Exception as e:
-            print(f"Warning: Could not create icon: {e}")
-            # Create an empty file as fallback
-            with open("icon.ico", "wb") as f:
-                pass
-    
-    # Generate sound files if they don't exist
-    if not os.path.exists("sounds/start.wav") or not os.path.exists("sounds/complete.wav"):
-        print("Generating sound files...")
-        try:
-            subprocess.check_call([sys.executable, "generate_sounds.py"])
-        except Exception as e:
-            print(f"Warning: Could not generate sound files: {e}")
-    
-    # Create a spec file for PyInstaller
-    spec_content = """
+APP_NAME = "AITranslatorForDiscord"
+LANGDETECT_PROFILES = "langdetect_profiles.bin"
+
+# Modules the translator never imports; PyInstaller would otherwise follow them
+# from PyQt5, PIL and the standard library
+EXCLUDES = [
+    'PyQt5.QtNetwork', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtQuickWidgets', 'PyQt5.QtSql',
+    'PyQt5.QtWebEngine', 'PyQt5.QtWebEngineCore', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtWebChannel',
+    'PyQt5.QtWebSockets', 'PyQt5.QtMultimedia', 'PyQt5.QtMultimediaWidgets', 'PyQt5.QtBluetooth',
+    'PyQt5.QtNfc', 'PyQt5.QtPositioning', 'PyQt5.QtLocation', 'PyQt5.QtSensors', 'PyQt5.QtSerialPort',
+    'PyQt5.QtOpenGL', 'PyQt5.QtPrintSupport', 'PyQt5.QtSvg', 'PyQt5.QtTest', 'PyQt5.QtXml',
+    'PyQt5.QtXmlPatterns', 'PyQt5.QtDesigner', 'PyQt5.QtHelp', 'PyQt5.Qt3DCore', 'PyQt5.QtDBus',
+    'tkinter', 'unittest', 'pydoc', 'doctest', 'lib2to3', 'xmlrpc', 'numpy', 'matplotlib',
+]
+
+# Qt plugin folders the app needs; every other plugin DLL is left out
+QT_PLUGINS = ('platforms', 'styles', 'imageformats')
+QT_IMAGE_FORMATS = ('qico',)
+
+PROFILES = {
+    "onefile": "single UPX-compressed .exe, unpacked to a temp folder on every launch",
+    "fast": "folder build with a trimmed bundle; starts without unpacking",
+}
+
+
+def onefile_spec():
+    return """
 # -*- mode: python ; coding: utf-8 -*-
 
 block_cipher = None
@@ -44,7 +45,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('icon.ico', '.'), ('sounds', 'sounds'), ('config.json', '.')],
-    hiddenimports=['win32api', 'win32con', 'win32gui', 'win32clipboard', 'playsound', 'keyboard', 'PyQt5.QtWidgets', 'PyQt5.QtCore', 'PyQt5.QtGui'],
+    hiddenimports=['engine', 'instance', 'sender', 'win32api', 'win32con', 'win32gui', 'win32clipboard', 'playsound', 'keyboard', 'PyQt5.QtWidgets', 'PyQt5.QtCore', 'PyQt5.QtGui'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -80,6 +81,179 @@ exe = EXE(
     uac_admin=True,
 )
     """
+
+
+def fast_spec():
+    """Onedir build: nothing is unpacked at launch, so startup is just loading the DLLs"""
+    return """
+# -*- mode: python ; coding: utf-8 -*-
+import os
+
+EXCLUDES = %(excludes)r
+QT_PLUGINS = %(plugins)r
+QT_IMAGE_FORMATS = %(image_formats)r
+
+
+def keep_binary(dest):
+    parts = dest.replace('\\\\', '/').split('/')
+    if 'plugins' not in parts[:-2]:
+        return True
+    folder = parts[parts.index('plugins') + 1]
+    if folder == 'imageformats':
+        return os.path.splitext(parts[-1])[0] in QT_IMAGE_FORMATS
+    return folder in QT_PLUGINS
+
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('icon.ico', '.'), ('sounds', 'sounds'), ('config.json', '.'), (%(langdetect)r, '.')],
+    hiddenimports=['engine', 'instance', 'sender'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=EXCLUDES,
+    noarchive=False,
+    # Byte-compile with -OO so the bundle carries no docstrings
+    optimize=2,
+)
+a.binaries = [entry for entry in a.binaries if keep_binary(entry[0])]
+# langdetect's JSON profiles are replaced by the packed file above
+a.datas = [entry for entry in a.datas if not entry[0].replace('\\\\', '/').startswith('langdetect/profiles')]
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='AITranslatorForDiscord',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon='icon.ico',
+    uac_admin=True,
+)
+# UPX-compressed DLLs have to be decompressed in memory on every launch
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='AITranslatorForDiscord',
+)
+    """ % {
+        "excludes": EXCLUDES,
+        "plugins": QT_PLUGINS,
+        "image_formats": QT_IMAGE_FORMATS,
+        "langdetect": LANGDETECT_PROFILES,
+    }
+
+
+def pack_langdetect_profiles(path=LANGDETECT_PROFILES):
+    """Serialize langdetect's language profiles into one compressed file (see engine.load_langdetect_profiles)"""
+    import langdetect
+    directory = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+    profiles = []
+    json_size = 0
+    for name in sorted(os.listdir(directory)):
+        profile_path = os.path.join(directory, name)
+        json_size += os.path.getsize(profile_path)
+        with open(profile_path, encoding="utf-8") as f:
+            profiles.append(json.load(f))
+    with open(path, "wb") as f:
+        f.write(zlib.compress(marshal.dumps(profiles), 9))
+    print(f"Packed {len(profiles)} langdetect profiles: {json_size / 1024:.0f} KB of JSON -> "
+          f"{os.path.getsize(path) / 1024:.0f} KB")
+
+
+def output_path(profile):
+    if profile == "fast":
+        return os.path.join("dist", APP_NAME, f"{APP_NAME}.exe")
+    return os.path.join("dist", f"{APP_NAME}.exe")
+
+
+def bundle_report(profile):
+    """Print the size of the build and its largest files"""
+    root = os.path.join("dist", APP_NAME) if profile == "fast" else output_path(profile)
+    if os.path.isfile(root):
+        files = [(os.path.getsize(root), os.path.basename(root))]
+    else:
+        files = []
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                files.append((os.path.getsize(path), os.path.relpath(path, root)))
+    total = sum(size for size, _ in files)
+    print(f"\nBundle size: {total / 1024 / 1024:.1f} MB in {len(files)} file(s)")
+    for size, name in sorted(files, reverse=True)[:10]:
+        print(f"  {size / 1024 / 1024:7.2f} MB  {name}")
+    return total
+
+
+def startup_report(profile, runs=5):
+    """Time launches of the built app up to the end of its imports (main.py --startup-probe)"""
+    executable = os.path.abspath(output_path(profile))
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            subprocess.run([executable, "--startup-probe"], timeout=120, check=True)
+        except (OSError, subprocess.SubprocessError) as e:
+            # The exe asks for elevation, so this needs an administrator prompt
+            print(f"\nStartup time: could not launch the build ({e})")
+            return None
+        timings.append(time.perf_counter() - start)
+    print(f"\nStartup time to imports done ({runs} launches): first {timings[0] * 1000:.0f} ms, "
+          f"median {statistics.median(timings) * 1000:.0f} ms, best {min(timings) * 1000:.0f} ms")
+    return timings
+
+
+def build_executable(profile="onefile", report=True):
+    """Build the executable with PyInstaller."""
+    print(f"Building AI Translator for Discord ({profile}: {PROFILES[profile]})...")
+    
+    # Check if PyInstaller is installed
+    try:
+        import PyInstaller
+    except ImportError:
+        print("PyInstaller not found. Installing...")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
+    
+    # Create a simple icon file if it doesn't exist
+    if not os.path.exists("icon.ico"):
+        print("Creating a placeholder icon...")
+        try:
+            subprocess.check_call([sys.executable, "create_icon.py"])
+        except Exception as e:
+            print(f"Warning: Could not create icon: {e}")
+            # Create an empty file as fallback
+            with open("icon.ico", "wb") as f:
+                pass
+    
+    # Generate sound files if they don't exist
+    if not os.path.exists("sounds/start.wav") or not os.path.exists("sounds/complete.wav"):
+        print("Generating sound files...")
+        try:
+            subprocess.check_call([sys.executable, "generate_sounds.py"])
+        except Exception as e:
+            print(f"Warning: Could not generate sound files: {e}")
+    
+    # Create a spec file for PyInstaller
+    if profile == "fast":
+        pack_langdetect_profiles()
+        spec_content = fast_spec()
+    else:
+        spec_content = onefile_spec()
     
     with open("translator.spec", "w") as f:
         f.write(spec_content)
@@ -90,11 +264,16 @@ exe = EXE(
         subprocess.check_call([
             "pyinstaller",
             "--clean",
+            "--noconfirm",
             "translator.spec"
         ])
         
         print("\nBuild complete! The executable is in the 'dist' folder.")
-        print("You can now run 'dist/AITranslatorForDiscord.exe'")
+        print(f"You can now run '{output_path(profile)}'")
+        
+        if report:
+            bundle_report(profile)
+            startup_report(profile)
         
         # Create a shortcut to the executable on the desktop
         try:
@@ -104,8 +283,8 @@ exe = EXE(
             
             shell = win32com.client.Dispatch("WScript.Shell")
             shortcut = shell.CreateShortCut(shortcut_path)
-            shortcut.Targetpath = os.path.abspath("dist/AITranslatorForDiscord.exe")
-            shortcut.WorkingDirectory = os.path.abspath("dist")
+            shortcut.Targetpath = os.path.abspath(output_path(profile))
+            shortcut.WorkingDirectory = os.path.abspath(os.path.dirname(output_path(profile)))
             shortcut.IconLocation = os.path.abspath("icon.ico")
             shortcut.save()
             
@@ -120,4 +299,9 @@ exe = EXE(
     return True
 
 if __name__ == "__main__":
-    build_executable() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the AI Translator for Discord executable")
+    parser.add_argument("--profile", choices=list(PROFILES), default="onefile",
+                        help="; ".join(f"{name}: {description}" for name, description in PROFILES.items()))
+    parser.add_argument("--no-report", action="store_true", help="skip the bundle size and startup time report")
+    options = parser.parse_args()
+    build_executable(options.profile, report=not options.no_report)
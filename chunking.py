@@ -0,0 +1,101 @@
+"""Token estimates and splitting long inputs into request-sized pieces
+
+split_segments cuts text at sentence ends and line breaks for the
+translation memory; split_chunks packs text into chunks under a token budget
+so long messages can be translated in parallel and stitched back exactly.
+"""
+import re
+
+
+def estimate_tokens(text):
+    """Rough token count for Llama-style tokenizers (about 4 characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+# Split after sentence-ending punctuation or at line breaks, keeping the separators
+SEGMENT_SPLIT_PATTERN = re.compile(r'((?<=[.!?\u2026])[ \t]+|\s*\n\s*)')
+
+
+def split_segments(text):
+    """Split text into [segment, separator, segment, ...] so it can be reassembled exactly"""
+    return SEGMENT_SPLIT_PATTERN.split(text)
+
+
+# Context windows of the Groq models we use, in tokens
+MODEL_CONTEXT_WINDOWS = {
+    "llama3-70b-8192": 8192,
+    "llama3-8b-8192": 8192,
+    "mixtral-8x7b-32768": 32768,
+    "gemma-7b-it": 8192,
+}
+
+# Paragraph breaks, then line breaks, are the preferred places to cut long inputs
+PARAGRAPH_SPLIT_PATTERN = re.compile(r'(\n[ \t]*\n\s*)')
+LINE_SPLIT_PATTERN = re.compile(r'(\n)')
+WORD_SPLIT_PATTERN = re.compile(r'(\s+)')
+
+
+def model_context_window(model):
+    return MODEL_CONTEXT_WINDOWS.get(model, 8192)
+
+
+def chunk_budget(api_config):
+    """Maximum input tokens per request, leaving room for the prompt and the translation"""
+    context_budget = (model_context_window(api_config["model"]) - 512) // 3
+    return max(64, min(api_config.get("chunk_tokens", 1500), context_budget))
+
+
+def split_chunks(text, max_tokens):
+    """Split text into chunks under max_tokens at paragraph, line, sentence or word boundaries
+
+    Returns (chunks, separators) where separators[i] is the exact text between
+    chunks[i] and chunks[i + 1], so the translation can be stitched back with
+    the original line breaks.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text], []
+
+    # Break the text into [piece, separator, piece, ...] fine enough that every piece fits
+    parts = [text]
+    for splitter in (PARAGRAPH_SPLIT_PATTERN.split, LINE_SPLIT_PATTERN.split, split_segments, WORD_SPLIT_PATTERN.split):
+        refined = []
+        for i, part in enumerate(parts):
+            if i % 2 == 0 and estimate_tokens(part) > max_tokens:
+                refined.extend(splitter(part))
+            else:
+                refined.append(part)
+        # Adjacent separators from nested splits must stay in [piece, separator] order
+        parts = []
+        for i, part in enumerate(refined):
+            if parts and (len(parts) % 2 == 0) != (i % 2 == 0):
+                parts[-1] += part
+            else:
+                parts.append(part)
+
+    # Hard-split any single word that is still too long
+    max_chars = max_tokens * 4
+    refined = []
+    for i, part in enumerate(parts):
+        if i % 2 == 0 and len(part) > max_chars:
+            for start in range(0, len(part), max_chars):
+                if start:
+                    refined.append("")
+                refined.append(part[start:start + max_chars])
+        else:
+            refined.append(part)
+    parts = refined
+
+    # Greedily pack pieces into chunks
+    chunks = []
+    separators = []
+    current = parts[0]
+    for i in range(1, len(parts) - 1, 2):
+        separator, piece = parts[i], parts[i + 1]
+        if estimate_tokens(current + separator + piece) <= max_tokens:
+            current += separator + piece
+        else:
+            chunks.append(current)
+            separators.append(separator)
+            current = piece
+    chunks.append(current)
+    return chunks, separators
@@ -0,0 +1,174 @@
+"""Health tracking and a circuit breaker for the translation endpoint
+
+CircuitBreaker fails requests fast while the endpoint is down instead of
+letting every translation sit through its own timeouts and retries, and
+lets a single probe through to find out when it has recovered.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+import requests
+
+from metrics import METRICS
+
+logger = logging.getLogger("AITranslator.circuit")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint that is known to be failing"""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"{endpoint} is unavailable, not retrying for {retry_in:.0f} s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class APIError(Exception):
+    """Non-200 answer from the translation API"""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_connectivity_error(error):
+    """True if a translation failed because the API could not be reached or is down"""
+    if isinstance(error, APIError):
+        return error.status_code >= 500 or error.status_code == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, CircuitOpenError))
+
+
+class EndpointHealth:
+    """Rolling error rate and latency of one endpoint over a time window"""
+
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self.outcomes = deque()  # (timestamp, ok, latency)
+
+    def record(self, ok, latency):
+        now = time.monotonic()
+        self.outcomes.append((now, ok, latency))
+        while self.outcomes and self.outcomes[0][0] < now - self.window_seconds:
+            self.outcomes.popleft()
+
+    def snapshot(self):
+        """(requests, error rate, median latency) for the current window"""
+        cutoff = time.monotonic() - self.window_seconds
+        recent = [(ok, latency) for timestamp, ok, latency in self.outcomes if timestamp >= cutoff]
+        if not recent:
+            return 0, 0.0, 0.0
+        latencies = sorted(latency for _, latency in recent)
+        errors = sum(1 for ok, _ in recent if not ok)
+        return len(recent), errors / len(recent), latencies[len(latencies) // 2]
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker in front of an API endpoint
+
+    Closed: requests flow and outcomes feed the rolling health window. The
+    breaker opens when the window's error rate reaches error_rate (after
+    min_requests) or after consecutive_failures in a row. Open: requests fail
+    immediately with CircuitOpenError until open_seconds have passed. Half
+    open: a single probe request is let through; success closes the breaker,
+    failure opens it again for twice as long (up to max_open_seconds).
+    Listeners are called with (endpoint, old state, new state) from the
+    thread that caused the transition.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, endpoint, config=None):
+        config = config or {}
+        self.endpoint = endpoint
+        self.error_rate = config.get("error_rate", 0.5)
+        self.min_requests = config.get("min_requests", 5)
+        self.consecutive_failures = config.get("consecutive_failures", 3)
+        self.base_open_seconds = config.get("open_seconds", 30)
+        self.max_open_seconds = config.get("max_open_seconds", 300)
+        self.health = EndpointHealth(config.get("window_seconds", 60))
+        self.state = self.CLOSED
+        self.failures_in_row = 0
+        self.open_seconds = self.base_open_seconds
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.listeners = []
+        self.lock = threading.Lock()
+        METRICS.gauge(
+            "circuit_open", "1 while the endpoint's circuit breaker is open or half-open", {"endpoint": endpoint},
+            callback=lambda: int(self.state != self.CLOSED)
+        )
+
+    def allow(self):
+        """Return if a request may be sent now, otherwise raise CircuitOpenError"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            retry_in = self.opened_at + self.open_seconds - time.monotonic()
+            if self.state == self.OPEN and retry_in <= 0:
+                self.transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                logger.info("Sending probe request to %s", self.endpoint)
+                return
+            METRICS.counter("circuit_rejected_total", "Requests failed fast by an open circuit", {"endpoint": self.endpoint}).inc()
+            raise CircuitOpenError(self.endpoint, max(retry_in, 0))
+
+    def release_probe(self):
+        """Give back the probe slot of a request that was never sent"""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record_success(self, latency):
+        with self.lock:
+            self.health.record(True, latency)
+            self.failures_in_row = 0
+            if self.state != self.CLOSED:
+                self.open_seconds = self.base_open_seconds
+                self.transition(self.CLOSED)
+                # Start the error rate afresh so failures from the outage can't reopen the circuit
+                self.health.outcomes.clear()
+
+    def record_failure(self, latency):
+        with self.lock:
+            self.health.record(False, latency)
+            self.failures_in_row += 1
+            if self.state == self.HALF_OPEN:
+                self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+                self.transition(self.OPEN)
+            elif self.state == self.CLOSED:
+                requests_seen, error_rate, _ = self.health.snapshot()
+                if (self.failures_in_row >= self.consecutive_failures
+                        or (requests_seen >= self.min_requests and error_rate >= self.error_rate)):
+                    self.transition(self.OPEN)
+
+    def transition(self, state):
+        """Change state; callers hold the lock"""
+        old_state, self.state = self.state, state
+        self.probe_in_flight = False
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+        requests_seen, error_rate, latency = self.health.snapshot()
+        logger.warning(
+            "Circuit for %s %s -> %s (%d requests, %.0f%% errors, p50 %.0f ms in the last %d s)",
+            self.endpoint, old_state, state, requests_seen, 100 * error_rate, 1000 * latency, self.health.window_seconds
+        )
+        METRICS.counter("circuit_transitions_total", "Circuit breaker state changes", {"endpoint": self.endpoint, "to": state}).inc()
+        for listener in self.listeners:
+            listener(self.endpoint, old_state, state)
+
+    def describe(self):
+        """One-line status for the tray tooltip"""
+        with self.lock:
+            requests_seen, error_rate, latency = self.health.snapshot()
+            if self.state == self.OPEN:
+                retry_in = max(0, self.opened_at + self.open_seconds - time.monotonic())
+                return f"{self.endpoint}: unavailable, retrying in {retry_in:.0f} s"
+            if self.state == self.HALF_OPEN:
+                return f"{self.endpoint}: checking if it recovered"
+        if not requests_seen:
+            return f"{self.endpoint}: OK"
+        return f"{self.endpoint}: OK ({100 * error_rate:.0f}% errors, {1000 * latency:.0f} ms typical)"
@@ -0,0 +1,86 @@
+"""Adaptive (AIMD) limit on the number of API requests in flight"""
+import time
+import logging
+import threading
+from collections import deque
+
+from metrics import METRICS
+
+logger = logging.getLogger("AITranslator.concurrency")
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent API requests, in the style of TCP congestion control
+
+    Each successful request that used at least half the limit grows it by
+    1/limit, i.e. about one slot per round of requests. A request that was
+    throttled or timed out halves the limit; one that took longer than
+    latency_tolerance times the median recent latency cuts it by 10%. (The
+    median, not the minimum: after one unusually fast response most normal
+    ones would count as spikes and the limit would sink to min_limit.) Latencies
+    are divided by a per-request cost so long texts don't look like spikes.
+    Callers beyond the limit wait in acquire(); that wait is the queueing
+    delay reported in concurrency_queue_seconds.
+    """
+
+    DROP_BACKOFF = 0.5
+    LATENCY_BACKOFF = 0.9
+    LATENCY_WINDOW = 50
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=32, latency_tolerance=2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.recent_latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.condition = threading.Condition()
+        # Tickets keep waiters first-come first-served
+        self.next_ticket = 0
+        self.serving = 0
+
+    def register_metrics(self):
+        METRICS.gauge("concurrency_limit", "Current adaptive limit on concurrent API requests", callback=lambda: int(self.limit))
+        METRICS.gauge("api_in_flight", "API requests currently in flight", callback=lambda: self.in_flight)
+
+    def acquire(self):
+        """Wait for a free slot"""
+        started = time.perf_counter()
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while ticket != self.serving or self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.serving += 1
+            self.in_flight += 1
+            self.condition.notify_all()
+        METRICS.histogram("concurrency_queue_seconds", "Time requests waited for a concurrency slot").observe(
+            time.perf_counter() - started
+        )
+
+    def baseline_latency(self):
+        """p50 of the recent per-unit latencies"""
+        ordered = sorted(self.recent_latencies)
+        return ordered[len(ordered) // 2]
+
+    def release(self, latency, dropped=False, cost=1.0):
+        """Free a slot and adapt the limit; dropped means throttled, timed out or failed server-side"""
+        if latency is not None:
+            latency /= cost
+        with self.condition:
+            old_limit = int(self.limit)
+            saturated = self.in_flight * 2 >= self.limit
+            self.in_flight -= 1
+            if dropped:
+                self.limit = max(self.min_limit, self.limit * self.DROP_BACKOFF)
+            elif latency is not None:
+                baseline = self.baseline_latency() if self.recent_latencies else latency
+                self.recent_latencies.append(latency)
+                if latency > baseline * self.latency_tolerance:
+                    self.limit = max(self.min_limit, self.limit * self.LATENCY_BACKOFF)
+                elif saturated:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+        if int(self.limit) != old_limit:
+            logger.debug("Concurrency limit %d -> %d (%s)", old_limit, int(self.limit),
+                         "dropped" if dropped else f"{latency * 1000:.0f} ms per unit")
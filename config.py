@@ -0,0 +1,337 @@
+"""Configuration defaults and the store that loads, validates and saves them
+
+ConfigStore needs only the standard library; ConfigService in main.py wraps
+it to announce changes as a Qt signal and poll the file from a QTimer.
+"""
+import os
+import copy
+import json
+import time
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger("AITranslator.config")
+
+
+def default_config():
+    """Return a fresh copy of the built-in configuration"""
+    return {
+        "api": {
+            "provider": "groq",
+            "api_key": os.getenv("GROQ_API_KEY", ""),  # Get API key from environment
+            "model": "llama3-70b-8192",
+            "requests_per_minute": 30,
+            "chunk_tokens": 1500,
+            "max_parallel_chunks": 4,
+            "few_shot": True,
+            "request_timeout": 20,
+            "key_file": "api_keys.txt",
+            # Translations per request kept for "Translate Again"; each extra one adds a full
+            # translation's worth of output tokens, so this is opt-in
+            "candidates": 1,
+            # "prompt" asks for a numbered list, "n" uses the API's n parameter where supported
+            "candidates_mode": "prompt"
+        },
+        "engine": {
+            "worker_process": True,
+            "call_timeout": 60
+        },
+        "usage": {
+            "enabled": True,
+            "path": "usage.db",
+            "user": "",
+            "daily_token_budget": 0,
+            "degrade_at": 0.8,
+            "cheaper_model": "llama3-8b-8192",
+            "flush_seconds": 10
+        },
+        "concurrency": {
+            "adaptive": True,
+            "initial_limit": 4,
+            "min_limit": 1,
+            "max_limit": 32,
+            "latency_tolerance": 2.0
+        },
+        "circuit_breaker": {
+            "error_rate": 0.5,
+            "min_requests": 5,
+            "consecutive_failures": 3,
+            "window_seconds": 60,
+            "open_seconds": 30,
+            "max_open_seconds": 300
+        },
+        "shortcuts": {
+            "translate_and_send": "ctrl+alt+t",
+            "translate_selected": "ctrl+alt+r",
+            # Translates the selection into every fan_out target language at once
+            "translate_fan_out": "ctrl+alt+m"
+        },
+        "sounds": {
+            "enable_sounds": True,
+            "translation_start": "sounds/start.wav",
+            "translation_complete": "sounds/complete.wav"
+        },
+        "ui": {
+            "notification_duration": 5000,
+            "default_send_pair": "English to Portuguese",
+            "default_receive_pair": "Portuguese to English"
+        },
+        "fan_out": {
+            "source": "auto",
+            # Language codes, see LANGUAGE_NAMES in main.py
+            "targets": ["en", "pt", "ru", "es"]
+        },
+        "glossary": {
+            "enabled": True,
+            "case_sensitive": False,
+            "do_not_translate": [],
+            "terms": {},
+            "file": "glossary.json"
+        },
+        "translation_memory": {
+            "enabled": True,
+            "path": "translation_memory.db",
+            "fuzzy": {
+                "enabled": True,
+                "example_threshold": 0.6,
+                "max_entries": 20000
+            }
+        },
+        "outbox": {
+            "enabled": True,
+            "path": "outbox.db",
+            "max_concurrent": 2,
+            "retry_seconds": 30
+        },
+        "speculative": {
+            "enabled": False,
+            "idle_delay_ms": 1200,
+            "min_chars": 8,
+            "max_per_hour": 30
+        },
+        "metrics": {
+            "http_enabled": False,
+            "http_port": 9464
+        },
+        "profiling": {
+            "stall_detector": False,
+            "stall_threshold_ms": 50,
+            "sample_seconds": 10,
+            "sample_interval_ms": 5
+        }
+    }
+
+
+class ConfigStore:
+    """In-memory configuration with debounced atomic saves and hot reload
+
+    Values are checked against the types of the built-in defaults when
+    loaded, so every key of a built-in section is always present. Section
+    dicts are updated in place, so components holding a section (e.g.
+    config["api"]) always see current values. Writes are batched on a
+    background thread and land atomically (temp file + rename). Edits made
+    to the file by hand are picked up by check_for_external_changes() and
+    passed to each of listeners as the set of (section, key) pairs that
+    changed.
+    """
+
+    SAVE_DELAY = 0.5
+
+    def __init__(self, path="config.json"):
+        self.path = path
+        self.config = default_config()
+        # Called with the set of changed (section, key) pairs
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.save_deadline = None
+        self.stopping = False
+        self.last_written = None
+        self.last_mtime = None
+
+        self.writer = threading.Thread(target=self.writer_loop, name="ConfigWriter", daemon=True)
+        self.writer.start()
+
+    @classmethod
+    def coerce(cls, value, default, name):
+        """Return value if it matches the type of default, otherwise default"""
+        if isinstance(default, dict):
+            if not isinstance(value, dict):
+                logger.warning("Config %s should be an object, using default", name)
+                return copy.deepcopy(default)
+            merged = copy.deepcopy(default)
+            for key, item in value.items():
+                if key in default:
+                    merged[key] = cls.coerce(item, default[key], f"{name}.{key}")
+                else:
+                    merged[key] = item
+            return merged
+        if isinstance(default, bool):
+            if isinstance(value, bool):
+                return value
+        elif isinstance(default, int):
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+        elif isinstance(default, float):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return float(value)
+        elif isinstance(default, str):
+            if isinstance(value, str):
+                return value
+        elif isinstance(default, list):
+            if isinstance(value, list):
+                return value
+        else:
+            return value
+        logger.warning("Config %s has an invalid value %r, using default %r", name, value, default)
+        return default
+
+    def read_file(self):
+        """Return the validated config from disk (without the API key), or None if missing"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            content = f.read()
+        self.last_mtime = os.stat(self.path).st_mtime
+        self.last_written = content
+        existing_config = json.loads(content.decode("utf-8"))
+
+        loaded = default_config()
+        for section, values in existing_config.items():
+            if section in loaded:
+                loaded[section] = self.coerce(values, loaded[section], section)
+            else:
+                loaded[section] = values
+        # The API key always comes from the environment
+        loaded["api"]["api_key"] = os.getenv("GROQ_API_KEY", "")
+        return loaded
+
+    def load(self):
+        logger.info("Loading configuration")
+        try:
+            loaded = self.read_file()
+        except Exception as e:
+            logger.warning("Could not load config.json: %s. Using default configuration.", e)
+            return
+        if loaded is None:
+            # First start: write the defaults so users have a file to edit
+            self.schedule_save()
+        else:
+            self.apply(loaded)
+        logger.info("Configuration loaded successfully")
+
+    def apply(self, new_config):
+        """Update sections in place and return the set of changed (section, key) pairs"""
+        changes = set()
+        with self.lock:
+            for section, values in new_config.items():
+                current = self.config.setdefault(section, {})
+                if not isinstance(values, dict) or not isinstance(current, dict):
+                    if current != values:
+                        self.config[section] = values
+                        changes.add((section, None))
+                    continue
+                for key, value in values.items():
+                    if current.get(key) != value:
+                        current[key] = value
+                        changes.add((section, key))
+        return changes
+
+    def set(self, section, key, value):
+        self.update({section: {key: value}})
+
+    def update(self, values):
+        """Apply {section: {key: value}} changes, notify subscribers and schedule a save"""
+        changes = self.apply(values)
+        if changes:
+            self.schedule_save()
+            self.notify(changes)
+
+    def notify(self, changes):
+        for listener in self.listeners:
+            listener(changes)
+
+    def schedule_save(self):
+        with self.condition:
+            self.save_deadline = time.monotonic() + self.SAVE_DELAY
+            self.condition.notify()
+
+    def snapshot(self):
+        """Serialized config without the API key"""
+        with self.lock:
+            saved = copy.deepcopy(self.config)
+        saved["api"]["api_key"] = ""
+        return json.dumps(saved, indent=4).encode("utf-8")
+
+    def write_atomically(self, content):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def writer_loop(self):
+        while True:
+            with self.condition:
+                while self.save_deadline is None and not self.stopping:
+                    self.condition.wait()
+                if self.save_deadline is None and self.stopping:
+                    return
+                # Keep waiting while changes keep arriving
+                remaining = self.save_deadline - time.monotonic()
+                if remaining > 0 and not self.stopping:
+                    self.condition.wait(remaining)
+                    continue
+                self.save_deadline = None
+            self.save_now()
+
+    def save_now(self):
+        try:
+            content = self.snapshot()
+            if content == self.last_written:
+                return
+            self.write_atomically(content)
+            self.last_written = content
+            self.last_mtime = os.stat(self.path).st_mtime
+            logger.info("Configuration saved successfully")
+        except Exception as e:
+            logger.error("Failed to save configuration: %s", e)
+
+    def flush(self):
+        """Write pending changes and stop the writer thread (call on exit)"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.writer.join(timeout=5)
+
+    def check_for_external_changes(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self.last_mtime:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                content = f.read()
+            if content == self.last_written:
+                self.last_mtime = mtime
+                return
+            loaded = self.read_file()
+        except Exception as e:
+            # Probably caught mid-edit; try again on the next tick
+            logger.warning("Could not reload config.json: %s", e)
+            return
+
+        changes = self.apply(loaded)
+        if changes:
+            logger.info("Reloaded configuration from disk: %s", sorted(str(c) for c in changes))
+            self.notify(changes)
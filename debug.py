@@ -5,6 +5,13 @@ import subprocess
 import json
 import keyboard
 import ctypes
+import random
+import shutil
+import tempfile
+import threading
+import time
+import http.server
+from datetime import datetime
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon
 
 def check_system():
@@ -144,6 +151,361 @@ def check_admin_privileges():
         print(f"✗ Error checking admin privileges: {e}")
     print()
 
+def request_profile(seconds=10):
+    """Ask the running application to record a sampling profile."""
+    print("=== Requesting Profile ===")
+    with open("profile.request", "w") as f:
+        json.dump({"seconds": seconds}, f)
+    print(f"Requested a {seconds} s profile; the running translator picks it up within a second.")
+    print("Reproduce the slow action now. The profile is written to the 'profiles' folder")
+    print("as collapsed stacks (open it with speedscope.app or flamegraph.pl).")
+    print("Set profiling.stall_detector in config.json to log UI stalls over 50 ms with their stack.")
+    print()
+
+# Performance report
+
+STARTUP_SCRIPT = r"""
+import json, os, shutil, sys, tempfile, time
+phases = {}
+def phase(name, start):
+    phases[name] = round((time.perf_counter() - start) * 1000, 2)
+for module in ("PyQt5.QtWidgets", "requests", "keyboard", "pyperclip", "langdetect", "playsound", "win32api"):
+    start = time.perf_counter()
+    try:
+        __import__(module)
+    except Exception:
+        pass
+    phase("import " + module, start)
+start = time.perf_counter()
+import main
+phase("import main (remaining modules, logging, dotenv)", start)
+start = time.perf_counter()
+app = main.QApplication(sys.argv)
+phase("create QApplication", start)
+workdir = tempfile.mkdtemp()
+if os.path.exists("config.json"):
+    shutil.copy("config.json", workdir)
+start = time.perf_counter()
+service = main.ConfigService(os.path.join(workdir, "config.json"))
+service.load()
+phase("load config", start)
+config = service.config
+start = time.perf_counter()
+if config["glossary"]["enabled"]:
+    main.Glossary.from_config(config["glossary"])
+phase("build glossary", start)
+start = time.perf_counter()
+if config["translation_memory"]["enabled"] and os.path.exists(config["translation_memory"]["path"]):
+    shutil.copy(config["translation_memory"]["path"], workdir)
+    main.TranslationMemory(os.path.join(workdir, os.path.basename(config["translation_memory"]["path"])),
+                           config["translation_memory"].get("fuzzy"))
+phase("open translation memory", start)
+print(json.dumps(phases))
+"""
+
+MOCK_RESPONSE = json.dumps({
+    "choices": [{"message": {"role": "assistant", "content": "Good morning everyone"}}],
+    "usage": {"prompt_tokens": 120, "completion_tokens": 5}
+}).encode()
+
+
+class MockApiHandler(http.server.BaseHTTPRequestHandler):
+    """Answers every request with a canned chat completion"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond()
+
+    def respond(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(MOCK_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(MOCK_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def summarize(seconds):
+    """Latency summary in milliseconds"""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {"n": 0}
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p50_ms": pick(0.5),
+        "p90_ms": pick(0.9),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def process_memory_bytes():
+    """Resident memory of this process, or None if it can't be read"""
+    if sys.platform == "win32":
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def synthetic_messages(count, seed=1):
+    words = ["bom", "dia", "pessoal", "vamos", "jogar", "hoje", "servidor", "partida", "alguém",
+             "quer", "ranked", "agora", "depois", "noite", "valeu", "evento", "começa", "mapa", "patch"]
+    generator = random.Random(seed)
+    return [" ".join(generator.choice(words) for _ in range(generator.randint(4, 16))) for _ in range(count)]
+
+
+def measure_startup():
+    """Import and startup phase timings, measured in a fresh interpreter"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    interpreter = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, timeout=120)
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "startup failed")
+    return {
+        "interpreter_ms": round(interpreter * 1000, 2),
+        "total_ms": round(total * 1000, 2),
+        "phases_ms": json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+
+def latency_probe_payload():
+    """The smallest chat completion the translator could send: one short message, a few output tokens"""
+    model = "llama3-70b-8192"
+    try:
+        with open("config.json", "r") as f:
+            model = json.load(f).get("api", {}).get("model", model)
+    except (OSError, ValueError):
+        pass
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": "<<INPUT>>Bom dia<<OUTPUT>>"}],
+        "temperature": 0,
+        "max_tokens": 8,
+    }
+
+
+def measure_api_latency(requests_count=5):
+    """Chat completion round trips to the Groq API, or to a local mock server when offline or without a key"""
+    import requests
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    api_key = os.getenv("GROQ_API_KEY")
+    server = None
+    target = "groq"
+    url = "https://api.groq.com/openai/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}"}
+    payload = latency_probe_payload()
+    if api_key:
+        try:
+            requests.post(url, headers=headers, json=payload, timeout=10).raise_for_status()
+        except requests.RequestException:
+            api_key = None
+    if not api_key:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MockApiHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        target = "local mock"
+        url = f"http://127.0.0.1:{server.server_address[1]}/openai/v1/chat/completions"
+        headers = {}
+
+    try:
+        session = requests.Session()
+        start = time.perf_counter()
+        status = session.post(url, headers=headers, json=payload, timeout=10).status_code
+        first = time.perf_counter() - start
+        samples = []
+        for _ in range(requests_count):
+            start = time.perf_counter()
+            session.post(url, headers=headers, json=payload, timeout=10)
+            samples.append(time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.shutdown()
+    return {"target": target, "status": status, "first_request_ms": round(first * 1000, 3),
+            "reused_connection": summarize(samples)}
+
+
+def measure_clipboard(rounds=20):
+    """Time from copying text until the clipboard returns it"""
+    import pyperclip
+    original = pyperclip.paste()
+    samples = []
+    try:
+        for i in range(rounds):
+            marker = f"ai-translator-clipboard-test-{i}-{time.time()}"
+            start = time.perf_counter()
+            pyperclip.copy(marker)
+            while pyperclip.paste() != marker:
+                if time.perf_counter() - start > 1:
+                    raise RuntimeError("clipboard did not return the copied text within 1 s")
+            samples.append(time.perf_counter() - start)
+    finally:
+        pyperclip.copy(original)
+    return summarize(samples)
+
+
+def measure_sounds():
+    """Decode time of the bundled sounds and how long playback blocks"""
+    import wave
+    from playsound import playsound
+    results = {}
+    for path in ("sounds/start.wav", "sounds/complete.wav"):
+        if not os.path.exists(path):
+            results[path] = {"error": "missing"}
+            continue
+        start = time.perf_counter()
+        with wave.open(path, "rb") as f:
+            frames = f.readframes(f.getnframes())
+            duration = f.getnframes() / f.getframerate()
+        decode = time.perf_counter() - start
+        start = time.perf_counter()
+        playsound(path)
+        play = time.perf_counter() - start
+        results[path] = {"bytes": len(frames), "duration_ms": round(duration * 1000, 1),
+                         "decode_ms": round(decode * 1000, 3), "play_blocking_ms": round(play * 1000, 1)}
+    return results
+
+
+def measure_history(entries=2000, queries=("vamos", "ranked agora", "zzz")):
+    """Build the message history widgets and time adding, searching and their memory cost"""
+    import main
+    app = QApplication.instance() or QApplication(sys.argv)
+    from PyQt5.QtWidgets import QListWidget, QListWidgetItem
+    messages = synthetic_messages(entries)
+
+    # Same steps as MainWindow.add_message and MainWindow.filter_messages, without the window
+    before = process_memory_bytes()
+    history = QListWidget()
+    samples = []
+    for i, text in enumerate(messages):
+        start = time.perf_counter()
+        widget = main.MessageItem(text, i % 2 == 0)
+        item = QListWidgetItem()
+        item.setSizeHint(widget.sizeHint())
+        history.addItem(item)
+        history.setItemWidget(item, widget)
+        samples.append(time.perf_counter() - start)
+    app.processEvents()
+    after = process_memory_bytes()
+
+    search = {}
+    for query in queries:
+        start = time.perf_counter()
+        for i in range(history.count()):
+            item = history.item(i)
+            item.setHidden(query not in history.itemWidget(item).message_label.text().lower())
+        search[query] = round((time.perf_counter() - start) * 1000, 3)
+
+    return {
+        "entries": entries,
+        "add_message": summarize(samples),
+        "search_ms": search,
+        "memory_bytes_per_entry": round((after - before) / entries) if before and after else None,
+    }
+
+
+def measure_translation_memory(entries=20000, lookups=2000):
+    """Store and lookup speed of the translation memory on a throwaway database"""
+    import main
+    workdir = tempfile.mkdtemp()
+    try:
+        messages = synthetic_messages(entries, seed=2)
+        tm = main.TranslationMemory(os.path.join(workdir, "bench.db"), {"enabled": True, "max_entries": entries})
+        start = time.perf_counter()
+        for i in range(0, entries, 100):
+            tm.store([(text, text.upper()) for text in messages[i:i + 100]], "pt", "en")
+        store = time.perf_counter() - start
+
+        tm.start_fuzzy_index()
+        tm.fuzzy_ready.wait()
+        generator = random.Random(3)
+        exact, fuzzy = [], []
+        for _ in range(lookups):
+            text = generator.choice(messages)
+            start = time.perf_counter()
+            tm.lookup(text, "pt", "en")
+            exact.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            tm.similar_example(text + "!!", "pt", "en")
+            fuzzy.append(time.perf_counter() - start)
+        tm.connection.close()
+        return {
+            "entries": entries,
+            "store_per_entry_ms": round(store / entries * 1000, 4),
+            "exact_lookup": summarize(exact),
+            "similar_example_lookup": summarize(fuzzy),
+            "database_bytes": os.path.getsize(os.path.join(workdir, "bench.db")),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+PERFORMANCE_CHECKS = [
+    ("startup", measure_startup),
+    ("api_latency", measure_api_latency),
+    ("clipboard", measure_clipboard),
+    ("sounds", measure_sounds),
+    ("history", measure_history),
+    ("translation_memory", measure_translation_memory),
+]
+
+
+def run_performance_report(output_path="performance_report.json"):
+    """Run all performance measurements and write them as JSON."""
+    print("=== Performance Report ===")
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "system": {
+            "os": f"{platform.system()} {platform.release()} ({platform.version()})",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+    }
+    # Importing main sets up logging; keep the probes' log lines out of the real log
+    os.environ["LOG_FILE"] = os.path.join(tempfile.mkdtemp(), "translator_debug.log")
+    for name, check in PERFORMANCE_CHECKS:
+        print(f"Measuring {name}...")
+        start = time.perf_counter()
+        try:
+            report[name] = check()
+        except Exception as e:
+            report[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"✗ {name} failed: {e}")
+        report[name]["elapsed_s"] = round(time.perf_counter() - start, 2)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✓ Report written to {os.path.abspath(output_path)}")
+    print("Attach this file to bug reports about slow translations or a laggy window.")
+    print()
+    return report
+
 def run_diagnostics():
     """Run all diagnostic checks."""
     print("=== AI Translator for Discord Diagnostics ===")
@@ -162,4 +524,9 @@ def run_diagnostics():
     print("You can also try running the application with administrator privileges.")
 
 if __name__ == "__main__":
-    run_diagnostics() 
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile":
+        request_profile(float(sys.argv[2]) if len(sys.argv) > 2 else 10)
+    elif len(sys.argv) > 1 and sys.argv[1] == "--perf":
+        run_performance_report(*sys.argv[2:3])
+    else:
+        run_diagnostics() 
\ No newline at end of file
@@ -0,0 +1,419 @@
+"""Worker process for the parts of the translator that block or burn CPU
+
+HTTP requests (and parsing their JSON), language detection and OCR run in a
+child process so they can't hold the GIL while the Qt UI and the keyboard
+hook need it. The UI process talks to it through EngineClient over the
+child's stdin/stdout: every message is a pickled dict in a frame prefixed by
+its 4-byte length. Payloads above SHARED_MEMORY_THRESHOLD travel through a
+shared memory block instead, and only the block's name goes through the pipe.
+
+The child is restarted when it dies. While it is down (or when the worker is
+disabled) calls run in-process, so callers never need to care.
+
+Run directly (python engine.py) to start a worker on stdin/stdout.
+"""
+import sys
+import os
+import io
+import pickle
+import struct
+import subprocess
+import threading
+import time
+import logging
+import itertools
+import marshal
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import requests
+from langdetect import detect, DetectorFactory
+
+logger = logging.getLogger("AITranslator.engine")
+
+HEADER = struct.Struct("<I")
+SHARED_MEMORY_THRESHOLD = 256 * 1024
+
+# Make langdetect deterministic; its profiles are loaded lazily and not thread-safe
+DetectorFactory.seed = 0
+LANGDETECT_LOCK = threading.Lock()
+# Written by build.py: all language profiles in one compressed file instead of 55 JSON files
+LANGDETECT_PROFILES = "langdetect_profiles.bin"
+
+
+class EngineError(RuntimeError):
+    """An engine operation failed for a reason other than the network"""
+
+
+class EngineCrashedError(EngineError):
+    """The worker process died while the call was in progress"""
+
+
+# Operations, also used in-process when the worker isn't running
+
+def load_langdetect_profiles():
+    """Give langdetect its profiles from the packed file if the build shipped one
+
+    Without it langdetect reads and parses its JSON profiles on first use.
+    Call with LANGDETECT_LOCK held.
+    """
+    from langdetect import detector_factory
+    from langdetect.utils.lang_profile import LangProfile
+    if detector_factory._factory is not None:
+        return
+    path = os.path.join(getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__))), LANGDETECT_PROFILES)
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        profiles = marshal.loads(zlib.decompress(f.read()))
+    factory = DetectorFactory()
+    for index, profile in enumerate(profiles):
+        factory.add_profile(LangProfile(**profile), index, len(profiles))
+    detector_factory._factory = factory
+
+
+def detect_language(text):
+    try:
+        with LANGDETECT_LOCK:
+            load_langdetect_profiles()
+            return detect(text)
+    except Exception:
+        return None
+
+
+def ocr(bbox=None):
+    """Text in a screen region, None if OCR isn't available"""
+    try:
+        import pytesseract
+        from PIL import ImageGrab
+        screenshot = ImageGrab.grab(bbox=bbox)
+        return pytesseract.image_to_string(screenshot).strip()
+    except Exception:
+        return None
+
+
+def post_json(url, headers, payload, timeout):
+    """POST payload as JSON; the answer is returned as plain data"""
+    response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+    try:
+        body = response.json() if response.status_code == 200 else None
+    except ValueError:
+        body = None
+    return {
+        "status_code": response.status_code,
+        "headers": {key.lower(): value for key, value in response.headers.items()},
+        "text": response.text if body is None else "",
+        "json": body,
+    }
+
+
+OPERATIONS = {
+    "ping": lambda: "pong",
+    "detect": detect_language,
+    "ocr": ocr,
+    "post": post_json,
+}
+
+
+def run_operation(op, kwargs):
+    return OPERATIONS[op](**kwargs)
+
+
+def describe_error(error):
+    """(kind, message) that the other side turns back into an exception"""
+    if isinstance(error, requests.Timeout):
+        return "timeout", str(error)
+    if isinstance(error, requests.ConnectionError):
+        return "connection", str(error)
+    return "error", f"{type(error).__name__}: {error}"
+
+
+def raise_error(kind, message):
+    if kind == "timeout":
+        raise requests.Timeout(message)
+    if kind == "connection":
+        raise requests.ConnectionError(message)
+    if kind == "crashed":
+        raise EngineCrashedError(message)
+    raise EngineError(message)
+
+
+class EngineResponse:
+    """The parts of requests.Response that the translator uses"""
+
+    def __init__(self, result):
+        self.status_code = result["status_code"]
+        self.headers = result["headers"]
+        self.text = result["text"]
+        self._json = result["json"]
+
+    def json(self):
+        if self._json is None:
+            raise ValueError("Response has no JSON body")
+        return self._json
+
+
+# Framing
+
+def open_shared_memory(name):
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # Only the creator may unlink; stop this process's tracker from doing it at exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+class Channel:
+    """Length-prefixed pickled messages over a pair of byte streams
+
+    Large messages are copied into a shared memory block that the sender
+    keeps alive until the receiver answers with a release message.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.write_lock = threading.Lock()
+        self.shared_blocks = {}
+
+    def send(self, message):
+        data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > SHARED_MEMORY_THRESHOLD:
+            from multiprocessing import shared_memory
+            block = shared_memory.SharedMemory(create=True, size=len(data))
+            block.buf[:len(data)] = data
+            self.shared_blocks[block.name] = block
+            data = pickle.dumps({"shared_memory": block.name, "size": len(data)})
+        self.write_frame(data)
+
+    def write_frame(self, data):
+        with self.write_lock:
+            self.writer.write(HEADER.pack(len(data)))
+            self.writer.write(data)
+            self.writer.flush()
+
+    def read_exact(self, size):
+        chunks = []
+        while size:
+            chunk = self.reader.read(size)
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def receive(self):
+        """Next message, or None when the other side has closed the channel"""
+        while True:
+            header = self.read_exact(HEADER.size)
+            if header is None:
+                return None
+            data = self.read_exact(HEADER.unpack(header)[0])
+            if data is None:
+                return None
+            message = pickle.loads(data)
+            if "release" in message:
+                self.release(message["release"])
+                continue
+            if "shared_memory" in message:
+                block = open_shared_memory(message["shared_memory"])
+                data = bytes(block.buf[:message["size"]])
+                block.close()
+                self.write_frame(pickle.dumps({"release": message["shared_memory"]}))
+                message = pickle.loads(data)
+            return message
+
+    def release(self, name):
+        block = self.shared_blocks.pop(name, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        for name in list(self.shared_blocks):
+            self.release(name)
+
+
+# Worker side
+
+def serve():
+    """Answer requests on stdin/stdout until the parent closes the pipe"""
+    channel = Channel(sys.stdin.buffer, sys.stdout.buffer)
+    # Anything printed by libraries must not corrupt the channel
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(levelname)s %(message)s")
+    logger.info("Engine worker %d started", os.getpid())
+
+    def handle(message):
+        try:
+            reply = {"id": message["id"], "result": run_operation(message["op"], message["kwargs"])}
+        except Exception as e:
+            reply = {"id": message["id"], "error": describe_error(e)}
+        channel.send(reply)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        while True:
+            message = channel.receive()
+            if message is None:
+                break
+            pool.submit(handle, message)
+    channel.close()
+    return 0
+
+
+# UI side
+
+class EngineClient:
+    """Runs operations in a supervised worker process
+
+    call() is thread-safe; replies are matched to callers by request id so
+    many calls can be in flight at once. If the worker dies, pending calls
+    fail with EngineCrashedError and it is restarted with backoff; after
+    max_restarts crashes within a minute the client gives up and runs
+    everything in-process.
+    """
+
+    RESTART_WINDOW = 60
+
+    def __init__(self, call_timeout=60, max_restarts=5):
+        self.call_timeout = call_timeout
+        self.max_restarts = max_restarts
+        self.process = None
+        self.channel = None
+        self.pending = {}
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.stopping = False
+        self.crash_times = []
+        self.restarts = 0
+
+    @property
+    def running(self):
+        return self.channel is not None
+
+    @staticmethod
+    def command():
+        if getattr(sys, "frozen", False):
+            # The bundled executable starts the worker when given this flag
+            return [sys.executable, "--engine-worker"]
+        return [sys.executable, os.path.abspath(__file__)]
+
+    def start(self):
+        self.stopping = False
+        process = subprocess.Popen(
+            self.command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+        channel = Channel(process.stdout, process.stdin)
+        with self.lock:
+            self.process = process
+            self.channel = channel
+        threading.Thread(target=self.read_replies, args=(process, channel), name="EngineReader", daemon=True).start()
+        threading.Thread(target=self.forward_log, args=(process,), name="EngineLog", daemon=True).start()
+        logger.info("Started engine worker process %d", process.pid)
+
+    def stop(self):
+        self.stopping = True
+        with self.lock:
+            process, channel = self.process, self.channel
+            self.process = self.channel = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=3)
+        except Exception:
+            process.kill()
+        channel.close()
+
+    def call(self, op, wait=None, **kwargs):
+        """Run op(**kwargs) in the worker and wait up to `wait` seconds for the answer"""
+        with self.lock:
+            channel = self.channel
+            if channel is not None:
+                request_id = next(self.ids)
+                future = Future()
+                self.pending[request_id] = future
+        if channel is None:
+            return run_operation(op, kwargs)
+        try:
+            channel.send({"id": request_id, "op": op, "kwargs": kwargs})
+        except (OSError, ValueError):
+            # The pipe broke; the reader notices the crash and restarts the worker
+            with self.lock:
+                self.pending.pop(request_id, None)
+            return run_operation(op, kwargs)
+        wait = wait or self.call_timeout
+        try:
+            reply = future.result(wait)
+        except FutureTimeoutError:
+            with self.lock:
+                self.pending.pop(request_id, None)
+            raise EngineError(f"Engine did not answer {op} within {wait} s")
+        if "error" in reply:
+            raise_error(*reply["error"])
+        return reply["result"]
+
+    def read_replies(self, process, channel):
+        try:
+            while True:
+                reply = channel.receive()
+                if reply is None:
+                    break
+                with self.lock:
+                    future = self.pending.pop(reply["id"], None)
+                if future is not None:
+                    future.set_result(reply)
+        except Exception as e:
+            logger.error("Engine channel failed: %s", e)
+        self.on_exit(process, channel)
+
+    def on_exit(self, process, channel):
+        with self.lock:
+            if self.channel is not channel:
+                return
+            self.process = self.channel = None
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_result({"error": ("crashed", "Engine worker stopped during the call")})
+        channel.close()
+        if self.stopping:
+            return
+        process.wait()
+        logger.error("Engine worker %d exited with code %s", process.pid, process.returncode)
+        now = time.monotonic()
+        self.crash_times = [t for t in self.crash_times if t > now - self.RESTART_WINDOW] + [now]
+        if len(self.crash_times) > self.max_restarts:
+            logger.error("Engine worker keeps crashing, running the engine in-process from now on")
+            return
+        time.sleep(min(30, 2 ** (len(self.crash_times) - 1)))
+        if not self.stopping:
+            self.restarts += 1
+            try:
+                self.start()
+            except OSError as e:
+                logger.error("Could not restart engine worker: %s", e)
+
+    def forward_log(self, process):
+        for line in io.TextIOWrapper(process.stderr, encoding="utf-8", errors="replace"):
+            logger.info("worker: %s", line.rstrip())
+
+    # Typed helpers
+
+    def detect(self, text):
+        return self.call("detect", text=text)
+
+    def ocr(self, bbox=None):
+        return self.call("ocr", bbox=bbox)
+
+    def post(self, url, headers, json, timeout):
+        # Leave the worker time to report its own timeout first
+        return EngineResponse(self.call(
+            "post", wait=timeout + 5, url=url, headers=headers, payload=json, timeout=timeout
+        ))
+
+
+if __name__ == "__main__":
+    sys.exit(serve())
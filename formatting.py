@@ -0,0 +1,83 @@
+"""Placeholders for the parts of a Discord message the model must not touch
+
+protect_formatting() swaps code blocks, URLs, mentions, emoji and markdown
+markers for numbered placeholders before translation; restore_formatting()
+puts them back in the model's answer.
+"""
+import re
+import logging
+
+logger = logging.getLogger("AITranslator.formatting")
+
+
+# Spans that must reach the user exactly as written
+FORMATTING_PATTERN = re.compile(r"""
+    (?P<inline_code>`[^`\n]+`)
+    |(?P<url><https?://[^\s>]+>|https?://[^\s<>]+)
+    |(?P<mention><(?:@[!&]?|\#)\d+>)
+    |(?P<custom_emoji><a?:\w+:\d+>)
+    |(?P<timestamp><t:-?\d+(?::[tTdDfFR])?>)
+    |(?P<emoji_code>:[A-Za-z_][\w+-]*:)
+    |(?P<markdown>\*\*\*|\*\*|__|~~|\|\|)
+""", re.VERBOSE)
+PLACEHOLDER_PATTERN = re.compile(r'\u27e6\s*(\d+)\s*\u27e7')
+CODE_FENCE = "```"
+MARKDOWN_MARKERS = {"***", "**", "__", "~~", "||"}
+
+
+def placeholder(index):
+    return f"\u27e6{index}\u27e7"
+
+
+def protect_formatting(text):
+    """Replace code blocks, URLs, mentions, emoji and markdown markers with placeholders
+
+    Returns (masked_text, spans) where spans[i] is the text behind placeholder i.
+    Runs in a single left-to-right pass.
+    """
+    spans = []
+
+    def protect(match):
+        spans.append(match.group(0))
+        return placeholder(len(spans) - 1)
+
+    pieces = []
+    position = 0
+    while True:
+        start = text.find(CODE_FENCE, position)
+        end = text.find(CODE_FENCE, start + len(CODE_FENCE)) if start != -1 else -1
+        if end == -1:
+            pieces.append(FORMATTING_PATTERN.sub(protect, text[position:]))
+            break
+        pieces.append(FORMATTING_PATTERN.sub(protect, text[position:start]))
+        spans.append(text[start:end + len(CODE_FENCE)])
+        pieces.append(placeholder(len(spans) - 1))
+        position = end + len(CODE_FENCE)
+
+    return "".join(pieces), spans
+
+
+def restore_formatting(text, spans):
+    """Put protected spans back; spans the model dropped (except markdown markers) are appended"""
+    used = set()
+
+    def restore(match):
+        index = int(match.group(1))
+        if index >= len(spans):
+            return match.group(0)
+        used.add(index)
+        return spans[index]
+
+    restored = PLACEHOLDER_PATTERN.sub(restore, text)
+    missing = [
+        span for index, span in enumerate(spans)
+        if index not in used and span not in MARKDOWN_MARKERS
+    ]
+    if missing:
+        logger.warning("Model dropped %d protected spans, appending them", len(missing))
+        restored = restored.rstrip() + " " + " ".join(missing)
+    return restored
+
+
+def has_translatable_text(masked_text):
+    return any(ch.isalpha() for ch in PLACEHOLDER_PATTERN.sub("", masked_text))
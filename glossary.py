@@ -0,0 +1,141 @@
+"""Glossary of do-not-translate terms and fixed renderings
+
+Terms are found with a single Aho-Corasick pass over the message and
+protected with the same placeholders as formatting.
+"""
+import os
+import json
+import logging
+from collections import deque
+
+from formatting import placeholder
+
+logger = logging.getLogger("AITranslator.glossary")
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton finding every occurrence of many patterns in one pass"""
+
+    def __init__(self, patterns):
+        # Node 0 is the root; each node has transitions, a failure link and output pattern ids
+        self.transitions = [{}]
+        self.failure = [0]
+        self.outputs = [[]]
+        self.patterns = list(patterns)
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                next_node = self.transitions[node].get(ch)
+                if next_node is None:
+                    next_node = len(self.transitions)
+                    self.transitions[node][ch] = next_node
+                    self.transitions.append({})
+                    self.failure.append(0)
+                    self.outputs.append([])
+                node = next_node
+            self.outputs[node].append(pattern_id)
+
+        # Breadth-first pass to set failure links and merge outputs
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.transitions[node].items():
+                queue.append(child)
+                if node:
+                    fallback = self.failure[node]
+                    while fallback and ch not in self.transitions[fallback]:
+                        fallback = self.failure[fallback]
+                    self.failure[child] = self.transitions[fallback].get(ch, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.failure[child]]
+
+    def finditer(self, text):
+        """Yield (start, end, pattern_id) for every occurrence, overlapping ones included"""
+        node = 0
+        transitions = self.transitions
+        failure = self.failure
+        for position, ch in enumerate(text):
+            while node and ch not in transitions[node]:
+                node = failure[node]
+            node = transitions[node].get(ch, 0)
+            for pattern_id in self.outputs[node]:
+                yield position + 1 - len(self.patterns[pattern_id]), position + 1, pattern_id
+
+
+class Glossary:
+    """Do-not-translate terms and fixed renderings, applied around the model
+
+    Matching terms are swapped for placeholders before translation, exactly
+    like protected formatting, and come back as the fixed rendering for the
+    target language (or unchanged for do-not-translate terms).
+    """
+
+    def __init__(self, do_not_translate=(), terms=None, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        # term -> {target_lang: rendering}; None means keep the term as written
+        self.renderings = {}
+        for term in do_not_translate:
+            self.renderings[term] = None
+        for term, targets in (terms or {}).items():
+            self.renderings[term] = targets
+
+        keys = [self.match_key(term) for term in self.renderings]
+        self.terms = list(self.renderings)
+        self.automaton = AhoCorasick(keys)
+
+    @classmethod
+    def from_config(cls, config):
+        do_not_translate = list(config.get("do_not_translate", []))
+        terms = dict(config.get("terms", {}))
+        if config.get("file") and os.path.exists(config["file"]):
+            with open(config["file"], "r", encoding="utf-8") as f:
+                file_glossary = json.load(f)
+            do_not_translate.extend(file_glossary.get("do_not_translate", []))
+            terms.update(file_glossary.get("terms", {}))
+        glossary = cls(do_not_translate, terms, config.get("case_sensitive", False))
+        logger.info("Loaded glossary with %d terms", len(glossary.terms))
+        return glossary
+
+    def match_key(self, text):
+        return text if self.case_sensitive else text.lower()
+
+    def find_terms(self, text):
+        """Return non-overlapping (start, end, term) matches on word boundaries, longest first"""
+        haystack = self.match_key(text)
+        if len(haystack) != len(text):
+            # Lowercasing changed the length, so offsets would not line up
+            haystack = text
+
+        matches = []
+        for start, end, pattern_id in self.automaton.finditer(haystack):
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            matches.append((start, end, pattern_id))
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+
+        selected = []
+        last_end = 0
+        for start, end, pattern_id in matches:
+            if start >= last_end:
+                selected.append((start, end, self.terms[pattern_id]))
+                last_end = end
+        return selected
+
+    def protect(self, masked_text, spans, target_lang):
+        """Swap glossary terms in already masked text for placeholders, extending spans"""
+        pieces = []
+        position = 0
+        for start, end, term in self.find_terms(masked_text):
+            targets = self.renderings[term]
+            rendering = targets.get(target_lang) if targets else None
+            if targets and rendering is None:
+                # No fixed rendering for this target language, let the model translate it
+                continue
+            pieces.append(masked_text[position:start])
+            spans.append(rendering if rendering is not None else masked_text[start:end])
+            pieces.append(placeholder(len(spans) - 1))
+            position = end
+        pieces.append(masked_text[position:])
+        return "".join(pieces)
@@ -0,0 +1,204 @@
+"""Single-instance guard for the translator
+
+The first launch takes a per-user lock (a named mutex on Windows, a locked
+file elsewhere) and listens on a local named pipe / Unix socket. Later
+launches find the lock taken, send their command line to the running
+instance and exit. Only the standard library is used so a second launch
+can hand off before main.py loads Qt and the other heavy modules.
+
+Messages are JSON lists of arguments sent with multiprocessing.connection,
+which authenticates both ends with an HMAC handshake before any data is
+exchanged. The handshake key is a random secret created on first launch in a
+file only the user can read, so other local processes can't compute it.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import secrets
+import getpass
+import tempfile
+import threading
+from multiprocessing.connection import Listener, Client
+
+APP_ID = "AITranslatorForDiscord"
+CONNECT_TIMEOUT = 5
+
+
+def user_id():
+    try:
+        return getpass.getuser()
+    except Exception:
+        return "user"
+
+
+def address():
+    name = f"{APP_ID}-{user_id()}"
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+
+def secret_path():
+    if sys.platform == "win32":
+        # Local AppData is only readable by its user
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, APP_ID, "instance.key")
+
+
+def authkey(create=False):
+    """Return the per-user handshake secret, or None if there is none yet
+
+    Only the first instance (which holds the lock) passes create=True, so two
+    launches never race to write it.
+    """
+    path = secret_path()
+    try:
+        with open(path, "rb") as f:
+            secret = f.read()
+        if len(secret) >= 32 and (sys.platform == "win32" or not os.stat(path).st_mode & 0o077):
+            return secret
+    except OSError:
+        pass
+    if not create:
+        return None
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    secret = secrets.token_bytes(32)
+    temporary = f"{path}.{os.getpid()}"
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "wb") as f:
+        f.write(secret)
+    os.replace(temporary, path)
+    return secret
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="AITranslatorForDiscord",
+        description="Translate Discord messages with AI. If the translator is already running, "
+                    "the command is handed to it."
+    )
+    parser.add_argument("--show", action="store_true", help="show the main window")
+    parser.add_argument("--settings", action="store_true", help="open the settings dialog")
+    parser.add_argument("--translate", metavar="TEXT", help="translate TEXT with the receive language pair")
+    return parser
+
+
+class InstanceLock:
+    """Held for the lifetime of the first instance"""
+
+    def __init__(self):
+        self.handle = None
+
+    def acquire(self):
+        """Return True if this is the only running instance"""
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            self.handle = kernel32.CreateMutexW(None, False, f"Local\\{APP_ID}-{user_id()}")
+            # ERROR_ALREADY_EXISTS: another instance created the mutex first
+            return bool(self.handle) and kernel32.GetLastError() != 183
+        import fcntl
+        self.handle = open(os.path.join(tempfile.gettempdir(), f"{APP_ID}-{user_id()}.lock"), "w")
+        try:
+            fcntl.flock(self.handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+
+class InstanceServer:
+    """Receives command lines from later launches on a background thread
+
+    Commands that arrive before a handler is set (while the app is still
+    starting) are kept and delivered by set_handler().
+    """
+
+    def __init__(self):
+        if sys.platform != "win32" and os.path.exists(address()):
+            # Left behind by a crashed instance; we hold the lock, so it's stale
+            os.remove(address())
+        self.listener = Listener(address(), authkey=authkey(create=True))
+        self.handler = None
+        self.backlog = []
+        self.lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self.serve, name="InstanceServer", daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except Exception:
+                if self.closed:
+                    return
+                # Failed handshake from something that isn't us
+                continue
+            try:
+                args = json.loads(connection.recv_bytes(64 * 1024))
+                if isinstance(args, list) and all(isinstance(arg, str) for arg in args):
+                    self.deliver(args)
+                    connection.send_bytes(b"ok")
+            except Exception:
+                pass
+            finally:
+                connection.close()
+
+    def deliver(self, args):
+        with self.lock:
+            if self.handler is None:
+                self.backlog.append(args)
+                return
+            handler = self.handler
+        handler(args)
+
+    def set_handler(self, handler):
+        """Call handler(args) for every forwarded command line, including earlier ones"""
+        with self.lock:
+            self.handler = handler
+            backlog, self.backlog = self.backlog, []
+        for args in backlog:
+            handler(args)
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+
+
+def forward(args):
+    """Send args to the running instance; returns a process exit code"""
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        try:
+            key = authkey()
+            if key is None:
+                raise FileNotFoundError(secret_path())
+            connection = Client(address(), authkey=key)
+            break
+        except (OSError, EOFError):
+            # The first instance may still be starting its listener
+            if time.monotonic() > deadline:
+                print("The translator is already running but did not respond.", file=sys.stderr)
+                return 1
+            time.sleep(0.05)
+    if sys.platform == "win32":
+        # Let the running instance bring its window to the front
+        import ctypes
+        ctypes.windll.user32.AllowSetForegroundWindow(-1)  # ASFW_ANY
+    with connection:
+        connection.send_bytes(json.dumps(args).encode())
+        return 0 if connection.recv_bytes() == b"ok" else 1
+
+
+def claim_or_forward(args):
+    """Return an InstanceServer if this is the first instance, otherwise hand off and exit"""
+    build_parser().parse_args(args)  # Report bad arguments here, not in the running instance
+    lock = InstanceLock()
+    if not lock.acquire():
+        sys.exit(forward(args))
+    server = InstanceServer()
+    server.instance_lock = lock
+    return server
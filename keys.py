@@ -0,0 +1,176 @@
+"""Request rate limits and the pool of Groq API keys
+
+Each key gets its own token bucket (RateLimiter) and is tracked from the
+x-ratelimit-* headers of its answers. ApiKeyPool hands out the least-loaded
+key that isn't cooling down after a 429 or an authentication failure.
+"""
+import os
+import re
+import time
+import logging
+import threading
+
+from metrics import METRICS
+from circuit import APIError
+
+logger = logging.getLogger("AITranslator.keys")
+
+
+class RateLimiter:
+    """Token bucket limiting API requests per minute across all threads"""
+
+    def __init__(self, requests_per_minute=30):
+        self.capacity = max(1, requests_per_minute)
+        self.tokens = float(self.capacity)
+        self.refill_rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        with METRICS.histogram("rate_limiter_wait_seconds", "Time spent waiting for the request rate limit").time():
+            self.wait_for_token()
+
+    def wait_for_token(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+
+def load_api_keys(key_file=None):
+    """Groq keys from GROQ_API_KEYS (comma or space separated), a key file and GROQ_API_KEY"""
+    keys = re.split(r"[\s,]+", os.getenv("GROQ_API_KEYS", ""))
+    if key_file and os.path.exists(key_file):
+        with open(key_file, "r", encoding="utf-8") as f:
+            keys.extend(line.split("#", 1)[0].strip() for line in f)
+    keys.append(os.getenv("GROQ_API_KEY", ""))
+    # Keep the first occurrence of each key, in order
+    return list(dict.fromkeys(key for key in keys if key and key != "your_api_key_here"))
+
+
+DURATION_PART_PATTERN = re.compile(r"([\d.]+)(ms|h|m|s)")
+DURATION_UNITS = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+
+
+def parse_reset_duration(value):
+    """Seconds in a Groq reset header such as "2m59.56s" or "120ms", None if unparsable"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+class ApiKeyState:
+    """Rate-limit state of one API key, fed by the x-ratelimit-* response headers"""
+
+    def __init__(self, key, requests_per_minute):
+        self.key = key
+        self.label = f"...{key[-4:]}"
+        self.limiter = RateLimiter(requests_per_minute)
+        self.in_flight = 0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.requests = 0
+
+    def available(self, now, estimated_tokens):
+        if now < self.cooldown_until:
+            return False
+        if self.remaining_tokens is not None and now < self.tokens_reset_at:
+            return self.remaining_tokens >= estimated_tokens
+        return True
+
+    def load(self):
+        """Sort key: keys with a free local token and more server-side headroom first"""
+        with self.limiter.lock:
+            ready = self.limiter.tokens >= 1
+        return (not ready, self.in_flight, -(self.remaining_requests if self.remaining_requests is not None else 1 << 30))
+
+
+class ApiKeyPool:
+    """Spreads requests over several API keys, each with its own rate limits
+
+    acquire() picks the least-loaded key that isn't cooling down, waits on
+    that key's own token bucket and returns its state; release() updates it
+    from the response. 429 answers cool a key down until the server says it
+    resets, 401/403 take it out of rotation for much longer.
+    """
+
+    MAX_WAIT = 10
+    INVALID_KEY_COOLDOWN = 15 * 60
+    DEFAULT_COOLDOWN = 30
+
+    def __init__(self, keys, requests_per_minute=30):
+        self.keys = [ApiKeyState(key, requests_per_minute) for key in keys]
+        self.lock = threading.Lock()
+        METRICS.gauge(
+            "api_keys_available", "API keys not cooling down",
+            callback=lambda: sum(1 for state in self.keys if time.monotonic() >= state.cooldown_until)
+        )
+        if len(self.keys) > 1:
+            logger.info("Using a pool of %d API keys", len(self.keys))
+
+    @classmethod
+    def from_config(cls, api_config):
+        return cls(load_api_keys(api_config.get("key_file")), api_config["requests_per_minute"])
+
+    def acquire(self, estimated_tokens=0):
+        """Reserve the best key for one request and return its ApiKeyState"""
+        if not self.keys:
+            raise ValueError("API key not found in environment variables. Please check your .env file.")
+        deadline = time.monotonic() + self.MAX_WAIT
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                candidates = [state for state in self.keys if state.available(now, estimated_tokens)]
+                if candidates:
+                    state = min(candidates, key=ApiKeyState.load)
+                    state.in_flight += 1
+                    state.requests += 1
+                    break
+                wait = min(max(state.cooldown_until, state.tokens_reset_at) for state in self.keys) - now
+            if now + wait > deadline:
+                # Every key is throttled; report it like a rate-limited answer so callers can queue the request
+                raise APIError(429, f"All {len(self.keys)} API keys are rate limited for another {wait:.0f} s")
+            time.sleep(max(wait, 0.05))
+        state.limiter.acquire()
+        return state
+
+    def release(self, state, status_code=None, headers=None):
+        """Return a key after a request; status_code is None if no answer arrived"""
+        headers = headers or {}
+        with self.lock:
+            state.in_flight -= 1
+            now = time.monotonic()
+            if headers.get("x-ratelimit-remaining-requests", "").isdigit():
+                state.remaining_requests = int(headers["x-ratelimit-remaining-requests"])
+            if headers.get("x-ratelimit-remaining-tokens", "").isdigit():
+                state.remaining_tokens = int(headers["x-ratelimit-remaining-tokens"])
+                state.tokens_reset_at = now + (parse_reset_duration(headers.get("x-ratelimit-reset-tokens")) or 60)
+            if status_code == 429:
+                cooldown = (parse_reset_duration(headers.get("retry-after"))
+                            or parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+                            or self.DEFAULT_COOLDOWN)
+                reason = "rate_limited"
+            elif status_code in (401, 403):
+                cooldown = self.INVALID_KEY_COOLDOWN
+                reason = "rejected"
+            else:
+                return
+            state.cooldown_until = now + cooldown
+        logger.warning("API key %s %s, cooling down for %.0f s", state.label, reason.replace("_", " "), cooldown)
+        METRICS.counter("api_key_cooldowns_total", "API keys taken out of rotation", {"reason": reason}).inc()
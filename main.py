@@ -1,4 +1,19 @@
 import sys
+
+# Frozen builds start the engine worker process by running this executable again
+if __name__ == "__main__" and "--engine-worker" in sys.argv:
+    import engine
+    sys.exit(engine.serve())
+
+# build.py times launches with --startup-probe, which exits once the imports are done
+STARTUP_PROBE = __name__ == "__main__" and "--startup-probe" in sys.argv
+
+# A second launch hands its command line to the running translator and exits
+# here, before the slow imports below
+if __name__ == "__main__" and not STARTUP_PROBE:
+    import instance
+    INSTANCE_SERVER = instance.claim_or_forward(sys.argv[1:])
+
 import os
 import json
 import keyboard
@@ -6,148 +21,1277 @@ import pyperclip
 import requests
 import time
 import logging
+import logging.handlers
+import atexit
+import gzip
+import queue
+import shutil
+import hashlib
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from PyQt5.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QAction, 
                             QMessageBox, QDialog, QVBoxLayout, QHBoxLayout, 
                             QLabel, QComboBox, QPushButton, QLineEdit, 
                             QMainWindow, QTextEdit, QSplitter, QWidget,
                             QListWidget, QListWidgetItem, QFrame, QGridLayout,
                             QActionGroup, QShortcut)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize
+from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal, QTimer, QSize
 from PyQt5.QtGui import QIcon, QFont, QColor, QKeySequence, QCursor
 import win32gui
-import win32con
 import win32api
-import win32clipboard
 from playsound import playsound
 from dotenv import load_dotenv
-from langdetect import detect
+from engine import EngineClient
+from metrics import METRICS, MetricsRegistry, Histogram, Gauge, start_metrics_server
+from profiler import PROFILE_REQUEST_FILE, StackSampler
+from chunking import estimate_tokens, split_segments, model_context_window, chunk_budget, split_chunks
+from memory import TranslationMemory
+from circuit import CircuitOpenError, APIError, is_connectivity_error, CircuitBreaker
+from keys import ApiKeyPool, load_api_keys
+from concurrency import AdaptiveConcurrencyLimiter
+from usage import BudgetExceededError, UsageLedger, TokenStats
+from formatting import protect_formatting, restore_formatting, has_translatable_text
+from glossary import Glossary
+from outbox import OutboxStore
+from config import ConfigStore
+from answers import (TranslationValidationError, candidate_instruction, split_candidates, number_segments,
+                     split_numbered_segments, clean_translation, validate_translation, parse_fan_out_answer)
+from sender import MessageSender
 from PyQt5.QtCore import QPropertyAnimation
 
+if STARTUP_PROBE:
+    sys.exit(0)
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates by size or at midnight, gzip-compressing old logs"""
+
+    def __init__(self, filename, max_bytes=5 * 1024 * 1024, backup_count=5):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self.compress
+        self.next_midnight = self.compute_next_midnight()
+
+    @staticmethod
+    def compute_next_midnight():
+        tomorrow = time.localtime(time.time() + 86400)
+        return time.mktime((tomorrow.tm_year, tomorrow.tm_mon, tomorrow.tm_mday, 0, 0, 0, 0, 0, -1))
+
+    @staticmethod
+    def compress(source, destination):
+        with open(source, "rb") as f_in, gzip.open(destination, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        if time.time() >= self.next_midnight:
+            self.next_midnight = self.compute_next_midnight()
+            return True
+        return super().shouldRollover(record)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `burst` DEBUG records per message template every `interval` seconds"""
+
+    def __init__(self, burst=20, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        # message template -> [window start, count, suppressed]
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            if len(self.windows) > 1000:
+                self.windows.clear()
+            window = self.windows.get(record.msg)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[record.msg] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the writer falls behind"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class Preview:
+    """Lazily truncated text for log arguments; only sliced if the record is emitted"""
+
+    def __init__(self, text, length=50):
+        self.text = text
+        self.length = length
+
+    def __str__(self):
+        if self.text is None:
+            return "None"
+        return f"{self.text[:self.length]}..." if len(self.text) > self.length else self.text
+
+
+def setup_logging():
+    """Log through a queue so the UI and hotkey threads never wait on disk I/O"""
+    level = getattr(logging, os.getenv("LOG_LEVEL", "DEBUG").upper(), logging.DEBUG)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = CompressingRotatingFileHandler(os.getenv("LOG_FILE", "translator_debug.log"))
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=10000)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
 # Set up logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("translator_debug.log"),
-        logging.StreamHandler()
-    ]
-)
+log_listener = setup_logging()
 logger = logging.getLogger("AITranslator")
 
+
+class StallDetector(QObject):
+    """Logs main-thread blocks longer than a threshold together with the blocking stack
+
+    A QTimer on the Qt thread bumps a heartbeat; a watchdog thread notices
+    when the heartbeat is late, captures the main thread's stack once per
+    stall and logs the total duration when the event loop comes back.
+    """
+
+    HEARTBEAT_MS = 10
+
+    def __init__(self, threshold_ms=50, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.main_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self.stall_stack = None
+        self.stopping = threading.Event()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.beat)
+        self.timer.start(self.HEARTBEAT_MS)
+
+        self.watchdog = threading.Thread(target=self.watch, name="StallDetector", daemon=True)
+        self.watchdog.start()
+
+    def beat(self):
+        now = time.perf_counter()
+        previous = self.last_beat
+        stalled_for = now - previous - self.HEARTBEAT_MS / 1000
+        self.last_beat = now
+        if stalled_for > self.threshold:
+            # The watchdog tags the stack with the heartbeat it saw, so a stack from an older stall is never reused
+            captured = self.stall_stack
+            stack = captured[1] if captured and captured[0] == previous else "<stack not captured>"
+            METRICS.histogram("ui_stall_seconds", "Qt event loop blocks longer than the stall threshold").observe(stalled_for)
+            logger.warning("UI thread blocked for %.0f ms in:\n%s", stalled_for * 1000, stack)
+
+    def watch(self):
+        interval = self.HEARTBEAT_MS / 1000
+        while not self.stopping.wait(interval):
+            beat = self.last_beat
+            late = time.perf_counter() - beat - interval
+            captured = self.stall_stack
+            if late > self.threshold and (captured is None or captured[0] != beat):
+                frame = sys._current_frames().get(self.main_thread_id)
+                if frame is not None:
+                    self.stall_stack = (beat, "".join(traceback.format_stack(frame)))
+
+    def stop(self):
+        self.stopping.set()
+        self.timer.stop()
+
+
+# HTTP, language detection and OCR; calls run in-process until the worker is started
+ENGINE = EngineClient()
+
+
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+# System prompts per (source, target) pair
+SYSTEM_PROMPTS = {
+    ("auto", "pt"): "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate it to Brazilian Portuguese using informal, everyday language. Use common expressions and slang when appropriate. Just give the translation, nothing else.",
+    ("pt", "en"): "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the Portuguese text to casual, everyday English. Use common expressions and slang when appropriate. Just give the translation, nothing else.",
+    ("en", "pt"): "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the English text to informal Brazilian Portuguese. Common expressions, and everyday language. Just give the translation, nothing else.",
+    ("ru", "pt"): "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the Russian text to informal Brazilian Portuguese. Common expressions, and everyday language. Just give the translation, nothing else.",
+    ("auto", "en"): "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the text to casual, everyday English. Use common expressions and slang when appropriate. Just give the translation, nothing else.",
+}
+
+# One short example exchange per pair, in the right source and target languages
+FEW_SHOT_EXAMPLES = {
+    ("auto", "pt"): ("Hello, how are you doing?", "Oi, como você tá?"),
+    ("en", "pt"): ("Hello, how are you doing?", "Oi, como você tá?"),
+    ("ru", "pt"): ("Привет, как дела?", "Oi, como você tá?"),
+    ("pt", "en"): ("Oi, como você tá?", "Hey, how's it going?"),
+    ("auto", "en"): ("Oi, como você tá?", "Hey, how's it going?"),
+}
+
+
+# Protected spans reach the model as numbered placeholders (see protect_formatting)
+PLACEHOLDER_INSTRUCTION = "Keep markers like \u27e60\u27e7 exactly as they are, in the matching place."
+
+# Target languages a fan-out request can ask for, by code
+LANGUAGE_NAMES = {
+    "en": "English",
+    "pt": "Brazilian Portuguese",
+    "es": "Spanish",
+    "ru": "Russian",
+    "fr": "French",
+    "de": "German",
+}
+
+
+@lru_cache(maxsize=None)
+def build_fan_out_prompt(targets):
+    """System prompt asking for one translation per target language as a JSON object"""
+    languages = ", ".join(f"{LANGUAGE_NAMES.get(code, code)} ({code})" for code in targets)
+    return (
+        "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and "
+        f"<<OUTPUT>>, translate it into each of these languages: {languages}. Use informal, everyday "
+        "language. Answer with a JSON object whose keys are the language codes and whose values are "
+        f"the translations, nothing else. {PLACEHOLDER_INSTRUCTION}"
+    )
+
+
+def format_translations(translations):
+    """One paragraph per language, for the popup and the history"""
+    return "\n\n".join(f"{target.upper()}: {text}" for target, text in translations.items())
+
+
+@lru_cache(maxsize=None)
+def build_prompt_prefix(source_lang, target_lang, few_shot=True):
+    """Return the fixed (role, content) messages that start every request for a pair"""
+    system_prompt = SYSTEM_PROMPTS.get((source_lang, target_lang))
+    if system_prompt is None:
+        raise ValueError(f"Unsupported language pair: {source_lang} to {target_lang}")
+
+    prefix = [("system", f"{system_prompt} {PLACEHOLDER_INSTRUCTION}")]
+    if few_shot:
+        example_source, example_translation = FEW_SHOT_EXAMPLES[(source_lang, target_lang)]
+        prefix.append(("user", f"<<INPUT>>{example_source}<<OUTPUT>>"))
+        prefix.append(("assistant", example_translation))
+    return tuple(prefix)
+
+
+class TranslationCancelledError(Exception):
+    """The result is no longer wanted, so the request was not sent"""
+
+
+def detected_language(text):
+    try:
+        return ENGINE.detect(text)
+    except Exception:
+        return None
+
+
+class ValidationStats:
+    """Counts of answers repaired locally and re-requested after failing validation"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.responses = 0
+        self.repaired = 0
+        self.retried = 0
+
+    def record(self, repaired=False, retried=False):
+        with self.lock:
+            self.responses += 1
+            self.repaired += int(repaired)
+            self.retried += int(retried)
+
+    @property
+    def repair_rate(self):
+        return self.repaired / self.responses if self.responses else 0.0
+
+    @property
+    def retry_rate(self):
+        return self.retried / self.responses if self.responses else 0.0
+
+
+class TranslationServices:
+    """Shared state used by every translation thread"""
+
+    def __init__(self, translation_memory=None, rate_limiter=None, token_stats=None,
+                 validation_stats=None, glossary=None, circuit_breaker=None, api_keys=None,
+                 concurrency=None, usage_ledger=None):
+        self.translation_memory = translation_memory
+        self.rate_limiter = rate_limiter
+        self.token_stats = token_stats
+        self.validation_stats = validation_stats or ValidationStats()
+        self.glossary = glossary
+        self.circuit_breaker = circuit_breaker
+        self.api_keys = api_keys
+        self.concurrency = concurrency
+        self.usage_ledger = usage_ledger
+
+
 class TranslationThread(QThread):
     translation_complete = pyqtSignal(str, str)
     
-    def __init__(self, text, source_lang, target_lang, api_config):
+    def __init__(self, text, source_lang, target_lang, api_config, services=None, origin=None, fresh=False):
         super().__init__()
         self.text = text
+        # What started the translation (shortcut, input box, ...), for usage accounting
+        self.origin = origin
         self.source_lang = source_lang
         self.target_lang = target_lang
         self.api_config = api_config
+        self.services = services or TranslationServices()
+        self.translation_memory = self.services.translation_memory
+        # Alternatives to ask for in the same request; only whole-message requests get them
+        self.candidates = max(1, api_config["candidates"])
+        # fresh translations skip the translation memory (Translate Again wants a new answer)
+        self.fresh = fresh
+        # Optional callable; when it returns True no further API requests are sent
+        self.cancelled = None
+        self.error = None
+        # Other translations the model offered, best first, not including the result
+        self.alternatives = []
+        # Answers used although every attempt failed validation; never stored in the memory
+        self.unvalidated_answers = []
         
     def run(self):
+        started = time.perf_counter()
         try:
             # Check API key first
-            api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
+            pool = self.services.api_keys
+            if not (pool.keys if pool else os.getenv("GROQ_API_KEY")):
                 raise ValueError("API key not found in environment variables. Please check your .env file.")
             
-            logger.info(f"Starting translation from {self.source_lang} to {self.target_lang}")
-            translated_text = self.translate_text()
+            logger.info("Starting translation from %s to %s", self.source_lang, self.target_lang)
+            # Code, URLs, mentions and markdown never reach the model
+            masked_text, spans = protect_formatting(self.text)
+            if self.services.glossary:
+                masked_text = self.services.glossary.protect(masked_text, spans, self.target_lang)
+            if not has_translatable_text(masked_text):
+                # Only code, links or known glossary terms, no model needed
+                logger.info("Nothing to translate outside protected spans")
+                translated_text = restore_formatting(masked_text, spans)
+            else:
+                if self.translation_memory and not self.fresh:
+                    translated_text = self.translate_with_memory(masked_text)
+                else:
+                    translated_text = self.translate_chunked(masked_text, candidates=self.candidates)
+                translated_text = restore_formatting(translated_text, spans)
+                self.alternatives = [restore_formatting(alternative, spans) for alternative in self.alternatives]
             logger.info("Translation completed successfully")
+            METRICS.counter("translations_total", "Finished translations", {"result": "ok"}).inc()
+            METRICS.histogram("translation_seconds", "End-to-end translation time").observe(
+                time.perf_counter() - started
+            )
             self.translation_complete.emit(self.text, translated_text)
+        except TranslationCancelledError as e:
+            logger.debug("Translation cancelled before its API request")
+            self.error = e
+            self.translation_complete.emit(self.text, f"Translation error: {str(e)}")
         except Exception as e:
-            logger.error(f"Translation error: {str(e)}", exc_info=True)
+            logger.error("Translation error: %s", e, exc_info=True)
+            METRICS.counter("translations_total", "Finished translations", {"result": "error"}).inc()
+            self.error = e
             self.translation_complete.emit(self.text, f"Translation error: {str(e)}")
     
-    def translate_text(self):
+    def translate_with_memory(self, text):
+        """Translate only the segments that are not in the translation memory"""
+        memory = self.translation_memory
+        parts = split_segments(text)
+        # Even indexes are segments, odd indexes are the separators between them
+        segment_indexes = [i for i in range(0, len(parts), 2) if parts[i].strip()]
+
+        if len(segment_indexes) <= 1:
+            cached = memory.lookup(text.strip(), self.source_lang, self.target_lang)
+            if cached is not None:
+                logger.info("Translation memory: full hit, ~%d tokens saved", estimate_tokens(text))
+                return cached
+            example = memory.similar_example(text.strip(), self.source_lang, self.target_lang)
+            translated_text, valid = self.validated(
+                self.translate_chunked, text, [example] if example else None, self.candidates
+            )
+            if valid:
+                memory.store([(text.strip(), translated_text)], self.source_lang, self.target_lang)
+            return translated_text
+
+        translations = {}
+        misses = []
+        for i in segment_indexes:
+            segment = parts[i]
+            if segment in translations or segment in misses:
+                continue
+            cached = memory.lookup(segment, self.source_lang, self.target_lang)
+            if cached is None:
+                misses.append(segment)
+            else:
+                translations[segment] = cached
+
+        hits = len(segment_indexes) - sum(1 for i in segment_indexes if parts[i] in misses)
+        saved = sum(estimate_tokens(parts[i]) for i in segment_indexes if parts[i] not in misses)
+        logger.info(
+            "Translation memory: %d/%d segments hit (%.0f%%), ~%d tokens saved",
+            hits, len(segment_indexes), 100 * hits / len(segment_indexes), saved
+        )
+
+        if misses:
+            examples = []
+            for segment in misses:
+                example = memory.similar_example(segment, self.source_lang, self.target_lang)
+                if example and example not in examples:
+                    examples.append(example)
+            translated, unvalidated = self.translate_segments(misses, examples[:2] or None)
+            memory.store(
+                [(segment, translation) for segment, translation in translated.items() if segment not in unvalidated],
+                self.source_lang, self.target_lang
+            )
+            translations.update(translated)
+
+        return "".join(
+            translations[part] if i % 2 == 0 and part.strip() else part
+            for i, part in enumerate(parts)
+        )
+
+    def validated(self, translate, *args):
+        """(result of translate(*args), False if any answer in it failed validation)"""
+        before = len(self.unvalidated_answers)
+        result = translate(*args)
+        return result, len(self.unvalidated_answers) == before
+
+    def translate_segments(self, segments, examples=None):
+        """{segment: translation} for several segments, batched into as few requests as possible
+
+        Segments are numbered so the answer can be split back apart. Segments
+        missing from an answer are requested again as a smaller batch, and
+        one at a time if they are still missing. Also returns the set of
+        segments whose translation failed validation.
+        """
+        translations = {}
+        unvalidated = set()
+        pending = list(segments)
+        for _ in range(2):
+            if len(pending) < 2:
+                break
+            answer, valid = self.validated(self.translate_chunked, number_segments(pending), examples)
+            found = split_numbered_segments(answer, len(pending))
+            translations.update((pending[index], text) for index, text in found.items())
+            if not valid:
+                unvalidated.update(pending[index] for index in found)
+            missing = [segment for index, segment in enumerate(pending) if index not in found]
+            if missing:
+                logger.warning("%d of %d segments missing from the answer, requesting them again",
+                               len(missing), len(pending))
+            pending = missing
+        for segment in pending:
+            translations[segment], valid = self.validated(self.translate_chunked, segment, examples)
+            if not valid:
+                unvalidated.add(segment)
+        return translations, unvalidated
+
+    def translate_chunked(self, text, examples=None, candidates=1):
+        """Translate text, splitting it into chunks translated in parallel if it is too long
+
+        Alternatives (see _try_translation) are only requested when the text fits in one chunk.
+        """
+        chunks, separators = split_chunks(text, chunk_budget(self.api_config))
+        if len(chunks) == 1:
+            return self.translate_text(text, examples, candidates)
+
+        workers = max(1, self.api_config["max_parallel_chunks"])
+        logger.info("Translating %d chunks with up to %d parallel requests", len(chunks), workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            translated_chunks = list(executor.map(
+                lambda chunk: self.translate_text(chunk, examples) if chunk.strip() else chunk,
+                chunks
+            ))
+
+        pieces = [translated_chunks[0]]
+        for separator, translated_chunk in zip(separators, translated_chunks[1:]):
+            pieces.append(separator)
+            pieces.append(translated_chunk)
+        return "".join(pieces)
+
+    def translate_text(self, text, examples=None, candidates=1):
         retries = 3
+        last_invalid = None
         while retries > 0:
             try:
-                return self._try_translation()
-            except Exception as e:
+                return self._try_translation(text, examples, candidates)
+            except TranslationCancelledError:
+                raise
+            except (CircuitOpenError, BudgetExceededError):
+                # The endpoint is known to be down or the budget is spent; fail now instead of sleeping through retries
+                raise
+            except TranslationValidationError as e:
+                logger.warning("Rejected translation, requesting again: %s", e)
+                last_invalid = e
+                retries -= 1
+                if retries == 0:
+                    # Every answer failed validation; the last one beats an error,
+                    # but it is flagged so it never reaches the translation memory
+                    if last_invalid.translated_text:
+                        self.unvalidated_answers.append(last_invalid.translated_text)
+                        return last_invalid.translated_text
+                    raise
+            except Exception:
                 retries -= 1
                 if retries == 0:
-                    # Try fallback translation service
-                    try:
-                        return self._fallback_translation()
-                    except:
-                        raise e
+                    raise
                 time.sleep(1)  # Wait before retry
-                
-    def _fallback_translation(self):
-        """Fallback to a different translation service"""
-        # Implement alternative translation service
-        # Could use a different API or local model
-        pass
-
-    def _try_translation(self):
-        """Attempt to translate text using Groq API"""
-        # Get API key from environment
-        api_key = os.getenv("GROQ_API_KEY")
+
+    def _try_translation(self, text, examples=None, candidates=1):
+        """Attempt to translate text using Groq API
+
+        examples is an optional list of (source, translation) pairs from the
+        translation memory, sent after the fixed few-shot example. With
+        candidates > 1 the model is asked for that many translations in one
+        request (the "n" parameter or a numbered list, see api.candidates_mode);
+        the best is returned and the others are kept in self.alternatives.
+        """
         model = self.api_config["model"]
+        ledger = self.services.usage_ledger
+        if ledger:
+            # May switch to a cheaper model or refuse, depending on today's token budget
+            model = ledger.model_for(model)
+        
+        # The prefix is identical for every request of a language pair so the
+        # provider can reuse its cached prompt computation
+        prefix = build_prompt_prefix(
+            self.source_lang, self.target_lang, self.api_config["few_shot"]
+        )
+        prompt = f"<<INPUT>>{text}<<OUTPUT>>"
+        logger.debug("Translation prompt: %s", Preview(prompt, 200))
+        
+        messages = [{"role": role, "content": content} for role, content in prefix]
+        # Examples from the translation memory go after the stable prefix
+        for example_source, example_translation in examples or []:
+            messages.append({"role": "user", "content": f"<<INPUT>>{example_source}<<OUTPUT>>"})
+            messages.append({"role": "assistant", "content": example_translation})
+        use_n = candidates > 1 and self.api_config["candidates_mode"] == "n"
+        if candidates > 1 and not use_n:
+            messages.append({"role": "user", "content": candidate_instruction(candidates)})
+        messages.append({"role": "user", "content": prompt})
         
-        if not api_key:
-            raise ValueError("API key not found in environment variables. Please check your .env file.")
+        data = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.7,  # Increased temperature for more natural, casual language
+            # Leave room for translations that run longer than the source
+            "max_tokens": max(256, min(estimate_tokens(text) * 3 * candidates, model_context_window(model) // 2))
+        }
+        if use_n:
+            data["n"] = candidates
+        
+        result = self._post_chat(data, text, sum(estimate_tokens(content) for _, content in prefix))
+        if candidates > 1:
+            if use_n:
+                answers = [choice["message"]["content"] for choice in result["choices"]]
+            else:
+                answers = split_candidates(result["choices"][0]["message"]["content"])
+            raw_text = answers[0]
+            self.alternatives = self.clean_alternatives(text, answers[1:], raw_text)
+        else:
+            raw_text = result["choices"][0]["message"]["content"]
+        translated_text, repaired = clean_translation(text, raw_text)
+        stats = self.services.validation_stats
+        try:
+            validate_translation(text, translated_text, self.source_lang, self.target_lang, detected_language)
+        except TranslationValidationError:
+            stats.record(repaired=repaired, retried=True)
+            raise
+        stats.record(repaired=repaired)
+        if repaired:
+            logger.debug(
+                "Repaired model output (repair rate %.1f%%, retry rate %.1f%%)",
+                100 * stats.repair_rate, 100 * stats.retry_rate
+            )
+        return translated_text
+
+    def _post_chat(self, data, text, prefix_tokens=0):
+        """Send a chat completion request and return the decoded answer
+
+        Goes through the circuit breaker, the key pool (or the single key and
+        its rate limiter) and the concurrency limit, and records usage. text
+        is the payload being translated, used for cost estimates.
+        """
+        if self.cancelled and self.cancelled():
+            raise TranslationCancelledError("Translation no longer needed")
+        model = data["model"]
+        ledger = self.services.usage_ledger
+        breaker = self.services.circuit_breaker
+        if breaker:
+            breaker.allow()
+        
+        # Pick a key from the pool (which applies each key's own rate limit) or use the single key
+        pool = self.services.api_keys
+        key_state = None
+        try:
+            if pool:
+                key_state = pool.acquire(estimate_tokens(text) + data["max_tokens"])
+                api_key = key_state.key
+            else:
+                api_key = os.getenv("GROQ_API_KEY")
+                if not api_key:
+                    raise ValueError("API key not found in environment variables. Please check your .env file.")
+                if self.services.rate_limiter:
+                    self.services.rate_limiter.acquire()
+        except Exception:
+            if breaker:
+                breaker.release_probe()
+            raise
         
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         
-        # Prepare the prompt for translation with casual, friendly tone
-        if self.source_lang == "auto" and self.target_lang == "pt":
-            prompt = f"<<INPUT>>{self.text}<<OUTPUT>>"
-            system_prompt = "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate it to Brazilian Portuguese using informal, everyday language. Use common expressions and slang when appropriate. Just give the translation, nothing else."
-        elif self.source_lang == "pt" and self.target_lang == "en":
-            prompt = f"<<INPUT>>{self.text}<<OUTPUT>>"
-            system_prompt = "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the Portuguese text to casual, everyday English. Use common expressions and slang when appropriate. Just give the translation, nothing else."
-        elif self.source_lang == "en" and self.target_lang == "pt":
-            prompt = f"<<INPUT>>{self.text}<<OUTPUT>>"
-            system_prompt = "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the English text to informal Brazilian Portuguese. Common expressions, and everyday language. Just give the translation, nothing else."
-        elif self.source_lang == "ru" and self.target_lang == "pt":
-            prompt = f"<<INPUT>>{self.text}<<OUTPUT>>"
-            system_prompt = "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the Russian text to informal Brazilian Portuguese. Common expressions, and everyday language. Just give the translation, nothing else."
-        elif self.source_lang == "auto" and self.target_lang == "en":
-            prompt = f"<<INPUT>>{self.text}<<OUTPUT>>"
-            system_prompt = "You are a casual translator who speaks like a friend. When you see text between <<INPUT>> and <<OUTPUT>>, translate the text to casual, everyday English. Use common expressions and slang when appropriate. Just give the translation, nothing else."
-        else:
-            raise ValueError(f"Unsupported language pair: {self.source_lang} to {self.target_lang}")
-        
-        logger.debug(f"Translation prompt: {prompt}")
+        concurrency = self.services.concurrency
+        if concurrency:
+            concurrency.acquire()
+        logger.debug("Sending request to Groq API")
+        started = time.perf_counter()
+        try:
+            response = ENGINE.post(
+                GROQ_CHAT_URL,
+                headers=headers,
+                json=data,
+                timeout=self.api_config["request_timeout"]
+            )
+        except Exception as e:
+            network_error = isinstance(e, requests.RequestException)
+            if concurrency:
+                concurrency.release(None, dropped=network_error)
+            if key_state:
+                pool.release(key_state)
+            if breaker:
+                if network_error:
+                    breaker.record_failure(time.perf_counter() - started)
+                else:
+                    # The engine worker failed, not the endpoint
+                    breaker.release_probe()
+            raise
+        latency = time.perf_counter() - started
+        if concurrency:
+            # A request costs roughly one unit plus one per 100 tokens of text
+            concurrency.release(
+                latency, dropped=response.status_code == 429 or response.status_code >= 500,
+                cost=1 + estimate_tokens(text) / 100
+            )
+        if key_state:
+            pool.release(key_state, response.status_code, response.headers)
+        METRICS.histogram("api_request_seconds", "Groq API round-trip time").observe(latency)
+        METRICS.counter("api_responses_total", "Groq API responses by status", {"status": str(response.status_code)}).inc()
+        if breaker:
+            # Client errors (bad key, bad request) say nothing about the endpoint's health,
+            # and with several keys a 429 only throttles the key that got it
+            throttled = response.status_code == 429 and not (pool and len(pool.keys) > 1)
+            if response.status_code >= 500 or throttled:
+                breaker.record_failure(latency)
+            else:
+                breaker.record_success(latency)
         
+        if response.status_code == 200:
+            result = response.json()
+            if ledger:
+                ledger.record(model, self.source_lang, self.target_lang, self.origin, result.get("usage", {}), latency)
+            if self.services.token_stats:
+                self.services.token_stats.record(
+                    prefix_tokens=prefix_tokens,
+                    payload_tokens=estimate_tokens(text),
+                    usage=result.get("usage", {})
+                )
+            return result
+        else:
+            error_msg = f"API error: {response.status_code} - {response.text}"
+            logger.error(error_msg)
+            raise APIError(response.status_code, error_msg)
+
+    def clean_alternatives(self, text, answers, best):
+        """Cleaned, valid, distinct alternatives; bad ones are dropped rather than re-requested"""
+        alternatives = []
+        seen = {" ".join(clean_translation(text, best)[0].split()).casefold()}
+        for answer in answers:
+            alternative = clean_translation(text, answer)[0]
+            key = " ".join(alternative.split()).casefold()
+            if key in seen:
+                continue
+            try:
+                validate_translation(text, alternative, self.source_lang, self.target_lang, detected_language)
+            except TranslationValidationError:
+                continue
+            seen.add(key)
+            alternatives.append(alternative)
+        return alternatives
+
+
+class FanOutTranslationThread(TranslationThread):
+    """Translates one message into several languages with a single request
+
+    The model answers with a JSON object keyed by language code. Each target
+    is looked up in and stored to the translation memory on its own, so only
+    the missing languages are requested, and retries ask again only for the
+    languages that were missing or invalid in the previous answer. A target
+    that is the message's own language gets the message back unchanged
+    instead of being requested (the model's answer would fail validation as
+    an echo).
+    """
+    # (original text, {target: translation or "Translation error: ..."})
+    fan_out_complete = pyqtSignal(str, object)
+
+    def __init__(self, text, source_lang, target_langs, api_config, services=None, origin=None):
+        super().__init__(text, source_lang, ",".join(target_langs), api_config, services, origin)
+        self.target_langs = list(target_langs)
+        # Targets still to be requested, and the (masked) answers so far
+        self.pending_targets = []
+        self.translations = {}
+        # Targets whose answer passed validation; only these are stored in the memory
+        self.validated_targets = set()
+        self.results = {}
+        # source_lang, or the detected language when it is "auto"
+        self.detected_source = source_lang
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            pool = self.services.api_keys
+            if not (pool.keys if pool else os.getenv("GROQ_API_KEY")):
+                raise ValueError("API key not found in environment variables. Please check your .env file.")
+
+            logger.info("Starting fan-out translation from %s to %s", self.source_lang, self.target_lang)
+            masked_text, spans = protect_formatting(self.text)
+            if self.services.glossary:
+                # Fixed renderings are per language, so only do-not-translate terms apply here
+                masked_text = self.services.glossary.protect(masked_text, spans, None)
+            if has_translatable_text(masked_text):
+                self.translate_targets(masked_text)
+            else:
+                self.translations = {target: masked_text for target in self.target_langs}
+            self.results = {
+                target: restore_formatting(self.translations[target], spans) if target in self.translations
+                else "Translation error: no translation returned for this language"
+                for target in self.target_langs
+            }
+            METRICS.counter("translations_total", "Finished translations", {"result": "ok"}).inc()
+            METRICS.histogram("translation_seconds", "End-to-end translation time").observe(
+                time.perf_counter() - started
+            )
+        except Exception as e:
+            logger.error("Fan-out translation error: %s", e, exc_info=True)
+            METRICS.counter("translations_total", "Finished translations", {"result": "error"}).inc()
+            self.error = e
+            self.results = {target: f"Translation error: {str(e)}" for target in self.target_langs}
+        self.fan_out_complete.emit(self.text, self.results)
+
+    def translate_targets(self, masked_text):
+        """Fill self.translations from the translation memory, then from one request for the rest"""
+        key = masked_text.strip()
+        if self.source_lang == "auto":
+            self.detected_source = detected_language(self.text) or "auto"
+        if self.detected_source in self.target_langs:
+            logger.info("Fan-out: message is already in %s", self.detected_source)
+            self.translations[self.detected_source] = masked_text
+        memory = self.translation_memory
+        if memory:
+            for target in self.target_langs:
+                if target in self.translations:
+                    continue
+                cached = memory.lookup(key, self.source_lang, target)
+                if cached is not None:
+                    self.translations[target] = cached
+        requested = [target for target in self.target_langs if target not in self.translations]
+        logger.info("Fan-out: %d of %d languages need no request",
+                    len(self.target_langs) - len(requested), len(self.target_langs))
+        if not requested:
+            return
+        self.pending_targets = list(requested)
+        self.translate_text(masked_text)
+        if memory:
+            for target in requested:
+                if target in self.validated_targets:
+                    memory.store([(key, self.translations[target])], self.source_lang, target)
+
+    def _try_translation(self, text, examples=None, candidates=1):
+        """Request every pending target at once; raises TranslationValidationError if any are missing"""
+        model = self.api_config["model"]
+        ledger = self.services.usage_ledger
+        if ledger:
+            model = ledger.model_for(model)
+
+        targets = tuple(self.pending_targets)
+        system_prompt = build_fan_out_prompt(targets)
         data = {
             "model": model,
             "messages": [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "<<INPUT>>Hello, how are you doing?<<OUTPUT>>"},
-                {"role": "assistant", "content": "Oi, como você tá?"},
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": f"<<INPUT>>{text}<<OUTPUT>>"},
             ],
-            "temperature": 0.7,  # Increased temperature for more natural, casual language
-            "max_tokens": 1024
+            "temperature": 0.7,
+            "max_tokens": max(256, min(estimate_tokens(text) * 3 * len(targets), model_context_window(model) // 2)),
+            "response_format": {"type": "json_object"},
         }
-        
-        logger.debug("Sending request to Groq API")
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data
+        result = self._post_chat(data, text, estimate_tokens(system_prompt))
+
+        answer = result["choices"][0]["message"]["content"]
+        for target, translated_text in parse_fan_out_answer(answer, targets).items():
+            translated_text, _ = clean_translation(text, translated_text)
+            try:
+                validate_translation(text, translated_text, self.detected_source, target, detected_language)
+            except TranslationValidationError as e:
+                logger.warning("Rejected %s translation in fan-out answer: %s", target, e)
+                continue
+            self.translations[target] = translated_text
+            self.validated_targets.add(target)
+        self.pending_targets = [target for target in targets if target not in self.translations]
+        if self.pending_targets:
+            raise TranslationValidationError(
+                f"No usable translation for {', '.join(self.pending_targets)}", self.translations
+            )
+        return self.translations
+
+
+class TranslationDispatcher(QObject):
+    """Starts translation threads and coalesces identical in-flight requests"""
+
+    def __init__(self, api_config, services=None, parent=None):
+        super().__init__(parent)
+        self.api_config = api_config
+        self.services = services or TranslationServices()
+        # request key -> {"thread": TranslationThread, "waiters": [(text, callback)]}
+        self.in_flight = {}
+        # Threads are kept referenced until they have really finished; the result
+        # signal is emitted from inside run(), before the thread has exited
+        self.running = set()
+        self.coalesced_count = 0
+        # Exception of the translation whose callbacks are running, None on success
+        self.last_error = None
+        # Alternative translations offered with the result whose callbacks are running
+        self.last_alternatives = []
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapse whitespace so trivially different selections share a request"""
+        return " ".join(text.split())
+
+    def request_key(self, text, source_lang, target_lang, fresh=False):
+        return (self.normalize_text(text), source_lang, target_lang, self.api_config["model"], fresh)
+
+    def translate(self, text, source_lang, target_lang, callback, origin=None, fresh=False, stale=None):
+        """Translate text and call callback(original_text, translated_text) when done
+
+        origin names what asked for the translation, for the usage ledger.
+        fresh skips the translation memory to get a new answer from the model.
+        stale is an optional callable; once it returns True, and no other
+        caller has joined the request, no more API requests are sent for it.
+        """
+        key = self.request_key(text, source_lang, target_lang, fresh)
+        if self.join_in_flight(key, text, callback):
+            return
+
+        thread = TranslationThread(
+            text, source_lang, target_lang, self.api_config, self.services, origin, fresh
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            translated_text = result["choices"][0]["message"]["content"].strip()
-            return translated_text
+        if stale is not None:
+            thread.cancelled = lambda: stale() and len(self.in_flight.get(key, {}).get("waiters", ())) <= 1
+        thread.translation_complete.connect(self.on_translation_complete)
+        self.start_thread(key, thread, text, callback)
+
+    def translate_many(self, text, source_lang, target_langs, callback, origin=None):
+        """Translate text into several languages with one request
+
+        callback(original_text, {target: translation}) is called when done;
+        failed languages map to a "Translation error: ..." message.
+        """
+        key = self.request_key(text, source_lang, tuple(target_langs))
+        if self.join_in_flight(key, text, callback):
+            return
+
+        thread = FanOutTranslationThread(
+            text, source_lang, target_langs, self.api_config, self.services, origin
+        )
+        thread.fan_out_complete.connect(self.on_translation_complete)
+        self.start_thread(key, thread, text, callback)
+
+    def start_thread(self, key, thread, text, callback):
+        self.in_flight[key] = {"thread": thread, "waiters": [(text, callback)]}
+        self.running.add(thread)
+        thread.finished.connect(lambda: self.on_thread_finished(thread))
+        thread.start()
+
+    def on_thread_finished(self, thread):
+        self.running.discard(thread)
+        thread.deleteLater()
+
+    def join_in_flight(self, key, text, callback):
+        """Wait for an identical request that is already running; False if there is none"""
+        if key not in self.in_flight:
+            return False
+        self.in_flight[key]["waiters"].append((text, callback))
+        self.coalesced_count += 1
+        logger.info("Coalesced duplicate translation request (total coalesced: %d)", self.coalesced_count)
+        return True
+
+    def on_translation_complete(self, original_text, translated_text):
+        thread = self.sender()
+        key = None
+        for request_key, entry in self.in_flight.items():
+            if entry["thread"] is thread:
+                key = request_key
+                break
+
+        if key is None:
+            logger.warning("Received result for an unknown translation request")
+            return
+
+        entry = self.in_flight.pop(key)
+        self.last_error = thread.error
+        self.last_alternatives = thread.alternatives
+        for waiter_text, callback in entry["waiters"]:
+            try:
+                callback(waiter_text, translated_text)
+            except Exception as e:
+                logger.error("Translation callback failed: %s", e, exc_info=True)
+        self.last_error = None
+        self.last_alternatives = []
+
+
+# Shown in the history until a queued translation arrives
+OUTBOX_PLACEHOLDER = "⏳ Waiting for the translation service, this will fill in automatically..."
+
+
+class TranslationOutbox(QObject):
+    """Crash-safe queue of received messages that could not be translated while offline
+
+    Items live in an OutboxStore until a translation arrives, so they survive
+    crashes and restarts. drain() sends up to max_concurrent items through the
+    dispatcher and stops at the first connectivity failure; the circuit
+    breaker keeps those retries cheap while the API is down.
+    """
+
+    # (item id, original text, translated text or error message)
+    item_finished = pyqtSignal(int, str, str)
+    drained = pyqtSignal(int)
+
+    def __init__(self, path, dispatcher, max_concurrent=2, parent=None):
+        super().__init__(parent)
+        self.dispatcher = dispatcher
+        self.max_concurrent = max(1, max_concurrent)
+        self.active = set()
+        self.delivered = 0
+        self.store = OutboxStore(path)
+
+    def add(self, text, source_lang, target_lang):
+        """Queue text and return (item id, True if it was new)"""
+        return self.store.add(text, source_lang, target_lang)
+
+    def pending(self):
+        return self.store.pending()
+
+    def __len__(self):
+        return len(self.store)
+
+    def drain(self):
+        free = self.max_concurrent - len(self.active)
+        if free <= 0:
+            return
+        for item_id, text, source_lang, target_lang in self.pending():
+            if item_id in self.active:
+                continue
+            if free == 0:
+                break
+            free -= 1
+            self.active.add(item_id)
+            self.dispatcher.translate(
+                text, source_lang, target_lang,
+                lambda original, translated, item_id=item_id: self.on_result(item_id, original, translated),
+                origin="outbox"
+            )
+
+    def on_result(self, item_id, original_text, translated_text):
+        self.active.discard(item_id)
+        error = self.dispatcher.last_error
+        if error is not None and is_connectivity_error(error):
+            self.store.record_attempt(item_id)
+            # Still offline: leave the rest for the next drain
+            return
+        self.store.remove(item_id)
+        self.delivered += 1
+        self.item_finished.emit(item_id, original_text, translated_text)
+        if len(self):
+            self.drain()
+        elif not self.active:
+            self.drained.emit(self.delivered)
+            self.delivered = 0
+
+
+class SpeculativeTranslator(QObject):
+    """Translates the Discord message being typed before the send hotkey is pressed"""
+
+    # Emitted from the keyboard hook thread, handled on the Qt main thread
+    typing_activity = pyqtSignal()
+
+    # Keys that can leave the caret somewhere other than the end of the input
+    CARET_KEYS = ("left", "up", "down", "home", "page up", "page down")
+
+    def __init__(self, main_window, config):
+        super().__init__(main_window)
+        self.main_window = main_window
+        self.config = config
+        self.capturing = False
+        # Capturing selects all and presses Right, which moves the caret to the
+        # end; only do it when the caret is already there. Tracked from the
+        # keyboard only, so mouse clicks inside the text are not seen.
+        self.caret_at_end = True
+        self.current_key = None
+        self.results = {}
+        self.recent_speculations = deque()
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.on_idle)
+        self.typing_activity.connect(self.on_typing_activity)
+
+    @property
+    def enabled(self):
+        return self.config["enabled"]
+
+    def speculation_key(self, text, source_lang, target_lang):
+        """Hash of the normalized text and language pair used to match the hotkey text"""
+        dispatcher = self.main_window.dispatcher
+        normalized = dispatcher.normalize_text(text)
+        raw_key = "\x00".join([normalized, source_lang, target_lang, dispatcher.api_config["model"]])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def hook_keyboard(self):
+        """Watch key presses; must be called after keyboard.unhook_all()"""
+        if self.enabled:
+            keyboard.on_press(self.on_key_event)
+
+    def on_key_event(self, event):
+        if event.name is None:
+            return
+        # Keys the sender pressed are not typing (a send's Enter still empties
+        # the input); asking also lets a capture in progress see real key presses
+        if self.main_window.message_sender.own_key_press(event.name):
+            if event.name == "enter":
+                self.caret_at_end = True
+            return
+        if event.name in self.CARET_KEYS:
+            self.caret_at_end = False
+        elif event.name in ("end", "enter"):
+            # End moves there; Enter sends the message and empties the input
+            self.caret_at_end = True
+        if len(event.name) == 1 or event.name in ("space", "backspace", "delete"):
+            self.typing_activity.emit()
+
+    def on_typing_activity(self):
+        self.idle_timer.start(self.config["idle_delay_ms"])
+
+    def is_discord_focused(self):
+        try:
+            title = win32gui.GetWindowText(win32gui.GetForegroundWindow())
+            return "discord" in title.lower()
+        except Exception:
+            return False
+
+    def within_budget(self):
+        """Allow at most max_per_hour speculative API calls in a rolling hour"""
+        now = time.monotonic()
+        while self.recent_speculations and now - self.recent_speculations[0] > 3600:
+            self.recent_speculations.popleft()
+        return len(self.recent_speculations) < self.config["max_per_hour"]
+
+    def on_idle(self):
+        if not self.enabled or not self.is_discord_focused():
+            return
+        # Speculation is optional, so don't queue it behind a paste or capture
+        if self.main_window.message_sender.busy or self.capturing:
+            return
+        if not self.caret_at_end:
+            logger.debug("Caret may be inside the text, skipping speculative capture")
+            return
+
+        # Select the input box, copy it and put the caret back at the end
+        self.capturing = True
+        self.main_window.message_sender.capture(self.on_captured, select_all=True)
+
+    def on_captured(self, text):
+        self.capturing = False
+        if not text or len(text.strip()) < self.config["min_chars"]:
+            return
+
+        lang_pair = self.main_window.current_send_pair()
+        key = self.speculation_key(text, lang_pair["source"], lang_pair["target"])
+        if key == self.current_key:
+            return
+
+        # Anything speculated for older text is stale now
+        self.current_key = key
+        self.results = {}
+
+        if not self.within_budget():
+            logger.debug("Speculative translation budget exhausted, skipping")
+            return
+
+        self.recent_speculations.append(time.monotonic())
+        logger.debug("Starting speculative translation")
+        self.main_window.dispatcher.translate(
+            text,
+            lang_pair["source"],
+            lang_pair["target"],
+            lambda original, translated, key=key: self.on_speculation_complete(key, translated),
+            origin="speculative",
+            # Newer text was captured; don't pay for this one
+            stale=lambda key=key: key != self.current_key
+        )
+
+    def on_speculation_complete(self, key, translated_text):
+        if key != self.current_key:
+            logger.debug("Discarding stale speculative translation")
+            return
+        if translated_text.startswith("Translation error:"):
+            return
+        self.results[key] = translated_text
+
+    def take(self, text, source_lang, target_lang):
+        """Return the speculative translation for text, or None if there is no match"""
+        if not self.enabled:
+            return None
+        key = self.speculation_key(text, source_lang, target_lang)
+        translated_text = self.results.pop(key, None)
+        if translated_text is not None:
+            self.current_key = None
+        return translated_text
+
+
+class MetricsDashboard(QDialog):
+    """Live view of the metrics registry, refreshed once a second"""
+
+    REFRESH_MS = 1000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Metrics")
+        self.setMinimumSize(560, 420)
+
+        layout = QVBoxLayout()
+        self.view = QTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def showEvent(self, event):
+        self.timer.start(self.REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        lines = []
+        for (name, labels), metric in METRICS.items():
+            label = name + MetricsRegistry.format_labels(labels)
+            if isinstance(metric, Histogram):
+                if not metric.count:
+                    continue
+                lines.append(
+                    f"{label:<52} n={metric.count:<6} p50={metric.percentile(0.5) * 1000:9.1f} ms  "
+                    f"p90={metric.percentile(0.9) * 1000:9.1f} ms  p99={metric.percentile(0.99) * 1000:9.1f} ms"
+                )
+            elif isinstance(metric, Gauge):
+                value = metric.get()
+                lines.append(f"{label:<52} {value:.3f}" if isinstance(value, float) else f"{label:<52} {value}")
+            else:
+                lines.append(f"{label:<52} {metric.value}")
+        scroll = self.view.verticalScrollBar().value()
+        self.view.setPlainText("\n".join(lines) or "No metrics recorded yet")
+        self.view.verticalScrollBar().setValue(scroll)
+
+
+class UsageDialog(QDialog):
+    """Token usage for today and the last week, from the usage ledger"""
+
+    def __init__(self, ledger, parent=None):
+        super().__init__(parent)
+        self.ledger = ledger
+        self.setWindowTitle("Usage")
+        self.setMinimumSize(560, 460)
+
+        layout = QVBoxLayout()
+        self.view = QTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.view)
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        layout.addWidget(refresh_button)
+        self.setLayout(layout)
+        self.refresh()
+
+    @staticmethod
+    def table(title, rows):
+        lines = [title, f"{'':<24}{'requests':>10}{'prompt':>12}{'completion':>12}{'avg latency':>13}"]
+        for value, requests_count, prompt_tokens, completion_tokens, latency in rows:
+            lines.append(f"{value:<24}{requests_count:>10}{prompt_tokens:>12}{completion_tokens:>12}{latency * 1000:>10.0f} ms")
+        if not rows:
+            lines.append("  no requests")
+        return "\n".join(lines) + "\n"
+
+    def refresh(self):
+        ledger = self.ledger
+        if ledger.daily_budget:
+            used = ledger.budget_used()
+            state = ("cache only" if used >= 1
+                     else f"using {ledger.cheaper_model}" if used >= ledger.degrade_at and ledger.cheaper_model
+                     else "normal")
+            header = f"Today: {ledger.tokens_today} of {ledger.daily_budget} tokens ({used:.0%}), {state}\n"
         else:
-            error_msg = f"API error: {response.status_code} - {response.text}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
+            header = f"Today: {ledger.tokens_today} tokens (no daily budget)\n"
+        sections = [header]
+        sections.append(self.table("Today by language pair", ledger.summary("pair")))
+        sections.append(self.table("Today by shortcut", ledger.summary("origin")))
+        sections.append(self.table("Today by model", ledger.summary("model")))
+        sections.append(self.table("Last 7 days", ledger.summary("day", days=7)))
+        self.view.setPlainText("\n".join(sections))
 
 
 class SettingsDialog(QDialog):
-    def __init__(self, config, parent=None):
+    def __init__(self, config_service, parent=None):
         super().__init__(parent)
-        self.config = config
+        self.config_service = config_service
+        self.config = config_service.config
         self.setWindowTitle("AI Translator Settings")
         self.setMinimumWidth(400)
         
@@ -156,8 +1300,11 @@ class SettingsDialog(QDialog):
         # API Key status
         api_layout = QHBoxLayout()
         api_layout.addWidget(QLabel("API Key Status:"))
-        api_key = os.getenv("GROQ_API_KEY")
-        if api_key:
+        api_keys = load_api_keys(config_service.config["api"].get("key_file"))
+        if len(api_keys) > 1:
+            status_label = QLabel(f"✅ {len(api_keys)} API keys found, requests are spread across them")
+            status_label.setStyleSheet("color: #43B581;")  # Green color
+        elif api_keys:
             status_label = QLabel("✅ API Key found in environment")
             status_label.setStyleSheet("color: #43B581;")  # Green color
         else:
@@ -167,7 +1314,7 @@ class SettingsDialog(QDialog):
         layout.addLayout(api_layout)
         
         # Add info label about .env
-        env_info = QLabel("API key should be set in the .env file as GROQ_API_KEY")
+        env_info = QLabel("API key should be set in the .env file as GROQ_API_KEY (or several in GROQ_API_KEYS)")
         env_info.setStyleSheet("color: #B5BAC1; font-size: 11px;")
         layout.addWidget(env_info)
         
@@ -176,10 +1323,10 @@ class SettingsDialog(QDialog):
         lang_layout.addWidget(QLabel("Default Language:"))
         self.lang_combo = QComboBox()
         
-        for pair in self.config["ui"]["language_pairs"]:
+        for pair in self.config["ui"].get("language_pairs", []):
             self.lang_combo.addItem(pair["name"])
         
-        self.lang_combo.setCurrentIndex(self.config["ui"]["default_language_pair"])
+        self.lang_combo.setCurrentIndex(self.config["ui"].get("default_language_pair", 0))
         lang_layout.addWidget(self.lang_combo)
         layout.addLayout(lang_layout)
         
@@ -209,25 +1356,66 @@ class SettingsDialog(QDialog):
         self.setLayout(layout)
     
     def save_settings(self):
-        # Don't save API key, it's managed through environment variables
-        self.config["ui"]["default_language_pair"] = self.lang_combo.currentIndex()
-        self.config["shortcuts"]["translate_and_send"] = self.translate_send_shortcut.text()
-        self.config["shortcuts"]["translate_selected"] = self.translate_selected_shortcut.text()
-        
-        # Save config without API key
-        save_config = self.config.copy()
-        save_config["api"]["api_key"] = ""
-        
-        with open("config.json", "w") as f:
-            json.dump(save_config, f, indent=4)
+        # The API key is never written; it's managed through environment variables
+        self.config_service.update({
+            "ui": {"default_language_pair": self.lang_combo.currentIndex()},
+            "shortcuts": {
+                "translate_and_send": self.translate_send_shortcut.text(),
+                "translate_selected": self.translate_selected_shortcut.text()
+            }
+        })
         
         logger.info("Settings saved successfully")
         self.accept()
 
 
+class HistoryEntry:
+    """A translation in the history with the alternatives the model offered for it
+
+    "Translate Again" steps through the candidates locally and only asks the
+    API for more once every one of them has been shown.
+    """
+
+    def __init__(self, original_text, lang_pair, candidates):
+        self.original_text = original_text
+        self.lang_pair = lang_pair
+        self.candidates = list(candidates)
+        self.index = 0
+        # MessageItem showing the translation
+        self.widget = None
+        # A request for more candidates is in flight
+        self.pending = False
+
+    @property
+    def current(self):
+        return self.candidates[self.index]
+
+    def next_candidate(self):
+        """Move to the next unseen candidate; None when they are used up"""
+        if self.index + 1 >= len(self.candidates):
+            return None
+        self.index += 1
+        return self.current
+
+    def add_candidates(self, candidates):
+        """Append new candidates and move to the first of them; starts over if none are new"""
+        new = []
+        for candidate in candidates:
+            if candidate not in self.candidates and candidate not in new:
+                new.append(candidate)
+        self.index = len(self.candidates) if new else 0
+        self.candidates.extend(new)
+        return len(new)
+
+
 class MessageItem(QWidget):
+    # Emitted with this widget when "Translate Again" is chosen
+    translate_again = pyqtSignal(object)
+
     def __init__(self, text, is_original=True, parent=None):
         super().__init__(parent)
+        # HistoryEntry for translations that can be translated again
+        self.entry = None
         self.layout = QVBoxLayout(self)
         self.layout.setContentsMargins(5, 5, 5, 5)
         self.layout.setSpacing(4)
@@ -315,15 +1503,24 @@ class MessageItem(QWidget):
         copy_action.triggered.connect(lambda: pyperclip.copy(self.message_label.text()))
         
         resend_action = menu.addAction("Translate Again")
-        resend_action.triggered.connect(lambda: self.parent().retranslate_message(self.message_label.text()))
+        resend_action.setEnabled(self.entry is not None)
+        resend_action.triggered.connect(lambda: self.translate_again.emit(self))
         
         menu.exec_(self.mapToGlobal(position))
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, config):
+    # Emitted from the sampler thread with the path of the written profile
+    profile_finished = pyqtSignal(object)
+    # (endpoint, old state, new state) from the circuit breaker
+    circuit_changed = pyqtSignal(str, str, str)
+    # Command line forwarded by a second launch of the app
+    command_line_received = pyqtSignal(list)
+
+    def __init__(self, config_service):
         super().__init__()
-        self.config = config
+        self.config_service = config_service
+        self.config = config_service.config
         self.setWindowTitle("AI Translator")
         self.setMinimumSize(1000, 700)  # Slightly larger default size
         
@@ -474,8 +1671,76 @@ class MainWindow(QMainWindow):
         h_splitter.setSizes([1, 1])
         main_layout.addWidget(h_splitter)
         
-        # Create translation thread
-        self.translation_thread = None
+        # Create segment-level translation memory
+        self.translation_memory = None
+        if self.config["translation_memory"]["enabled"]:
+            try:
+                self.translation_memory = TranslationMemory(
+                    self.config["translation_memory"]["path"],
+                    self.config["translation_memory"]["fuzzy"]
+                )
+            except Exception as e:
+                logger.error("Failed to open translation memory: %s", e, exc_info=True)
+        
+        # Game terms, nicknames and brand names with fixed renderings
+        glossary = None
+        if self.config["glossary"]["enabled"]:
+            try:
+                glossary = Glossary.from_config(self.config["glossary"])
+            except Exception as e:
+                logger.error("Failed to load glossary: %s", e, exc_info=True)
+        
+        # Shared by all translation threads
+        self.services = TranslationServices(
+            translation_memory=self.translation_memory,
+            api_keys=ApiKeyPool.from_config(self.config["api"]),
+            token_stats=TokenStats(),
+            glossary=glossary,
+            circuit_breaker=CircuitBreaker("Groq API", self.config["circuit_breaker"]),
+            concurrency=self.create_concurrency_limiter(),
+            usage_ledger=self.create_usage_ledger()
+        )
+        # Transitions happen on worker threads; the signal moves them to the UI thread
+        self.services.circuit_breaker.listeners.append(lambda *transition: self.circuit_changed.emit(*transition))
+        
+        # Create translation dispatcher
+        self.dispatcher = TranslationDispatcher(self.config["api"], self.services, self)
+        
+        # Received messages that failed while offline, translated when the API is back
+        self.outbox = None
+        self.outbox_messages = {}  # outbox item id -> placeholder MessageItem
+        if self.config["outbox"]["enabled"]:
+            try:
+                self.outbox = TranslationOutbox(
+                    self.config["outbox"]["path"], self.dispatcher, self.config["outbox"]["max_concurrent"], self
+                )
+                self.outbox.item_finished.connect(self.on_outbox_item_finished)
+                self.outbox.drained.connect(self.on_outbox_drained)
+            except Exception as e:
+                logger.error("Failed to open outbox: %s", e, exc_info=True)
+        
+        # Pastes translations into Discord one at a time
+        self.message_sender = MessageSender(metrics=METRICS, parent=self)
+        
+        # Speculative pre-translation of the message being typed (opt-in)
+        self.speculator = SpeculativeTranslator(self, self.config["speculative"])
+        
+        # Expose internal counters through the metrics registry
+        self.register_metrics()
+        self.metrics_dashboard = None
+        
+        # Diagnostics for UI jank and slow hotkeys
+        profiling = self.config["profiling"]
+        self.stall_detector = (
+            StallDetector(profiling["stall_threshold_ms"], self) if profiling["stall_detector"] else None
+        )
+        self.sampler = None
+        self.profile_finished.connect(self.on_profile_finished)
+        self.profile_request_timer = QTimer(self)
+        self.profile_request_timer.timeout.connect(self.check_profile_request)
+        self.profile_request_timer.start(1000)
+        if self.config["metrics"]["http_enabled"]:
+            start_metrics_server(self.config["metrics"]["http_port"])
         
         # Set up system tray
         self.setup_system_tray()
@@ -483,9 +1748,15 @@ class MainWindow(QMainWindow):
         # Register keyboard shortcuts
         self.register_shortcuts()
         
+        # React to settings changes from the dialog, tray menu or config.json
+        self.config_service.config_changed.connect(self.on_config_changed)
+        
         # Create translation popup
         self.translation_popup = TranslationPopup()
         
+        # Bring back messages queued while offline in an earlier session
+        self.restore_outbox()
+        
         # Show the window
         self.show()
     
@@ -500,7 +1771,7 @@ class MainWindow(QMainWindow):
                 self.tray_icon.setIcon(QIcon(icon_path))
                 self.setWindowIcon(QIcon(icon_path))
             except Exception as e:
-                logger.error(f"Failed to set icon: {str(e)}", exc_info=True)
+                logger.error("Failed to set icon: %s", e, exc_info=True)
         
         # Create tray menu
         tray_menu = QMenu()
@@ -516,7 +1787,7 @@ class MainWindow(QMainWindow):
             {"name": "Auto-detect to Portuguese", "source": "auto", "target": "pt"}
         ]
         
-        default_send_pair = self.config["ui"].get("default_send_pair", "English to Portuguese")
+        default_send_pair = self.config["ui"]["default_send_pair"]
         
         for pair in send_pairs:
             action = QAction(pair["name"], self, checkable=True)
@@ -538,7 +1809,7 @@ class MainWindow(QMainWindow):
             {"name": "Auto-detect to English", "source": "auto", "target": "en"}
         ]
         
-        default_receive_pair = self.config["ui"].get("default_receive_pair", "Portuguese to English")
+        default_receive_pair = self.config["ui"]["default_receive_pair"]
         
         for pair in receive_pairs:
             action = QAction(pair["name"], self, checkable=True)
@@ -556,6 +1827,13 @@ class MainWindow(QMainWindow):
         show_action.triggered.connect(self.show)
         settings_action = QAction("Settings", self)
         settings_action.triggered.connect(self.show_settings)
+        usage_action = QAction("Usage", self)
+        usage_action.triggered.connect(self.show_usage)
+        usage_action.setVisible(self.services.usage_ledger is not None)
+        metrics_action = QAction("Metrics", self)
+        metrics_action.triggered.connect(self.show_metrics)
+        self.profile_action = QAction(f"Profile for {self.config['profiling']['sample_seconds']} s", self)
+        self.profile_action.triggered.connect(lambda: self.start_profiling())
         about_action = QAction("About", self)
         about_action.triggered.connect(self.show_about)
         quit_action = QAction("Quit", self)
@@ -563,12 +1841,22 @@ class MainWindow(QMainWindow):
         
         tray_menu.addAction(show_action)
         tray_menu.addAction(settings_action)
+        tray_menu.addAction(usage_action)
+        tray_menu.addAction(metrics_action)
+        tray_menu.addAction(self.profile_action)
         tray_menu.addAction(about_action)
         tray_menu.addSeparator()
         tray_menu.addAction(quit_action)
         
         self.tray_icon.setContextMenu(tray_menu)
+        self.update_tray_tooltip()
         self.tray_icon.show()
+        
+        # Keep the endpoint health in the tooltip current
+        self.circuit_changed.connect(self.on_circuit_changed)
+        self.tooltip_timer = QTimer(self)
+        self.tooltip_timer.timeout.connect(self.update_tray_tooltip)
+        self.tooltip_timer.start(5000)
     
     def register_shortcuts(self):
         try:
@@ -588,251 +1876,215 @@ class MainWindow(QMainWindow):
                 suppress=True
             )
             
+            if self.config["shortcuts"].get("translate_fan_out"):
+                keyboard.add_hotkey(
+                    self.config["shortcuts"]["translate_fan_out"],
+                    self.translate_fan_out,
+                    suppress=True
+                )
+            
+            # Re-attach the speculative typing watcher removed by unhook_all
+            self.speculator.hook_keyboard()
+            
             logger.info("Keyboard shortcuts registered successfully")
         except Exception as e:
-            logger.error(f"Failed to register keyboard shortcuts: {str(e)}", exc_info=True)
+            logger.error("Failed to register keyboard shortcuts: %s", e, exc_info=True)
             QMessageBox.critical(
                 self,
                 "Error",
                 f"Failed to register keyboard shortcuts: {str(e)}\n\nThe application may not work correctly."
             )
     
-    def get_selected_text(self):
-        logger.info("Getting selected text using multiple methods")
-        
-        # Try different methods to get text
-        text = None
-        
-        # Method 1: Try getting text from active window directly
+    def get_selected_text(self, callback):
+        """Capture the selected text and call callback(text), with None if no method found any
+
+        The copy runs through the message sender, so it waits behind any
+        paste in progress and never blocks the UI thread.
+        """
+        logger.info("Getting selected text")
+        started = time.perf_counter()
         try:
-            hwnd = win32gui.GetForegroundWindow()
-            window_class = win32gui.GetClassName(hwnd)
-            
-            # Special handling for Discord
-            if "discord" in window_class.lower():
-                text = self.get_discord_selected_text()
-                if text:
-                    logger.info("Successfully got text from Discord")
-                    return text
-        except Exception as e:
-            logger.debug(f"Discord-specific method failed: {e}")
+            # Only labels the capture metrics; Discord is copied like any other window
+            in_discord = "discord" in win32gui.GetClassName(win32gui.GetForegroundWindow()).lower()
+        except Exception:
+            in_discord = False
 
-        # Method 2: Try Windows clipboard method
-        text = self.get_text_via_clipboard()
-        if text:
-            logger.info("Successfully got text via clipboard")
-            return text
-        
-        # Method 3: Try OCR if text is still not found
-        text = self.get_text_via_ocr()
-        if text:
-            logger.info("Successfully got text via OCR")
-            return text
-        
-        logger.warning("Failed to get text using all methods")
-        return None
+        def captured(text):
+            method = "discord" if in_discord else "clipboard"
+            if not text:
+                text = self.get_text_via_ocr()
+                method = "ocr" if text else "failed"
+            if text:
+                logger.info("Successfully got text via %s", method)
+            else:
+                logger.warning("Failed to get text using all methods")
+            METRICS.histogram("capture_seconds", "Time to capture selected text", {"method": method}).observe(
+                time.perf_counter() - started
+            )
+            callback(text)
 
-    def get_discord_selected_text(self):
-        """Attempt to get selected text directly from Discord"""
-        # Send Discord's copy shortcut (Ctrl+C)
-        keyboard.send('ctrl+c')
-        time.sleep(0.1)
-        
-        try:
-            win32clipboard.OpenClipboard()
-            text = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
-            win32clipboard.CloseClipboard()
-            return text
-        except:
-            return None
+        self.message_sender.capture(captured)
 
     def get_text_via_ocr(self):
         """Use OCR to get text from screen selection"""
         # This would require adding pytesseract and PIL to requirements.txt
         try:
-            # Take screenshot of selected area
-            import pytesseract
-            from PIL import ImageGrab
-            
-            # Get screen coordinates (would need to implement selection UI)
-            screenshot = ImageGrab.grab(bbox=None)  # bbox would be selection coordinates
-            text = pytesseract.image_to_string(screenshot)
-            return text.strip()
+            # Screenshot and OCR run in the engine worker (bbox would be selection coordinates)
+            return ENGINE.ocr(bbox=None)
         except:
             return None
     
-    def get_text_via_clipboard(self):
-        """Get text using clipboard method"""
-        logger.info("Attempting to get text via clipboard")
-        
-        # Store original clipboard content
-        original_clipboard = None
-        try:
-            original_clipboard = pyperclip.paste()
-            logger.debug(f"Original clipboard content: {original_clipboard[:50]}...")
-        except Exception as e:
-            logger.warning(f"Could not get original clipboard content: {str(e)}")
-        
-        # Copy selected text
-        keyboard.send('ctrl+c')
-        time.sleep(0.2)  # Increased delay to ensure clipboard updates
-        
-        # Get text from clipboard
-        try:
-            text = pyperclip.paste()
-            if text and text != original_clipboard:
-                logger.debug(f"Got selected text: {text[:50]}...")
-                # Restore original clipboard content
-                if original_clipboard:
-                    pyperclip.copy(original_clipboard)
-                return text
-        except Exception as e:
-            logger.warning(f"Could not get text from clipboard: {str(e)}")
-        
-        return None
-    
     def translate_and_send(self):
         logger.info("translate_and_send shortcut triggered")
+        METRICS.counter("hotkey_presses_total", "Global hotkey presses", {"action": "translate_and_send"}).inc()
         # Move to the main thread before getting selected text
         QTimer.singleShot(0, self._translate_and_send)
 
     def _translate_and_send(self):
-        # Get the selected text
-        text = self.get_selected_text()
-        
+        self.get_selected_text(self.translate_and_send_text)
+
+    def translate_and_send_text(self, text):
         if not text:
             logger.warning("No text selected")
             self.show_notification("Error", "No text selected")
             return
         
-        logger.info(f"Translating text: {text[:50]}...")
+        logger.info("Translating text: %s", Preview(text))
         
         # Add the original message to the list
         self.add_message(text, True, "sent")  # Added message type
         
         # Play sound if enabled
-        if self.config["sounds"]["enable_sounds"]:
-            try:
-                playsound(self.config["sounds"]["translation_start"])
-                logger.debug("Played translation_start sound")
-            except Exception as e:
-                logger.warning(f"Could not play sound: {str(e)}")
+        self.play_sound("translation_start")
         
         # Get the current language pair for sending
-        for pair in self.tray_icon.contextMenu().actions()[0].menu().actions():
-            if pair.isChecked():
-                lang_pair = pair.data()
-                break
+        lang_pair = self.current_send_pair()
+        
+        # Use the speculative translation if it was made for exactly this text
+        speculative_text = self.speculator.take(text, lang_pair["source"], lang_pair["target"])
+        if speculative_text is not None:
+            logger.info("Using speculative translation")
+            self.on_translate_and_send_complete(text, speculative_text, lang_pair)
+            return
         
         # Start translation in a separate thread
-        self.translation_thread = TranslationThread(
-            text, 
-            lang_pair["source"], 
+        self.dispatcher.translate(
+            text,
+            lang_pair["source"],
+            lang_pair["target"],
+            lambda original, translated: self.on_translate_and_send_complete(original, translated, lang_pair),
+            origin="translate_and_send"
+        )
+    
+    def current_send_pair(self):
+        """Return the language pair checked in the Send Translation tray menu"""
+        for pair in self.tray_icon.contextMenu().actions()[0].menu().actions():
+            if pair.isChecked():
+                return pair.data()
+    
+    def current_receive_pair(self):
+        """Return the language pair checked in the Receive Translation tray menu"""
+        for pair in self.tray_icon.contextMenu().actions()[1].menu().actions():
+            if pair.isChecked():
+                return pair.data()
+    
+    def handle_command_line(self, args):
+        """Act on a command line given at startup or forwarded by a second launch"""
+        import instance
+        options = instance.build_parser().parse_args(args)
+        logger.info("Handling command line: %s", args)
+        if options.translate:
+            self.translate_from_command_line(options.translate)
+        if options.settings:
+            self.show_settings()
+        if options.show or not (options.translate or options.settings):
+            self.showNormal()
+            self.raise_()
+            self.activateWindow()
+    
+    def translate_from_command_line(self, text):
+        lang_pair = self.current_receive_pair()
+        self.add_message(text, True, "received")
+        self.play_sound("translation_start")
+        self.dispatcher.translate(
+            text,
+            lang_pair["source"],
             lang_pair["target"],
-            self.config["api"]
+            lambda original, translated: self.on_translate_selected_complete(original, translated, lang_pair),
+            origin="command_line"
         )
-        self.translation_thread.translation_complete.connect(self.on_translate_and_send_complete)
-        self.translation_thread.start()
     
-    def on_translate_and_send_complete(self, original_text, translated_text):
+    def on_translate_and_send_complete(self, original_text, translated_text, lang_pair=None):
         # Preserve formatting
         translated_text = self.preserve_formatting(original_text, translated_text)
         logger.info("Translation completed, sending message")
         # Play sound if enabled
-        if self.config["sounds"]["enable_sounds"]:
-            try:
-                playsound(self.config["sounds"]["translation_complete"])
-                logger.debug("Played translation_complete sound")
-            except Exception as e:
-                logger.warning(f"Could not play sound: {str(e)}")
+        self.play_sound("translation_complete")
         
         # Check if the translation contains an error message
         if translated_text.startswith("Translation error:"):
-            logger.error(f"Translation error: {translated_text}")
+            logger.error("Translation error: %s", translated_text)
             self.show_notification("Error", translated_text)
             self.add_message(translated_text, False, "sent")  # Added message_type
             return
         
-        logger.debug(f"Translated text: {translated_text[:50]}...")
+        logger.debug("Translated text: %s", Preview(translated_text))
         
         # Add the translated message to the list
-        self.add_message(translated_text, False, "sent")  # Added message_type
-        
-        # Set the translated text to clipboard
-        pyperclip.copy(translated_text)
-        logger.debug("Copied translated text to clipboard")
-        
-        # Simulate Ctrl+A to select all text
-        logger.debug("Simulating Ctrl+A to select all text")
-        keyboard.press_and_release('ctrl+a')
-        time.sleep(0.1)
+        entry = self.history_entry(original_text, translated_text, lang_pair)
+        self.add_message(translated_text, False, "sent", entry=entry)  # Added message_type
         
-        # Simulate Ctrl+V to paste the translated text
-        logger.debug("Simulating Ctrl+V to paste translated text")
-        keyboard.press_and_release('ctrl+v')
-        time.sleep(0.1)
-        
-        # Simulate Enter to send the message
-        logger.debug("Simulating Enter to send message")
-        keyboard.press_and_release('enter')
+        # Paste over the input box and press Enter without blocking the UI
+        self.message_sender.enqueue(translated_text)
     
     def translate_selected(self):
         logger.info("translate_selected shortcut triggered")
+        METRICS.counter("hotkey_presses_total", "Global hotkey presses", {"action": "translate_selected"}).inc()
         # Move to the main thread before getting selected text
         QTimer.singleShot(0, self._translate_selected)
 
     def _translate_selected(self):
-        # Get the selected text
-        text = self.get_selected_text()
-        
+        self.get_selected_text(self.translate_selected_text)
+
+    def translate_selected_text(self, text):
         if not text:
             logger.warning("No text selected")
             self.show_notification("Error", "No text selected")
             return
         
-        logger.info(f"Translating text: {text[:50]}...")
+        logger.info("Translating text: %s", Preview(text))
         
         # Add the original message to the list
         self.add_message(text, True, "received")  # Changed to "received"
         
         # Play sound if enabled
-        if self.config["sounds"]["enable_sounds"]:
-            try:
-                playsound(self.config["sounds"]["translation_start"])
-                logger.debug("Played translation_start sound")
-            except Exception as e:
-                logger.warning(f"Could not play sound: {str(e)}")
+        self.play_sound("translation_start")
         
         # Get the current language pair for receiving
-        for pair in self.tray_icon.contextMenu().actions()[1].menu().actions():
-            if pair.isChecked():
-                lang_pair = pair.data()
-                break
+        lang_pair = self.current_receive_pair()
         
         # Start translation in a separate thread
-        self.translation_thread = TranslationThread(
-            text, 
-            lang_pair["source"], 
+        self.dispatcher.translate(
+            text,
+            lang_pair["source"],
             lang_pair["target"],
-            self.config["api"]
+            lambda original, translated: self.on_translate_selected_complete(original, translated, lang_pair),
+            origin="translate_selected"
         )
-        self.translation_thread.translation_complete.connect(self.on_translate_selected_complete)
-        self.translation_thread.start()
         
         # Show the window
         self.show()
         self.activateWindow()
     
-    def on_translate_selected_complete(self, original_text, translated_text):
+    def on_translate_selected_complete(self, original_text, translated_text, lang_pair=None):
         # Play sound if enabled
-        if self.config["sounds"]["enable_sounds"]:
-            try:
-                playsound(self.config["sounds"]["translation_complete"])
-            except Exception as e:
-                logger.warning(f"Could not play sound: {str(e)}")
+        self.play_sound("translation_complete")
         
         # Check for errors
         if translated_text.startswith("Translation error:"):
+            if lang_pair and self.outbox is not None and is_connectivity_error(self.dispatcher.last_error):
+                self.queue_offline_translation(original_text, lang_pair)
+                return
             self.show_notification("Error", translated_text)
             return
         
@@ -841,8 +2093,84 @@ class MainWindow(QMainWindow):
         self.translation_popup.show_translation(original_text, translated_text, cursor_pos)
         
         # Still add to history
-        self.add_message(original_text, True, "received")
-        self.add_message(translated_text, False, "received")
+        entry = self.history_entry(original_text, translated_text, lang_pair)
+        self.add_message(original_text, True, "received", entry=entry)
+        self.add_message(translated_text, False, "received", entry=entry)
+    
+    def translate_fan_out(self):
+        logger.info("translate_fan_out shortcut triggered")
+        METRICS.counter("hotkey_presses_total", "Global hotkey presses", {"action": "translate_fan_out"}).inc()
+        # Move to the main thread before getting selected text
+        QTimer.singleShot(0, self._translate_fan_out)
+    
+    def _translate_fan_out(self):
+        self.get_selected_text(self.translate_fan_out_text)
+
+    def translate_fan_out_text(self, text):
+        """Translate text into every fan_out target language with one request"""
+        if not text:
+            logger.warning("No text selected")
+            self.show_notification("Error", "No text selected")
+            return
+        
+        targets = self.config["fan_out"]["targets"]
+        logger.info("Translating text into %s: %s", ", ".join(targets), Preview(text))
+        self.add_message(text, True, "received")
+        self.play_sound("translation_start")
+        self.dispatcher.translate_many(
+            text,
+            self.config["fan_out"]["source"],
+            targets,
+            self.on_fan_out_complete,
+            origin="fan_out"
+        )
+    
+    def on_fan_out_complete(self, original_text, translations):
+        self.play_sound("translation_complete")
+        
+        if all(text.startswith("Translation error:") for text in translations.values()):
+            self.show_notification("Error", next(iter(translations.values())))
+            return
+        
+        # All languages together in the popup near the cursor
+        self.translation_popup.show_translations(original_text, translations, QCursor.pos())
+        self.add_message(format_translations(translations), False, "received")
+    
+    def queue_offline_translation(self, text, lang_pair):
+        """Keep a received message in the outbox and show a placeholder until it is translated"""
+        item_id, added = self.outbox.add(text, lang_pair["source"], lang_pair["target"])
+        if not added:
+            self.show_notification("Offline", "This message is already queued for translation.")
+            return
+        self.outbox_messages[item_id] = self.add_message(OUTBOX_PLACEHOLDER, False, "received")
+        self.show_notification("Offline", "Translation queued; it will appear in the history when the API is reachable.")
+    
+    def restore_outbox(self):
+        """Show placeholders for messages queued before the last exit and try to send them"""
+        if self.outbox is None:
+            return
+        pending = self.outbox.pending()
+        for item_id, text, _, _ in pending:
+            self.add_message(text, True, "received")
+            self.outbox_messages[item_id] = self.add_message(OUTBOX_PLACEHOLDER, False, "received")
+        if pending:
+            logger.info("Restored %d queued translations from the outbox", len(pending))
+        self.outbox_timer = QTimer(self)
+        self.outbox_timer.timeout.connect(self.outbox.drain)
+        self.outbox_timer.start(self.config["outbox"]["retry_seconds"] * 1000)
+        self.outbox.drain()
+    
+    def on_outbox_item_finished(self, item_id, original_text, translated_text):
+        message_widget = self.outbox_messages.pop(item_id, None)
+        if message_widget is not None:
+            message_widget.message_label.setText(translated_text)
+        else:
+            self.add_message(original_text, True, "received")
+            self.add_message(translated_text, False, "received")
+    
+    def on_outbox_drained(self, delivered):
+        if delivered:
+            self.show_notification("Back Online", f"Translated {delivered} queued message{'s' if delivered != 1 else ''}.")
     
     def translate_input(self):
         # Get text from input field
@@ -856,33 +2184,24 @@ class MainWindow(QMainWindow):
         self.add_message(text, True)
         
         # Play sound if enabled
-        if self.config["sounds"]["enable_sounds"]:
-            try:
-                playsound(self.config["sounds"]["translation_start"])
-            except Exception as e:
-                logger.warning(f"Could not play sound: {str(e)}")
+        self.play_sound("translation_start")
         
         # Get the current language pair
         lang_pair_index = self.lang_combo.currentIndex()
         lang_pair = self.config["ui"]["language_pairs"][lang_pair_index]
         
         # Start translation in a separate thread
-        self.translation_thread = TranslationThread(
-            text, 
-            lang_pair["source"], 
+        self.dispatcher.translate(
+            text,
+            lang_pair["source"],
             lang_pair["target"],
-            self.config["api"]
+            lambda original, translated: self.on_translate_input_complete(original, translated, lang_pair),
+            origin="input_box"
         )
-        self.translation_thread.translation_complete.connect(self.on_translate_input_complete)
-        self.translation_thread.start()
     
-    def on_translate_input_complete(self, original_text, translated_text):
+    def on_translate_input_complete(self, original_text, translated_text, lang_pair=None):
         # Play sound if enabled
-        if self.config["sounds"]["enable_sounds"]:
-            try:
-                playsound(self.config["sounds"]["translation_complete"])
-            except Exception as e:
-                logger.warning(f"Could not play sound: {str(e)}")
+        self.play_sound("translation_complete")
         
         # Check if the translation contains an error message
         if translated_text.startswith("Translation error:"):
@@ -891,7 +2210,7 @@ class MainWindow(QMainWindow):
             return
         
         # Add the translated message to the list
-        self.add_message(translated_text, False)
+        self.add_message(translated_text, False, entry=self.history_entry(original_text, translated_text, lang_pair))
         
         # Clear the input field
         self.clear_input()
@@ -899,9 +2218,14 @@ class MainWindow(QMainWindow):
     def clear_input(self):
         self.text_input.clear()
     
-    def add_message(self, text, is_original, message_type="sent", detected_lang=None):
+    def add_message(self, text, is_original, message_type="sent", detected_lang=None, entry=None):
         # Create a custom widget for the message
         message_widget = MessageItem(text, is_original)
+        if entry is not None:
+            message_widget.entry = entry
+            message_widget.translate_again.connect(self.retranslate_message)
+            if not is_original:
+                entry.widget = message_widget
         
         # Create a list item and set its size
         item = QListWidgetItem()
@@ -919,9 +2243,76 @@ class MainWindow(QMainWindow):
         
         # Add language indicator
         message_widget.add_language_indicator(detected_lang)
+        return message_widget
 
+    def history_entry(self, original_text, translated_text, lang_pair):
+        """HistoryEntry for a finished translation, with the alternatives that came with it"""
+        if not lang_pair:
+            return None
+        return HistoryEntry(original_text, lang_pair, [translated_text] + self.dispatcher.last_alternatives)
+    
+    def retranslate_message(self, message_widget):
+        """Show the next alternative translation, asking the API for more once they are used up"""
+        entry = message_widget.entry
+        if entry is None or entry.pending:
+            return
+        if entry.next_candidate() is not None:
+            METRICS.counter("translate_again_total", "Translate Again requests", {"source": "cached"}).inc()
+            self.show_candidate(entry)
+            return
+        METRICS.counter("translate_again_total", "Translate Again requests", {"source": "api"}).inc()
+        logger.info("All %d candidates shown, requesting new translations", len(entry.candidates))
+        entry.pending = True
+        self.play_sound("translation_start")
+        self.dispatcher.translate(
+            entry.original_text,
+            entry.lang_pair["source"],
+            entry.lang_pair["target"],
+            lambda original, translated: self.on_retranslate_complete(entry, translated),
+            origin="translate_again",
+            fresh=True
+        )
+    
+    def on_retranslate_complete(self, entry, translated_text):
+        entry.pending = False
+        self.play_sound("translation_complete")
+        if translated_text.startswith("Translation error:"):
+            self.show_notification("Error", translated_text)
+            return
+        entry.add_candidates([translated_text] + self.dispatcher.last_alternatives)
+        self.show_candidate(entry)
+    
+    def show_candidate(self, entry):
+        entry.widget.message_label.setText(entry.current)
+        entry.widget.setToolTip(f"Translation {entry.index + 1} of {len(entry.candidates)}")
+    
+    def update_tray_tooltip(self):
+        self.tray_icon.setToolTip(f"AI Translator\n{self.services.circuit_breaker.describe()}")
+    
+    def on_circuit_changed(self, endpoint, old_state, new_state):
+        self.update_tray_tooltip()
+        if new_state == CircuitBreaker.CLOSED and self.outbox is not None:
+            self.outbox.drain()
+        if new_state == CircuitBreaker.OPEN and old_state == CircuitBreaker.CLOSED:
+            self.show_notification("Translation Service", f"{endpoint} is failing; translations will fail fast until it recovers")
+        elif new_state == CircuitBreaker.CLOSED:
+            self.show_notification("Translation Service", f"{endpoint} is working again")
+    
+    def play_sound(self, sound):
+        """Play one of the configured sounds ("translation_start" or "translation_complete")"""
+        if not self.config["sounds"]["enable_sounds"]:
+            return
+        try:
+            with METRICS.histogram("sound_play_seconds", "Time spent playing feedback sounds", {"sound": sound}).time():
+                playsound(self.config["sounds"][sound])
+            logger.debug("Played %s sound", sound)
+        except Exception as e:
+            METRICS.counter("sound_errors_total", "Sounds that failed to play").inc()
+            logger.warning("Could not play sound: %s", e)
+    
     def show_notification(self, title, message):
-        logger.info(f"Showing notification: {title}")
+        logger.info("Showing notification: %s", title)
+        METRICS.counter("notifications_total", "Tray notifications shown").inc()
         self.tray_icon.showMessage(
             title,
             message,
@@ -931,18 +2322,105 @@ class MainWindow(QMainWindow):
     
     def show_settings(self):
         logger.info("Opening settings dialog")
-        dialog = SettingsDialog(self.config, self)
-        if dialog.exec_() == QDialog.Accepted:
-            # Update the language combo box
-            self.lang_combo.setCurrentIndex(self.config["ui"]["default_language_pair"])
-            
-            # Re-register shortcuts with new configuration
-            try:
-                self.register_shortcuts()
-                logger.info("Re-registered shortcuts after settings change")
-            except Exception as e:
-                logger.error(f"Failed to re-register shortcuts: {str(e)}", exc_info=True)
-                self.show_notification("Error", f"Failed to register shortcuts: {str(e)}")
+        # Shortcuts are re-registered by on_config_changed when they change
+        dialog = SettingsDialog(self.config_service, self)
+        dialog.exec_()
+    
+    def create_usage_ledger(self):
+        usage = self.config["usage"]
+        if not usage["enabled"]:
+            return None
+        try:
+            return UsageLedger(usage["path"], usage, usage["user"] or os.getenv("USERNAME", ""))
+        except Exception as e:
+            logger.error("Failed to open usage ledger: %s", e, exc_info=True)
+            return None
+    
+    def create_concurrency_limiter(self):
+        concurrency = self.config["concurrency"]
+        if not concurrency["adaptive"]:
+            return None
+        limiter = AdaptiveConcurrencyLimiter(
+            concurrency["initial_limit"], concurrency["min_limit"], concurrency["max_limit"],
+            concurrency["latency_tolerance"]
+        )
+        limiter.register_metrics()
+        return limiter
+    
+    def register_metrics(self):
+        """Publish the running totals kept by the translation services as gauges"""
+        services = self.services
+        tm = services.translation_memory
+        gauges = {
+            "dispatcher_in_flight": ("Distinct translations currently running", lambda: len(self.dispatcher.in_flight)),
+            "dispatcher_coalesced": ("Requests served by an identical in-flight translation", lambda: self.dispatcher.coalesced_count),
+            "send_queue_depth": ("Translations waiting to be pasted into Discord", lambda: len(self.message_sender.queue)),
+            "prompt_tokens": ("Prompt tokens reported by the API", lambda: services.token_stats.prompt_tokens),
+            "completion_tokens": ("Completion tokens reported by the API", lambda: services.token_stats.completion_tokens),
+            "cached_prompt_tokens": ("Prompt tokens served from the provider cache", lambda: services.token_stats.cached_tokens),
+            "prompt_overhead_ratio": ("Share of prompt tokens spent on the fixed prefix", lambda: services.token_stats.overhead_ratio),
+            "output_repair_ratio": ("Share of model answers repaired locally", lambda: services.validation_stats.repair_rate),
+            "output_retry_ratio": ("Share of model answers re-requested after failing validation", lambda: services.validation_stats.retry_rate),
+            "engine_worker_up": ("1 while the engine worker process is running", lambda: int(ENGINE.running)),
+            "engine_worker_restarts": ("Times the engine worker was restarted after a crash", lambda: ENGINE.restarts),
+        }
+        if tm is not None:
+            gauges.update({
+                "tm_segment_lookups": ("Translation memory segment lookups", lambda: tm.segment_lookups),
+                "tm_segment_hits": ("Translation memory segment hits", lambda: tm.segment_hits),
+                "tm_fuzzy_examples": ("Similar earlier translations sent as examples", lambda: tm.fuzzy_examples),
+                "tm_tokens_saved": ("Estimated tokens not sent thanks to the translation memory", lambda: tm.tokens_saved),
+            })
+        for name, (help_text, callback) in gauges.items():
+            METRICS.gauge(name, help_text, callback=callback)
+    
+    def show_usage(self):
+        logger.info("Opening usage view")
+        UsageDialog(self.services.usage_ledger, self).exec_()
+    
+    def show_metrics(self):
+        logger.info("Opening metrics dashboard")
+        if self.metrics_dashboard is None:
+            self.metrics_dashboard = MetricsDashboard(self)
+        self.metrics_dashboard.show()
+        self.metrics_dashboard.raise_()
+    
+    def start_profiling(self, seconds=None):
+        """Sample all threads for a while and write a collapsed-stack profile"""
+        if self.sampler is not None and self.sampler.running:
+            logger.info("Profiler already running")
+            return
+        profiling = self.config["profiling"]
+        seconds = seconds or profiling["sample_seconds"]
+        self.sampler = StackSampler(seconds, profiling["sample_interval_ms"] / 1000)
+        self.sampler.start(self.profile_finished.emit)
+        self.profile_action.setEnabled(False)
+        self.profile_action.setText("Profiling...")
+        logger.info("Profiling all threads for %s s", seconds)
+        self.show_notification("Profiling", f"Recording {seconds} s of activity. Reproduce the slow action now.")
+    
+    def on_profile_finished(self, path):
+        self.profile_action.setEnabled(True)
+        self.profile_action.setText(f"Profile for {self.config['profiling']['sample_seconds']} s")
+        if path:
+            self.show_notification("Profiling", f"Profile saved to {os.path.abspath(path)}")
+        else:
+            self.show_notification("Profiling", "Could not write the profile, see the log for details")
+    
+    def check_profile_request(self):
+        """Start profiling when debug.py drops a request file next to the app"""
+        if not os.path.exists(PROFILE_REQUEST_FILE):
+            return
+        try:
+            with open(PROFILE_REQUEST_FILE, "r", encoding="utf-8") as f:
+                seconds = json.load(f).get("seconds")
+        except (OSError, ValueError, AttributeError):
+            seconds = None
+        try:
+            os.remove(PROFILE_REQUEST_FILE)
+        except OSError:
+            pass
+        self.start_profiling(seconds if isinstance(seconds, (int, float)) and seconds > 0 else None)
     
     def show_about(self):
         logger.info("Showing about dialog")
@@ -965,23 +2443,44 @@ class MainWindow(QMainWindow):
 
     def on_send_pair_changed(self, action):
         pair = action.data()
-        self.config["ui"]["default_send_pair"] = pair["name"]
-        self.save_config()
+        self.config_service.set("ui", "default_send_pair", pair["name"])
         self.show_notification("Translation Direction", f"Send translation set to: {pair['name']}")
 
     def on_receive_pair_changed(self, action):
         pair = action.data()
-        self.config["ui"]["default_receive_pair"] = pair["name"]
-        self.save_config()
+        self.config_service.set("ui", "default_receive_pair", pair["name"])
         self.show_notification("Translation Direction", f"Receive translation set to: {pair['name']}")
 
-    def save_config(self):
-        try:
-            with open("config.json", "w") as f:
-                json.dump(self.config, f, indent=4)
-            logger.info("Configuration saved successfully")
-        except Exception as e:
-            logger.error(f"Failed to save configuration: {str(e)}")
+    def on_config_changed(self, changes):
+        """Apply configuration changes made in the app or by editing config.json"""
+        sections = {section for section, _ in changes}
+        
+        if "shortcuts" in sections or ("speculative", "enabled") in changes:
+            try:
+                self.register_shortcuts()
+                logger.info("Re-registered shortcuts after settings change")
+            except Exception as e:
+                logger.error("Failed to re-register shortcuts: %s", e, exc_info=True)
+                self.show_notification("Error", f"Failed to register shortcuts: {str(e)}")
+        
+        if "glossary" in sections:
+            try:
+                self.services.glossary = (
+                    Glossary.from_config(self.config["glossary"]) if self.config["glossary"]["enabled"] else None
+                )
+            except Exception as e:
+                logger.error("Failed to reload glossary: %s", e, exc_info=True)
+        
+        if "ui" in sections:
+            # Keep the tray menu checks in sync with hand edits
+            menus = self.tray_icon.contextMenu().actions()
+            for menu_index, key in ((0, "default_send_pair"), (1, "default_receive_pair")):
+                for action in menus[menu_index].menu().actions():
+                    if action.data()["name"] == self.config["ui"].get(key):
+                        action.setChecked(True)
+        
+        if ("api", "model") in changes:
+            logger.info("Translation model changed to %s", self.config['api']['model'])
 
     def setup_language_toggle(self):
         keyboard.add_hotkey('ctrl+alt+l', self.toggle_language_pair)
@@ -1078,18 +2577,17 @@ class MainWindow(QMainWindow):
 
     def detect_language(self, text):
         """Detect the language of input text"""
-        try:
-            detected = detect(text)
-            logger.info(f"Detected language: {detected}")
-            return detected
-        except:
+        detected = detected_language(text)
+        if detected:
+            logger.info("Detected language: %s", detected)
+        else:
             logger.warning("Could not detect language")
-            return None
+        return detected
 
     def translate_text(self):
-        # Get the text
-        text = self.get_selected_text()
-        
+        self.get_selected_text(self.detect_selected_language)
+
+    def detect_selected_language(self, text):
         # Detect language if using auto-detect
         if self.current_source_lang == "auto":
             detected_lang = self.detect_language(text)
@@ -1100,18 +2598,25 @@ class MainWindow(QMainWindow):
 
     def preserve_formatting(self, original_text, translated_text):
         """Preserve original text formatting in translation"""
+        # Case and punctuation rules must not touch URLs, code or mentions
+        original_masked = protect_formatting(original_text)[0].strip()
+        translated_masked, spans = protect_formatting(translated_text)
+        translated_masked = translated_masked.strip()
+        if not original_masked or not translated_masked:
+            return translated_text
+        
         # Check for capitalization
-        if original_text.isupper():
-            translated_text = translated_text.upper()
-        elif original_text[0].isupper():
-            translated_text = translated_text[0].upper() + translated_text[1:]
+        if original_masked.isupper():
+            translated_masked = translated_masked.upper()
+        elif original_masked[0].isupper():
+            translated_masked = translated_masked[0].upper() + translated_masked[1:]
         
         # Check for ending punctuation
-        if original_text[-1] in '.!?':
-            if not translated_text[-1] in '.!?':
-                translated_text += original_text[-1]
+        if original_masked[-1] in '.!?':
+            if not translated_masked[-1] in '.!?':
+                translated_masked += original_masked[-1]
             
-        return translated_text
+        return restore_formatting(translated_masked, spans)
 
 
 class TranslationQueue:
@@ -1150,8 +2655,44 @@ class TranslationQueue:
         thread.start()
 
 
+class ConfigService(QObject):
+    """ConfigStore that announces changes through config_changed
+
+    Polls the file for edits made by hand from a QTimer, so reloads are
+    handled on the Qt main thread.
+    """
+
+    config_changed = pyqtSignal(object)
+
+    WATCH_INTERVAL_MS = 1000
+
+    def __init__(self, path="config.json", parent=None):
+        super().__init__(parent)
+        self.store = ConfigStore(path)
+        self.config = self.store.config
+        self.store.listeners.append(self.config_changed.emit)
+
+        self.watch_timer = QTimer(self)
+        self.watch_timer.timeout.connect(self.store.check_for_external_changes)
+        self.watch_timer.start(self.WATCH_INTERVAL_MS)
+
+    def load(self):
+        self.store.load()
+
+    def set(self, section, key, value):
+        self.store.set(section, key, value)
+
+    def update(self, values):
+        """Apply {section: {key: value}} changes, notify subscribers and schedule a save"""
+        self.store.update(values)
+
+    def flush(self):
+        """Write pending changes and stop the writer thread (call on exit)"""
+        self.store.flush()
+
+
 class AITranslator:
-    def __init__(self):
+    def __init__(self, instance_server=None):
         logger.info("Initializing AI Translator application")
         self.app = QApplication(sys.argv)
         self.app.setQuitOnLastWindowClosed(False)
@@ -1159,8 +2700,11 @@ class AITranslator:
         # Load environment variables
         load_dotenv(override=True)  # Add override=True to ensure env vars are reloaded
         
+        # Load configuration
+        self.load_config()
+        
         # Check if API key is available
-        if not os.getenv("GROQ_API_KEY"):
+        if not load_api_keys(self.config_service.config["api"].get("key_file")):
             logger.warning("API key not found in environment variables")
             QMessageBox.warning(
                 None,
@@ -1168,69 +2712,41 @@ class AITranslator:
                 "API key not found in environment variables.\nPlease check your .env file."
             )
         
-        # Load configuration
-        self.load_config()
-        
         # Create directories if they don't exist
         os.makedirs("sounds", exist_ok=True)
         
         # Create default sound files if they don't exist
         self.create_default_sounds()
         
+        # Move HTTP, language detection and OCR out of the UI process
+        engine_config = self.config_service.config["engine"]
+        if engine_config["worker_process"]:
+            ENGINE.call_timeout = engine_config["call_timeout"]
+            try:
+                ENGINE.start()
+                self.app.aboutToQuit.connect(ENGINE.stop)
+            except OSError as e:
+                logger.error("Could not start engine worker, running in-process: %s", e)
+        
         # Create main window
-        self.main_window = MainWindow(self.config)
+        self.main_window = MainWindow(self.config_service)
+        
+        # Write any pending config changes and usage totals before exiting
+        self.app.aboutToQuit.connect(self.config_service.flush)
+        if self.main_window.services.usage_ledger:
+            self.app.aboutToQuit.connect(self.main_window.services.usage_ledger.close)
+        
+        # Later launches forward their command line here instead of starting a second app
+        self.main_window.command_line_received.connect(self.main_window.handle_command_line)
+        if instance_server is not None:
+            instance_server.set_handler(self.main_window.command_line_received.emit)
+        if len(sys.argv) > 1:
+            self.main_window.handle_command_line(sys.argv[1:])
     
     def load_config(self):
-        default_config = {
-            "api": {
-                "provider": "groq",
-                "api_key": os.getenv("GROQ_API_KEY", ""),  # Get API key from environment
-                "model": "llama3-70b-8192"
-            },
-            "shortcuts": {
-                "translate_and_send": "ctrl+alt+t",
-                "translate_selected": "ctrl+alt+r"
-            },
-            "sounds": {
-                "enable_sounds": True,
-                "translation_start": "sounds/start.wav",
-                "translation_complete": "sounds/complete.wav"
-            },
-            "ui": {
-                "notification_duration": 5000,
-                "default_send_pair": "English to Portuguese",
-                "default_receive_pair": "Portuguese to English"
-            }
-        }
-
-        try:
-            logger.info("Loading configuration")
-            # Load existing config
-            if os.path.exists("config.json"):
-                with open("config.json", "r") as f:
-                    existing_config = json.load(f)
-                
-                # Update default config with existing values, but keep API key from environment
-                self.config = default_config
-                for section in existing_config:
-                    if section in self.config:
-                        if section == "api":
-                            # Don't override API key from environment
-                            existing_config[section].pop("api_key", None)
-                        self.config[section].update(existing_config[section])
-            else:
-                self.config = default_config
-            
-            # Save updated config (without API key)
-            save_config = self.config.copy()
-            save_config["api"]["api_key"] = ""  # Don't save API key to file
-            with open("config.json", "w") as f:
-                json.dump(save_config, f, indent=4)
-            
-            logger.info("Configuration loaded successfully")
-        except Exception as e:
-            logger.warning(f"Could not load/save config.json: {str(e)}. Using default configuration.")
-            self.config = default_config
+        self.config_service = ConfigService("config.json")
+        self.config_service.load()
+        self.config = self.config_service.config
     
     def create_default_sounds(self):
         logger.info("Creating default sound files if they don't exist")
@@ -1342,6 +2858,10 @@ class TranslationPopup(QWidget):
         # Start close timer with longer duration
         self.close_timer.start(8000)  # Show for 8 seconds
     
+    def show_translations(self, original_text, translations, pos):
+        """Show a fan-out result, one paragraph per language"""
+        self.show_translation(original_text, format_translations(translations), pos)
+    
     def start_fade_out(self):
         if not self.is_fading_out:
             self.is_fading_out = True
@@ -1381,12 +2901,12 @@ class TranslationPopup(QWidget):
 if __name__ == "__main__":
     try:
         logger.info("Starting AI Translator application")
-        translator = AITranslator()
+        translator = AITranslator(INSTANCE_SERVER)
         exit_code = translator.run()
-        logger.info(f"Application exited with code: {exit_code}")
+        logger.info("Application exited with code: %s", exit_code)
         sys.exit(exit_code)
     except Exception as e:
-        logger.critical(f"Unhandled exception: {str(e)}", exc_info=True)
+        logger.critical("Unhandled exception: %s", e, exc_info=True)
         QMessageBox.critical(
             None,
             "Critical Error",
@@ -0,0 +1,273 @@
+"""Segment-level translation memory with a fuzzy index for few-shot examples
+
+TranslationMemory stores every translated segment in SQLite and answers
+exact (and whitespace/case-normalized) repeats without an API request.
+FuzzyIndex finds earlier translations of similar segments; those are only
+ever sent to the model as examples, never reused as answers.
+"""
+import re
+import heapq
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+from chunking import estimate_tokens
+
+logger = logging.getLogger("AITranslator.memory")
+
+
+class FuzzyIndex:
+    """MinHash LSH index over character trigrams for near-duplicate lookups
+
+    Texts are casefolded and stripped of punctuation and emoji before
+    shingling, so "bom dia pessoal!" and "Bom dia pessoal!! 😄" are identical.
+    Signatures use one-permutation hashing (one hash per shingle, binned),
+    which keeps insertion and lookup linear in the text length. Candidates
+    from the LSH buckets are re-scored with exact Jaccard similarity. The
+    oldest entries are evicted beyond max_entries, and only the source and
+    translation strings are kept per entry so memory stays bounded.
+    """
+
+    SIGNATURE_SIZE = 32
+    BANDS = 8
+    ROWS = SIGNATURE_SIZE // BANDS
+    MAX_CANDIDATES = 3
+    # Buckets this crowded carry almost no information and are skipped on lookup
+    MAX_BUCKET_SCAN = 64
+    NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        # entry id -> (source_lang, target_lang, source_text, translation)
+        self.entries = OrderedDict()
+        # band key -> list of entry ids
+        self.buckets = defaultdict(list)
+        # hash of (source_lang, target_lang, normalized text) -> entry id
+        self.by_text = {}
+        self.next_id = 0
+
+    @classmethod
+    def normalize(cls, text):
+        return cls.NON_WORD_PATTERN.sub(" ", text.casefold()).strip()
+
+    @staticmethod
+    def shingles(normalized):
+        padded = f" {normalized} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def band_keys(self, shingles, source_lang, target_lang):
+        size = self.SIGNATURE_SIZE
+        signature = [None] * size
+        for shingle in shingles:
+            value = hash(shingle) & 0xFFFFFFFFFFFFFFFF
+            slot = value % size
+            value //= size
+            if signature[slot] is None or value < signature[slot]:
+                signature[slot] = value
+
+        # Densify: empty slots borrow the value of the next filled slot
+        for slot in range(size):
+            if signature[slot] is None:
+                for distance in range(1, size):
+                    borrowed = signature[(slot + distance) % size]
+                    if borrowed is not None:
+                        signature[slot] = (borrowed, distance)
+                        break
+
+        rows = self.ROWS
+        return [
+            hash((source_lang, target_lang, band, tuple(signature[band * rows:(band + 1) * rows])))
+            for band in range(self.BANDS)
+        ]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, source_text, translation, source_lang, target_lang):
+        normalized = self.normalize(source_text)
+        if not normalized:
+            return
+        text_key = hash((source_lang, target_lang, normalized))
+        if text_key in self.by_text:
+            self.remove(self.by_text[text_key])
+
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = (source_lang, target_lang, source_text, translation)
+        self.by_text[text_key] = entry_id
+        for key in self.band_keys(self.shingles(normalized), source_lang, target_lang):
+            self.buckets[key].append(entry_id)
+
+        while len(self.entries) > self.max_entries:
+            self.remove(next(iter(self.entries)))
+
+    def remove(self, entry_id):
+        source_lang, target_lang, source_text, _ = self.entries.pop(entry_id)
+        normalized = self.normalize(source_text)
+        self.by_text.pop(hash((source_lang, target_lang, normalized)), None)
+        # Band keys are recomputed rather than stored to save memory per entry
+        for key in self.band_keys(self.shingles(normalized), source_lang, target_lang):
+            bucket = self.buckets.get(key)
+            if bucket is not None and entry_id in bucket:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def lookup(self, text, source_lang, target_lang, threshold):
+        """Return (similarity, source_text, translation) of the nearest entry, or None"""
+        normalized = self.normalize(text)
+        if not normalized:
+            return None
+
+        exact_id = self.by_text.get(hash((source_lang, target_lang, normalized)))
+        if exact_id is not None:
+            _, _, source_text, translation = self.entries[exact_id]
+            if self.normalize(source_text) == normalized:
+                return 1.0, source_text, translation
+
+        query_shingles = self.shingles(normalized)
+        votes = defaultdict(int)
+        for key in self.band_keys(query_shingles, source_lang, target_lang):
+            bucket = self.buckets.get(key, ())
+            if len(bucket) > self.MAX_BUCKET_SCAN:
+                continue
+            for entry_id in bucket:
+                votes[entry_id] += 1
+
+        best = None
+        for entry_id in heapq.nlargest(self.MAX_CANDIDATES, votes, key=votes.get):
+            _, _, source_text, translation = self.entries[entry_id]
+            candidate_shingles = self.shingles(self.normalize(source_text))
+            similarity = len(query_shingles & candidate_shingles) / len(query_shingles | candidate_shingles)
+            if similarity >= threshold and (best is None or similarity > best[0]):
+                best = (similarity, source_text, translation)
+        return best
+
+
+class TranslationMemory:
+    """Persistent segment-level translation memory backed by SQLite"""
+
+    def __init__(self, path="translation_memory.db", fuzzy_config=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS segments (
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                PRIMARY KEY (source_lang, target_lang, source_text)
+            )
+        """)
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS segments_normalized ON segments (source_lang, target_lang, normalized)"
+        )
+        self.connection.commit()
+
+        # Cumulative statistics since startup
+        self.segment_lookups = 0
+        self.segment_hits = 0
+        self.fuzzy_examples = 0
+        self.tokens_saved = 0
+
+        # Similar entries are only ever used as few-shot examples, never as
+        # answers: a near-identical sentence can differ in a number, a "not"
+        # or a placeholder. The index is built on first use, in the background.
+        self.fuzzy_config = fuzzy_config or {}
+        self.fuzzy_index = None
+        self.fuzzy_loading = False
+        self.fuzzy_ready = threading.Event()
+        # Pairs stored while the index is being built, added once it is ready
+        self.fuzzy_backlog = []
+
+    def start_fuzzy_index(self):
+        """Build the fuzzy index on a background thread, once"""
+        with self.lock:
+            if not self.fuzzy_config.get("enabled", False) or self.fuzzy_loading:
+                return
+            self.fuzzy_loading = True
+        threading.Thread(target=self.load_fuzzy_index, name="FuzzyIndexLoader", daemon=True).start()
+
+    def load_fuzzy_index(self):
+        """Index the most recent entries of the persistent memory"""
+        index = FuzzyIndex(self.fuzzy_config.get("max_entries", 20000))
+        connection = sqlite3.connect(self.path)
+        try:
+            rows = connection.execute(
+                "SELECT source_lang, target_lang, source_text, translation FROM segments "
+                "ORDER BY rowid DESC LIMIT ?",
+                (index.max_entries,)
+            ).fetchall()
+        finally:
+            connection.close()
+        for source_lang, target_lang, source_text, translation in reversed(rows):
+            index.add(source_text, translation, source_lang, target_lang)
+        with self.lock:
+            for segment, translation, source_lang, target_lang in self.fuzzy_backlog:
+                index.add(segment, translation, source_lang, target_lang)
+            self.fuzzy_backlog = []
+            self.fuzzy_index = index
+        self.fuzzy_ready.set()
+        logger.info("Loaded %d entries into the fuzzy translation index", len(rows))
+
+    @staticmethod
+    def normalize(segment):
+        return " ".join(segment.split()).casefold()
+
+    def lookup(self, segment, source_lang, target_lang):
+        """Return the stored translation of segment (exact, then normalized match) or None"""
+        with self.lock:
+            self.segment_lookups += 1
+            row = self.connection.execute(
+                "SELECT translation FROM segments WHERE source_lang = ? AND target_lang = ? AND source_text = ?",
+                (source_lang, target_lang, segment)
+            ).fetchone()
+            if row is None:
+                row = self.connection.execute(
+                    "SELECT translation FROM segments WHERE source_lang = ? AND target_lang = ? AND normalized = ?",
+                    (source_lang, target_lang, self.normalize(segment))
+                ).fetchone()
+            if row is None:
+                return None
+            self.segment_hits += 1
+            self.tokens_saved += estimate_tokens(segment)
+            return row[0]
+
+    def similar_example(self, segment, source_lang, target_lang):
+        """Return a (source, translation) pair similar enough to use as a few-shot example"""
+        if self.fuzzy_index is None:
+            # No examples until the index has been built
+            self.start_fuzzy_index()
+            return None
+        with self.lock:
+            match = self.fuzzy_index.lookup(
+                segment, source_lang, target_lang, self.fuzzy_config.get("example_threshold", 0.6)
+            )
+            if match:
+                self.fuzzy_examples += 1
+        return (match[1], match[2]) if match else None
+
+    def store(self, pairs, source_lang, target_lang):
+        """Store an iterable of (segment, translation) pairs"""
+        pairs = list(pairs)
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?)",
+                [(source_lang, target_lang, segment, self.normalize(segment), translation)
+                 for segment, translation in pairs]
+            )
+            self.connection.commit()
+            if self.fuzzy_index is not None:
+                for segment, translation in pairs:
+                    self.fuzzy_index.add(segment, translation, source_lang, target_lang)
+            elif self.fuzzy_loading:
+                self.fuzzy_backlog.extend(
+                    (segment, translation, source_lang, target_lang) for segment, translation in pairs
+                )
+
+    @property
+    def hit_rate(self):
+        return self.segment_hits / self.segment_lookups if self.segment_lookups else 0.0
@@ -0,0 +1,232 @@
+"""Process-wide metrics: counters, gauges and log-linear latency histograms
+
+METRICS is the registry the translator records into. It renders the
+Prometheus text format for the optional /metrics endpoint
+(start_metrics_server) and feeds the in-app dashboard. Only the standard
+library is used.
+"""
+import time
+import logging
+import threading
+import http.server
+
+logger = logging.getLogger("AITranslator.metrics")
+
+
+class Counter:
+    """Monotonically increasing count"""
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down, or is computed on collection by a callback"""
+
+    def __init__(self, callback=None):
+        self.value = 0
+        self.callback = callback
+        self.lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def get(self):
+        if self.callback is not None:
+            try:
+                return self.callback()
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Histogram:
+    """HDR-style log-linear latency histogram with ~12% relative precision
+
+    Values are recorded in microseconds. Below 16 us every value has its own
+    bucket; above that each power of two is split into 8 sub-buckets, so
+    recording is a bit_length() and a shift, and memory stays a few hundred
+    integers regardless of the number of samples.
+    """
+
+    SUB_BUCKETS = 8
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def bucket_index(cls, micros):
+        if micros < 16:
+            return micros
+        shift = micros.bit_length() - 4
+        return 16 + (shift - 1) * cls.SUB_BUCKETS + ((micros >> shift) - cls.SUB_BUCKETS)
+
+    @classmethod
+    def bucket_upper_bound(cls, index):
+        """Exclusive upper bound of a bucket in microseconds"""
+        if index < 16:
+            return index + 1
+        shift = (index - 16) // cls.SUB_BUCKETS + 1
+        mantissa = (index - 16) % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return (mantissa + 1) << shift
+
+    def observe(self, seconds):
+        index = self.bucket_index(max(0, int(seconds * 1000000)))
+        with self.lock:
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def time(self):
+        """Context manager recording the duration of a block"""
+        return HistogramTimer(self)
+
+    def percentile(self, fraction):
+        """Approximate value in seconds below which `fraction` of samples fall"""
+        with self.lock:
+            counts = list(self.counts)
+            total = self.count
+        if not total:
+            return 0.0
+        threshold = fraction * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return self.bucket_upper_bound(index) / 1000000
+        return self.bucket_upper_bound(len(counts) - 1) / 1000000
+
+    def cumulative_buckets(self):
+        """[(upper bound in seconds, cumulative count)] for non-empty buckets"""
+        with self.lock:
+            counts = list(self.counts)
+        buckets = []
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count:
+                cumulative += count
+                buckets.append((self.bucket_upper_bound(index) / 1000000, cumulative))
+        return buckets
+
+
+class HistogramTimer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Process-wide counters, gauges and histograms with Prometheus text exposition"""
+
+    def __init__(self):
+        # (name, sorted label items) -> metric
+        self.metrics = {}
+        self.help = {}
+        self.types = {}
+        self.lock = threading.Lock()
+
+    def get_or_create(self, kind, factory, name, help_text, labels):
+        key = (name, tuple(sorted((labels or {}).items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self.lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = factory()
+                    self.metrics[key] = metric
+                    self.help.setdefault(name, help_text)
+                    self.types.setdefault(name, kind)
+        return metric
+
+    def counter(self, name, help_text="", labels=None):
+        return self.get_or_create("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", labels=None, callback=None):
+        return self.get_or_create("gauge", lambda: Gauge(callback), name, help_text, labels)
+
+    def histogram(self, name, help_text="", labels=None):
+        return self.get_or_create("histogram", Histogram, name, help_text, labels)
+
+    def items(self):
+        with self.lock:
+            return sorted(self.metrics.items())
+
+    @staticmethod
+    def format_labels(labels, extra=None):
+        pairs = list(labels) + list(extra or [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    def exposition(self):
+        """Render all metrics in the Prometheus text format"""
+        lines = []
+        seen = set()
+        for (name, labels), metric in self.items():
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self.help.get(name, '')}")
+                lines.append(f"# TYPE {name} {self.types[name]}")
+            if isinstance(metric, Histogram):
+                for upper_bound, cumulative in metric.cumulative_buckets():
+                    lines.append(f"{name}_bucket{self.format_labels(labels, [('le', f'{upper_bound:.6f}')])} {cumulative}")
+                lines.append(f"{name}_bucket{self.format_labels(labels, [('le', '+Inf')])} {metric.count}")
+                lines.append(f"{name}_sum{self.format_labels(labels)} {metric.sum}")
+                lines.append(f"{name}_count{self.format_labels(labels)} {metric.count}")
+            elif isinstance(metric, Gauge):
+                lines.append(f"{name}{self.format_labels(labels)} {metric.get()}")
+            else:
+                lines.append(f"{name}{self.format_labels(labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes would flood the log
+        pass
+
+
+def start_metrics_server(port):
+    """Serve /metrics on localhost from a daemon thread"""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    logger.info("Serving metrics on http://127.0.0.1:%d/metrics", port)
+    return server
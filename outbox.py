@@ -0,0 +1,72 @@
+"""SQLite store behind the offline outbox of received messages
+
+TranslationOutbox (in main.py) decides when to send the queued items; this
+store only keeps them, so they survive crashes and restarts.
+"""
+import time
+import logging
+import sqlite3
+
+logger = logging.getLogger("AITranslator.outbox")
+
+
+class OutboxStore:
+    """Received messages waiting for a translation, oldest first
+
+    Identical texts (after whitespace normalization) for the same language
+    pair are stored once.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_key TEXT NOT NULL UNIQUE,
+                text TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                created REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.connection.commit()
+
+    @staticmethod
+    def request_key(text, source_lang, target_lang):
+        return f"{source_lang}\t{target_lang}\t{' '.join(text.split())}"
+
+    def add(self, text, source_lang, target_lang):
+        """Queue text and return (item id, True if it was new)"""
+        key = self.request_key(text, source_lang, target_lang)
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO outbox (request_key, text, source_lang, target_lang, created) VALUES (?, ?, ?, ?, ?)",
+                (key, text, source_lang, target_lang, time.time())
+            )
+        if cursor.rowcount:
+            logger.info("Queued translation for when the API is reachable again (%d pending)", len(self))
+            return cursor.lastrowid, True
+        row = self.connection.execute("SELECT id FROM outbox WHERE request_key = ?", (key,)).fetchone()
+        return row[0], False
+
+    def pending(self):
+        """[(id, text, source_lang, target_lang)] oldest first"""
+        return self.connection.execute(
+            "SELECT id, text, source_lang, target_lang FROM outbox ORDER BY id"
+        ).fetchall()
+
+    def attempts(self, item_id):
+        row = self.connection.execute("SELECT attempts FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        return row[0] if row else None
+
+    def record_attempt(self, item_id):
+        with self.connection:
+            self.connection.execute("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", (item_id,))
+
+    def remove(self, item_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM outbox WHERE id = ?", (item_id,))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
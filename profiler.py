@@ -0,0 +1,88 @@
+"""Sampling profiler for diagnosing slow shortcuts and UI jank
+
+StackSampler records the stacks of every Python thread at a fixed interval
+and writes them as collapsed stacks for flamegraph.pl or speedscope. The
+translator starts one from the tray menu or when debug.py drops a
+PROFILE_REQUEST_FILE next to it.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger("AITranslator.profiler")
+
+
+PROFILE_DIR = "profiles"
+PROFILE_REQUEST_FILE = "profile.request"
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame):
+    """Root-first 'a;b;c' stack of a frame, as used by flamegraph tools"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples the stacks of all Python threads at a fixed interval
+
+    Samples are aggregated in memory and written as collapsed stacks
+    ("thread;frame;frame count" per line), which flamegraph.pl, speedscope
+    and similar tools read directly. Each sample is one sys._current_frames()
+    call, so the cost to the sampled threads is a brief GIL hand-off.
+    """
+
+    def __init__(self, duration, interval=0.005, output_dir=PROFILE_DIR):
+        self.duration = duration
+        self.interval = interval
+        self.output_dir = output_dir
+        self.stacks = defaultdict(int)
+        self.samples = 0
+        self.path = None
+        self.thread = None
+
+    def start(self, on_done=None):
+        self.on_done = on_done
+        self.thread = threading.Thread(target=self.run, name="StackSampler", daemon=True)
+        self.thread.start()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def run(self):
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + self.duration
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, f"thread-{thread_id}").replace(";", "_").replace(" ", "_")
+                self.stacks[f"{name};{collapse_stack(frame)}"] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        try:
+            self.path = self.write()
+            logger.info("Wrote profile with %d samples to %s", self.samples, self.path)
+        except OSError as e:
+            logger.error("Could not write profile: %s", e)
+        if self.on_done is not None:
+            self.on_done(self.path)
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
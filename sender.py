@@ -0,0 +1,284 @@
+"""Pastes translations into the focused chat input and copies selected text
+
+MessageSender drives the clipboard-copy, Ctrl+A, Ctrl+V, Enter sequence that
+sends a translation, and the Ctrl+C sequence that captures the selection,
+with QTimer callbacks instead of sleeps. Keystrokes and clipboard access go
+through small backend objects, so the state machine can run against fakes
+(see test_sender.py) on any platform; only the default backends touch the
+keyboard and pyperclip modules, and they import them on first use.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+
+logger = logging.getLogger("AITranslator.sender")
+
+
+class KeyboardInputBackend:
+    """Sends key combinations to the focused window"""
+
+    def __init__(self):
+        import keyboard
+        self.keyboard = keyboard
+
+    def send(self, keys):
+        self.keyboard.press_and_release(keys)
+
+
+class PyperclipClipboardBackend:
+    """System clipboard access"""
+
+    def __init__(self):
+        import pyperclip
+        self.pyperclip = pyperclip
+
+    def paste(self):
+        return self.pyperclip.paste()
+
+    def copy(self, text):
+        self.pyperclip.copy(text)
+
+
+class MessageSender(QObject):
+    """Owns the simulated keyboard and clipboard: sends translations and captures text
+
+    Sends and captures wait in one queue and run one at a time, so their
+    keystrokes and clipboard contents never interleave. Each runs as a
+    QTimer-driven state machine, so the UI thread never sleeps. Delays adapt
+    to how long the clipboard takes to acknowledge a copy. The user's
+    clipboard is restored when a job finishes. Backends can be swapped for
+    fakes in tests.
+
+    A keyboard hook sees our keystrokes too; own_key_press() tells them
+    apart from the user's, and a user key press during a select-all capture
+    cancels it (see finish_capture).
+    """
+
+    message_sent = pyqtSignal(str)
+
+    POLL_INTERVAL_MS = 10
+    ACK_TIMEOUT = 0.5
+    MIN_DELAY_MS = 20
+    MAX_DELAY_MS = 200
+    # How long a capture waits for the copied selection to reach the clipboard
+    CAPTURE_TIMEOUT = 0.2
+    # How long a key we pressed may take to reach a keyboard hook
+    SYNTHETIC_KEY_WINDOW = 1.0
+
+    def __init__(self, input_backend=None, clipboard_backend=None, metrics=None, parent=None):
+        super().__init__(parent)
+        self.input = input_backend or KeyboardInputBackend()
+        self.clipboard = clipboard_backend or PyperclipClipboardBackend()
+        # Optional MetricsRegistry for the clipboard and paste timings
+        self.metrics = metrics
+        self.queue = deque()
+        # Text being sent; capture_callback is set while a capture runs instead
+        self.current = None
+        self.capture_callback = None
+        self.select_all = False
+        self.clipboard_cleared = False
+        self.original_clipboard = None
+        self.copy_started = 0.0
+        self.send_started = 0.0
+        # Smoothed clipboard acknowledgement time in seconds
+        self.ack_estimate = 0.05
+        # (key name, time pressed) for our keys not yet seen by a hook; shared with the hook thread
+        self.key_lock = threading.Lock()
+        self.synthetic_keys = deque()
+        self.capture_interrupted = False
+
+    @property
+    def busy(self):
+        return self.current is not None or self.capture_callback is not None
+
+    def observe(self, name, help_text, value):
+        if self.metrics is not None:
+            self.metrics.histogram(name, help_text).observe(value)
+
+    def press(self, keys):
+        """Send a key combination, remembering its keys so hooks can tell them from the user's"""
+        now = time.monotonic()
+        with self.key_lock:
+            self.forget_old_keys(now)
+            self.synthetic_keys.extend((key, now) for key in keys.split('+'))
+        self.input.send(keys)
+
+    def forget_old_keys(self, now):
+        while self.synthetic_keys and now - self.synthetic_keys[0][1] > self.SYNTHETIC_KEY_WINDOW:
+            self.synthetic_keys.popleft()
+
+    def own_key_press(self, name):
+        """True if a key press seen by a keyboard hook is one we sent; call from the hook thread
+
+        Any other press during a select-all capture interrupts it.
+        """
+        # Hooks may report a side ("left ctrl") where we pressed just "ctrl"
+        key = name.split()[-1] if name else name
+        with self.key_lock:
+            self.forget_old_keys(time.monotonic())
+            for index, (sent, _) in enumerate(self.synthetic_keys):
+                if sent == key:
+                    del self.synthetic_keys[index]
+                    return True
+            if self.capture_callback is not None and self.select_all:
+                self.capture_interrupted = True
+        return False
+
+    def step_delay_ms(self):
+        """Wait between keystrokes, scaled from the observed clipboard latency"""
+        return int(min(self.MAX_DELAY_MS, max(self.MIN_DELAY_MS, self.ack_estimate * 2000)))
+
+    def enqueue(self, text):
+        """Paste text into the focused input and send it"""
+        self.queue.append((self.start_send, text))
+        if not self.busy:
+            self.start_next()
+
+    def capture(self, callback, select_all=False):
+        """Copy the selection and call callback(text), or callback(None) if nothing was copied
+
+        With select_all the whole focused input is copied and the caret is put
+        back at its end.
+        """
+        self.queue.append((self.start_capture, callback, select_all))
+        if not self.busy:
+            self.start_next()
+
+    def start_next(self):
+        self.current = None
+        if self.queue:
+            start, *args = self.queue.popleft()
+            start(*args)
+
+    def save_clipboard(self):
+        try:
+            self.original_clipboard = self.clipboard.paste()
+        except Exception as e:
+            logger.warning("Could not read clipboard: %s", e)
+            self.original_clipboard = None
+
+    def start_send(self, text):
+        self.current = text
+        self.send_started = time.perf_counter()
+        self.save_clipboard()
+
+        self.clipboard.copy(self.current)
+        self.copy_started = time.monotonic()
+        self.wait_for_clipboard()
+
+    def wait_for_clipboard(self):
+        elapsed = time.monotonic() - self.copy_started
+        try:
+            acknowledged = self.clipboard.paste() == self.current
+        except Exception:
+            acknowledged = False
+
+        if acknowledged:
+            self.ack_estimate = 0.8 * self.ack_estimate + 0.2 * elapsed
+            self.observe("clipboard_ack_seconds", "Time for the clipboard to confirm a copy", elapsed)
+        elif elapsed < self.ACK_TIMEOUT:
+            QTimer.singleShot(self.POLL_INTERVAL_MS, self.wait_for_clipboard)
+            return
+        else:
+            logger.warning("Clipboard did not confirm the translated text, pasting anyway")
+            self.ack_estimate = min(self.ACK_TIMEOUT, self.ack_estimate * 2)
+
+        logger.debug("Simulating Ctrl+A to select all text")
+        self.press('ctrl+a')
+        QTimer.singleShot(self.step_delay_ms(), self.paste)
+
+    def paste(self):
+        logger.debug("Simulating Ctrl+V to paste translated text")
+        self.press('ctrl+v')
+        QTimer.singleShot(self.step_delay_ms(), self.press_enter)
+
+    def press_enter(self):
+        logger.debug("Simulating Enter to send message")
+        self.press('enter')
+        # Give the target app time to read the clipboard before restoring it
+        QTimer.singleShot(self.step_delay_ms(), self.finish)
+
+    def finish(self):
+        sent_text = self.current
+        try:
+            # Leave the clipboard alone if the user copied something meanwhile
+            if self.original_clipboard is not None and self.clipboard.paste() == sent_text:
+                self.clipboard.copy(self.original_clipboard)
+        except Exception as e:
+            logger.warning("Could not restore clipboard: %s", e)
+        self.original_clipboard = None
+        self.observe("paste_seconds", "Time to paste and send a translation", time.perf_counter() - self.send_started)
+        self.message_sent.emit(sent_text)
+        self.start_next()
+
+    def start_capture(self, callback, select_all):
+        with self.key_lock:
+            self.capture_interrupted = False
+            self.select_all = select_all
+            self.capture_callback = callback
+        self.save_clipboard()
+        # Start from an empty clipboard so whatever appears next is the
+        # selection, even if it matches what the user had copied
+        try:
+            self.clipboard.copy("")
+        except Exception as e:
+            logger.warning("Could not clear clipboard before capturing: %s", e)
+        self.copy_started = time.monotonic()
+        self.wait_for_clear()
+
+    def wait_for_clear(self):
+        try:
+            self.clipboard_cleared = self.clipboard.paste() == ""
+        except Exception:
+            self.clipboard_cleared = False
+        if not self.clipboard_cleared and time.monotonic() - self.copy_started < self.ACK_TIMEOUT:
+            QTimer.singleShot(self.POLL_INTERVAL_MS, self.wait_for_clear)
+            return
+
+        if self.select_all:
+            self.press('ctrl+a')
+        logger.debug("Simulating Ctrl+C to copy the selection")
+        self.press('ctrl+c')
+        self.copy_started = time.monotonic()
+        self.wait_for_selection()
+
+    def wait_for_selection(self):
+        try:
+            text = self.clipboard.paste()
+        except Exception:
+            text = None
+        # Without a confirmed clear, the old clipboard content is not a capture
+        if text and (self.clipboard_cleared or text != self.original_clipboard):
+            self.finish_capture(text)
+        elif time.monotonic() - self.copy_started < self.CAPTURE_TIMEOUT:
+            QTimer.singleShot(self.POLL_INTERVAL_MS, self.wait_for_selection)
+        else:
+            logger.debug("Nothing was copied")
+            self.finish_capture(None)
+
+    def finish_capture(self, text):
+        try:
+            # Leave the clipboard alone if the user copied something meanwhile
+            if self.original_clipboard is not None and self.clipboard.paste() in ("", text):
+                self.clipboard.copy(self.original_clipboard)
+        except Exception as e:
+            logger.warning("Could not restore clipboard: %s", e)
+        self.original_clipboard = None
+        if self.select_all:
+            if self.capture_interrupted:
+                # The user typed over the selection or moved the caret; pressing
+                # Right now would move it again, and the text may be stale
+                logger.debug("Key pressed during capture, discarding it")
+                text = None
+            else:
+                self.press('right')
+
+        callback = self.capture_callback
+        with self.key_lock:
+            self.capture_callback = None
+        # Start the next job first, so anything the callback queues runs after it
+        self.start_next()
+        callback(text)
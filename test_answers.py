@@ -0,0 +1,119 @@
+"""Cleanup, validation and splitting of the model's answers
+
+Runs with the standard library only: python -m unittest test_answers
+"""
+import unittest
+
+from answers import (TranslationValidationError, candidate_instruction, clean_translation, number_segments,
+                     parse_fan_out_answer, split_candidates, split_numbered_segments, validate_translation)
+
+
+class CleanTranslationTest(unittest.TestCase):
+    def test_untouched_answer(self):
+        self.assertEqual(clean_translation("bom dia", "good morning"), ("good morning", False))
+
+    def test_strips_markers_preamble_and_trailing_note(self):
+        answer = "Here is the casual translation: <<OUTPUT>>good morning folks\n(Note: \"pessoal\" means folks)"
+        self.assertEqual(clean_translation("bom dia pessoal", answer), ("good morning folks", True))
+        self.assertEqual(clean_translation("bom dia", "Tradução: bom dia"), ("bom dia", True))
+
+    def test_notes_stay_when_the_source_talks_about_notes(self):
+        answer = "check the list\nNote: bring snacks"
+        self.assertEqual(clean_translation("confere a lista\nNota: traz lanche", answer), (answer, False))
+
+    def test_quotes_around_the_whole_answer(self):
+        self.assertEqual(clean_translation("bom dia", "“good morning”"), ("good morning", True))
+        self.assertEqual(clean_translation("bom dia", "\"'good morning'\""), ("good morning", True))
+        self.assertEqual(clean_translation('"bom dia"', '"good morning"'), ('"good morning"', False))
+
+
+class ValidateTranslationTest(unittest.TestCase):
+    SOURCE = "o servidor vai reiniciar daqui a cinco minutos"
+
+    def detect(self, text):
+        return "pt" if "servidor" in text else "en"
+
+    def test_empty_answer(self):
+        with self.assertRaises(TranslationValidationError):
+            validate_translation("gg", "", "pt", "en")
+
+    def test_short_messages_may_come_back_unchanged(self):
+        validate_translation("gg wp", "gg wp", "pt", "en", self.detect)
+        validate_translation("Valorant", "Valorant", "auto", "en", self.detect)
+
+    def test_echo(self):
+        with self.assertRaises(TranslationValidationError) as raised:
+            validate_translation(self.SOURCE, "  O servidor vai REINICIAR daqui a cinco minutos ", "pt", "en")
+        self.assertEqual(raised.exception.translated_text, "  O servidor vai REINICIAR daqui a cinco minutos ")
+
+    def test_answer_still_in_the_source_language(self):
+        answer = "o servidor reinicia em cinco minutos"
+        with self.assertRaises(TranslationValidationError):
+            validate_translation(self.SOURCE, answer, "pt", "en", self.detect)
+        with self.assertRaises(TranslationValidationError):
+            validate_translation(self.SOURCE, answer, "auto", "en", self.detect)
+        # Without a detector only the echo check runs
+        validate_translation(self.SOURCE, answer, "pt", "en")
+
+    def test_good_translation(self):
+        validate_translation(self.SOURCE, "the server restarts in five minutes", "auto", "en", self.detect)
+        validate_translation(self.SOURCE, "the server restarts in five minutes", "pt", "en", lambda text: None)
+
+
+class NumberedSegmentsTest(unittest.TestCase):
+    def test_round_trip(self):
+        segments = ["bom dia", "tudo bem?", "até mais"]
+        self.assertEqual(split_numbered_segments(number_segments(segments), 3), dict(enumerate(segments)))
+
+    def test_missing_duplicate_and_out_of_range_numbers(self):
+        answer = "Sure!\n<< 2 >> how are you?\n<<2>> again\n<<4>> extra\n<<1>>   \n<<0>> zero"
+        self.assertEqual(split_numbered_segments(answer, 3), {1: "how are you?"})
+
+    def test_answer_without_numbers(self):
+        self.assertEqual(split_numbered_segments("good morning", 1), {})
+
+
+
+class SplitCandidatesTest(unittest.TestCase):
+    def test_numbered_candidates_in_order(self):
+        answer = "<<1>> good morning\n<<2>> morning!\n<< 3 >> hey, good morning"
+        self.assertEqual(split_candidates(answer), ["good morning", "morning!", "hey, good morning"])
+
+    def test_preamble_is_dropped(self):
+        self.assertEqual(split_candidates("Here are 2 options:\n<<1>> hi\n<<2>> hello"), ["hi", "hello"])
+
+    def test_empty_candidates_are_skipped(self):
+        self.assertEqual(split_candidates("<<1>>\n<<2>> hello <<3>>  "), ["hello"])
+
+    def test_answer_without_numbers_is_one_candidate(self):
+        self.assertEqual(split_candidates("good morning"), ["good morning"])
+        self.assertEqual(split_candidates("<<1>>"), ["<<1>>"])
+
+    def test_instruction_asks_for_the_count(self):
+        self.assertIn("write 3 different translations", candidate_instruction(3))
+
+
+
+class ParseFanOutAnswerTest(unittest.TestCase):
+    TARGETS = ("en", "es", "ru")
+
+    def test_json_object(self):
+        answer = '{"en": "good morning", "es": "buenos días", "ru": "доброе утро"}'
+        self.assertEqual(parse_fan_out_answer(answer, self.TARGETS),
+                         {"en": "good morning", "es": "buenos días", "ru": "доброе утро"})
+
+    def test_text_around_the_object_is_ignored(self):
+        answer = 'Sure! ```json\n{"en": "hi", "es": "hola"}\n``` Hope it helps'
+        self.assertEqual(parse_fan_out_answer(answer, self.TARGETS), {"en": "hi", "es": "hola"})
+
+    def test_missing_blank_unrequested_and_non_text_targets_are_left_out(self):
+        answer = '{"en": "hi", "es": "  ", "ru": ["привет"], "fr": "salut"}'
+        self.assertEqual(parse_fan_out_answer(answer, self.TARGETS), {"en": "hi"})
+
+    def test_answers_that_are_not_an_object(self):
+        for answer in ("hi", "} {", '{"en": "hi"', '["en"]', '{"en": "hi",}'):
+            self.assertEqual(parse_fan_out_answer(answer, self.TARGETS), {}, answer)
+
+
+if __name__ == "__main__":
+    unittest.main()
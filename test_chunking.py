@@ -0,0 +1,74 @@
+"""Sentence splitting, token budgets and chunking of long inputs
+
+Runs with the standard library only: python -m unittest test_chunking
+"""
+import random
+import unittest
+
+from chunking import chunk_budget, estimate_tokens, split_chunks, split_segments
+
+
+def reassemble(chunks, separators):
+    pieces = [chunks[0]]
+    for separator, chunk in zip(separators, chunks[1:]):
+        pieces.append(separator)
+        pieces.append(chunk)
+    return "".join(pieces)
+
+
+class SplitSegmentsTest(unittest.TestCase):
+    def test_splits_after_sentence_ends_and_line_breaks(self):
+        parts = split_segments("Oi pessoal. Tudo bem?  Bora jogar!\nValeu")
+        self.assertEqual(parts, ["Oi pessoal.", " ", "Tudo bem?", "  ", "Bora jogar!", "\n", "Valeu"])
+
+    def test_keeps_abbreviation_free_text_whole(self):
+        self.assertEqual(split_segments("bom dia"), ["bom dia"])
+
+    def test_reassembles_exactly(self):
+        text = "Primeira frase... segunda!\n\n  terceira?\tquarta"
+        self.assertEqual("".join(split_segments(text)), text)
+
+
+class ChunkBudgetTest(unittest.TestCase):
+    def test_configured_budget_is_capped_by_the_context_window(self):
+        self.assertEqual(chunk_budget({"model": "llama3-70b-8192", "chunk_tokens": 500}), 500)
+        self.assertEqual(chunk_budget({"model": "llama3-70b-8192", "chunk_tokens": 100000}), (8192 - 512) // 3)
+        self.assertEqual(chunk_budget({"model": "mixtral-8x7b-32768", "chunk_tokens": 5000}), 5000)
+        self.assertEqual(chunk_budget({"model": "llama3-70b-8192", "chunk_tokens": 1}), 64)
+
+    def test_unknown_models_get_a_small_window(self):
+        self.assertEqual(chunk_budget({"model": "something-new"}), 1500)
+
+
+class SplitChunksTest(unittest.TestCase):
+    def test_short_text_is_one_chunk(self):
+        self.assertEqual(split_chunks("bom dia", 100), (["bom dia"], []))
+
+    def test_prefers_paragraph_breaks(self):
+        first = "a" * 200
+        second = "b" * 200
+        chunks, separators = split_chunks(f"{first}\n\n{second}", 60)
+        self.assertEqual(chunks, [first, second])
+        self.assertEqual(separators, ["\n\n"])
+
+    def test_hard_splits_a_single_long_word(self):
+        word = "x" * 1000
+        chunks, separators = split_chunks(word, 50)
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        self.assertEqual(reassemble(chunks, separators), word)
+
+    def test_randomized_round_trips(self):
+        generator = random.Random(7)
+        alphabet = ["palavra", "frase.", "fim!", "ok?", "\n", "\n\n", " ", "  ", "\t", "x" * 90, "😄"]
+        for _ in range(3000):
+            text = "".join(generator.choice(alphabet) + generator.choice(" \n") for _ in range(generator.randint(1, 80)))
+            max_tokens = generator.randint(1, 60)
+            chunks, separators = split_chunks(text, max_tokens)
+            self.assertEqual(len(separators), len(chunks) - 1)
+            self.assertEqual(reassemble(chunks, separators), text)
+            for chunk in chunks:
+                self.assertLessEqual(estimate_tokens(chunk), max_tokens, (text, max_tokens))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""State machine of the endpoint circuit breaker, on a fake clock
+
+Runs with requests installed: python -m unittest test_circuit
+"""
+import unittest
+from unittest import mock
+
+import requests
+
+import circuit
+from circuit import APIError, CircuitBreaker, CircuitOpenError, EndpointHealth, is_connectivity_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class CircuitTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(circuit, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class EndpointHealthTest(CircuitTestCase):
+    def test_window_snapshot(self):
+        health = EndpointHealth(window_seconds=60)
+        self.assertEqual(health.snapshot(), (0, 0.0, 0.0))
+        health.record(True, 0.1)
+        health.record(False, 0.3)
+        health.record(True, 0.2)
+        self.assertEqual(health.snapshot(), (3, 1 / 3, 0.2))
+        self.clock.now += 61
+        health.record(True, 0.5)
+        self.assertEqual(health.snapshot(), (1, 0.0, 0.5))
+
+
+class CircuitBreakerTest(CircuitTestCase):
+    def make_breaker(self, **config):
+        breaker = CircuitBreaker("test-endpoint", dict({"consecutive_failures": 3, "open_seconds": 30,
+                                                        "max_open_seconds": 100}, **config))
+        self.transitions = []
+        breaker.listeners.append(lambda endpoint, old, new: self.transitions.append((old, new)))
+        return breaker
+
+    def open_breaker(self, breaker):
+        for _ in range(breaker.consecutive_failures):
+            breaker.allow()
+            breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        breaker = self.make_breaker()
+        breaker.record_failure(0.1)
+        breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError) as raised:
+            breaker.allow()
+        self.assertEqual(raised.exception.retry_in, 30)
+
+    def test_opens_on_error_rate(self):
+        breaker = self.make_breaker(consecutive_failures=100, min_requests=4, error_rate=0.5)
+        for ok in (True, False, True):
+            breaker.record_success(0.1) if ok else breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_single_probe_when_half_open(self):
+        breaker = self.make_breaker()
+        self.open_breaker(breaker)
+        self.clock.now += 30
+        breaker.allow()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        breaker.release_probe()
+        breaker.allow()
+
+    def test_successful_probe_closes_and_forgets_the_outage(self):
+        breaker = self.make_breaker()
+        self.open_breaker(breaker)
+        self.clock.now += 30
+        breaker.allow()
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.transitions, [("closed", "open"), ("open", "half-open"), ("half-open", "closed")])
+        self.assertEqual(len(breaker.health.outcomes), 0)
+        breaker.allow()
+
+    def test_failed_probe_doubles_the_wait_up_to_the_maximum(self):
+        breaker = self.make_breaker()
+        self.open_breaker(breaker)
+        for expected in (60, 100, 100):
+            self.clock.now += breaker.open_seconds
+            breaker.allow()
+            breaker.record_failure(0.1)
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            self.assertEqual(breaker.open_seconds, expected)
+        self.clock.now += 100
+        breaker.allow()
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.open_seconds, 30)
+
+    def test_describe(self):
+        breaker = self.make_breaker()
+        self.assertEqual(breaker.describe(), "test-endpoint: OK")
+        self.open_breaker(breaker)
+        self.assertEqual(breaker.describe(), "test-endpoint: unavailable, retrying in 30 s")
+
+
+class ConnectivityErrorTest(unittest.TestCase):
+    def test_classification(self):
+        self.assertTrue(is_connectivity_error(APIError(503, "down")))
+        self.assertTrue(is_connectivity_error(APIError(429, "slow down")))
+        self.assertFalse(is_connectivity_error(APIError(400, "bad request")))
+        self.assertTrue(is_connectivity_error(requests.ConnectionError()))
+        self.assertTrue(is_connectivity_error(requests.Timeout()))
+        self.assertTrue(is_connectivity_error(CircuitOpenError("test-endpoint", 5)))
+        self.assertFalse(is_connectivity_error(ValueError("no key")))
+
+
+if __name__ == "__main__":
+    unittest.main()
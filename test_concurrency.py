@@ -0,0 +1,103 @@
+"""Additive increase / multiplicative decrease of the adaptive concurrency limit
+
+Runs with the standard library only: python -m unittest test_concurrency
+"""
+import random
+import threading
+import time
+import unittest
+
+from concurrency import AdaptiveConcurrencyLimiter
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+    def run_round(self, limiter, latency, dropped=False):
+        """Fill the current limit, then release every slot with the same outcome"""
+        slots = int(limiter.limit)
+        for _ in range(slots):
+            limiter.acquire()
+        for _ in range(slots):
+            limiter.release(latency, dropped)
+
+    def test_grows_additively_while_saturated(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+        limits = []
+        for _ in range(6):
+            self.run_round(limiter, 0.1)
+            limits.append(limiter.limit)
+        self.assertEqual(limits, sorted(limits))
+        # At most one slot per round: only releases while half the limit is in use count
+        self.assertGreater(limiter.limit, 6)
+        self.assertLess(limiter.limit, 10)
+
+    def test_unsaturated_requests_do_not_grow_the_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        for _ in range(50):
+            limiter.acquire()
+            limiter.release(0.1)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_drop_halves_and_respects_bounds(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=2, max_limit=10)
+        limiter.acquire()
+        limiter.release(None, dropped=True)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(None, dropped=True)
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(AdaptiveConcurrencyLimiter(initial_limit=100, max_limit=10).limit, 10)
+
+    def test_latency_spike_backs_off(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.1)
+        limiter.acquire()
+        limiter.release(0.5)
+        self.assertAlmostEqual(limiter.limit, 9)
+
+    def test_cost_normalizes_long_requests(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.1)
+        limiter.acquire()
+        limiter.release(0.5, cost=5)
+        self.assertEqual(limiter.limit, 10)
+
+    def test_one_fast_outlier_does_not_make_normal_latencies_spikes(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        generator = random.Random(1)
+        for i in range(300):
+            limiter.acquire()
+            limiter.release(0.02 if i == 5 else generator.uniform(0.3, 0.7))
+        self.assertEqual(limiter.limit, 8)
+
+    def test_waiters_are_served_in_order(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        limiter.acquire()
+        order = []
+
+        def waiter(number):
+            limiter.acquire()
+            order.append(number)
+            limiter.release(0.1)
+
+        threads = []
+        for number in range(5):
+            thread = threading.Thread(target=waiter, args=(number,))
+            thread.start()
+            threads.append(thread)
+            # Make sure each waiter has taken its ticket before the next one starts
+            while limiter.next_ticket < number + 2:
+                time.sleep(0.001)
+        limiter.release(0.1)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, [0, 1, 2, 3, 4])
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Validation, in-place updates, saving and reloading of the config store
+
+Runs with the standard library only: python -m unittest test_config
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from config import ConfigStore, default_config
+
+
+class CoerceTest(unittest.TestCase):
+    def test_values_of_the_right_type_are_kept(self):
+        self.assertEqual(ConfigStore.coerce(True, False, "x"), True)
+        self.assertEqual(ConfigStore.coerce(7, 3, "x"), 7)
+        self.assertEqual(ConfigStore.coerce("b", "a", "x"), "b")
+        self.assertEqual(ConfigStore.coerce(["en"], [], "x"), ["en"])
+
+    def test_ints_are_accepted_for_floats(self):
+        value = ConfigStore.coerce(1, 0.8, "x")
+        self.assertEqual(value, 1.0)
+        self.assertIsInstance(value, float)
+
+    def test_wrong_types_fall_back_to_the_default(self):
+        with self.assertLogs("AITranslator.config", "WARNING"):
+            self.assertEqual(ConfigStore.coerce("30", 30, "api.requests_per_minute"), 30)
+        with self.assertLogs("AITranslator.config", "WARNING"):
+            self.assertEqual(ConfigStore.coerce(True, 30, "x"), 30)
+        with self.assertLogs("AITranslator.config", "WARNING"):
+            self.assertEqual(ConfigStore.coerce(1, True, "x"), True)
+        with self.assertLogs("AITranslator.config", "WARNING"):
+            self.assertEqual(ConfigStore.coerce([], {"a": 1}, "x"), {"a": 1})
+
+    def test_sections_are_merged_recursively(self):
+        default = {"enabled": True, "fuzzy": {"enabled": True, "max_entries": 20000}}
+        with self.assertLogs("AITranslator.config", "WARNING"):
+            merged = ConfigStore.coerce({"fuzzy": {"max_entries": "many"}, "extra": 1}, default, "tm")
+        self.assertEqual(merged, {"enabled": True, "fuzzy": {"enabled": True, "max_entries": 20000}, "extra": 1})
+        self.assertIsNot(merged["fuzzy"], default["fuzzy"])
+
+
+class ConfigStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "config.json")
+
+    def open_store(self):
+        store = ConfigStore(self.path)
+        self.addCleanup(store.flush)
+        self.changes = []
+        store.listeners.append(self.changes.append)
+        return store
+
+    def write_file(self, config):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+
+    def read_file(self):
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_apply_updates_sections_in_place(self):
+        store = self.open_store()
+        api = store.config["api"]
+        changes = store.apply({"api": {"model": "mixtral-8x7b-32768", "few_shot": True}, "new": {"a": 1}})
+        self.assertEqual(changes, {("api", "model"), ("new", "a")})
+        self.assertIs(store.config["api"], api)
+        self.assertEqual(api["model"], "mixtral-8x7b-32768")
+        self.assertEqual(store.apply({"api": {"model": "mixtral-8x7b-32768"}}), set())
+
+    def test_apply_replaces_values_that_are_not_sections(self):
+        store = self.open_store()
+        self.assertEqual(store.apply({"version": 2}), {("version", None)})
+        self.assertEqual(store.config["version"], 2)
+
+    def test_load_fills_in_defaults_and_drops_the_file_api_key(self):
+        self.write_file({"api": {"model": "llama3-8b-8192", "api_key": "gsk_leaked", "candidates": "3"},
+                         "custom": {"x": 1}})
+        store = self.open_store()
+        with self.assertLogs("AITranslator.config", "WARNING"):
+            store.load()
+        api = store.config["api"]
+        self.assertEqual(api["model"], "llama3-8b-8192")
+        self.assertEqual(api["candidates"], default_config()["api"]["candidates"])
+        self.assertEqual(api["api_key"], os.getenv("GROQ_API_KEY", ""))
+        self.assertEqual(store.config["custom"], {"x": 1})
+        self.assertEqual(set(store.config["speculative"]), set(default_config()["speculative"]))
+
+    def test_update_notifies_and_saves_without_the_api_key(self):
+        store = self.open_store()
+        store.config["api"]["api_key"] = "gsk_secret"
+        store.set("ui", "notification_duration", 3000)
+        self.assertEqual(self.changes, [{("ui", "notification_duration")}])
+        store.flush()
+        saved = self.read_file()
+        self.assertEqual(saved["ui"]["notification_duration"], 3000)
+        self.assertEqual(saved["api"]["api_key"], "")
+        self.assertEqual([name for name in os.listdir(os.path.dirname(self.path)) if name != "config.json"], [])
+
+    def test_first_start_writes_the_defaults(self):
+        store = self.open_store()
+        store.load()
+        store.flush()
+        self.assertEqual(self.read_file()["api"]["model"], default_config()["api"]["model"])
+
+    def test_edits_by_hand_are_picked_up(self):
+        self.write_file({"ui": {"notification_duration": 5000}})
+        store = self.open_store()
+        store.load()
+        store.check_for_external_changes()
+        self.assertEqual(self.changes, [])
+
+        self.write_file({"ui": {"notification_duration": 1234}})
+        # Make sure the modification time differs even on coarse file systems
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 5))
+        store.check_for_external_changes()
+        self.assertEqual(self.changes, [{("ui", "notification_duration")}])
+        self.assertEqual(store.config["ui"]["notification_duration"], 1234)
+
+
+if __name__ == "__main__":
+    unittest.main()
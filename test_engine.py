@@ -0,0 +1,146 @@
+"""Framing of the engine channel and the supervised worker behind EngineClient
+
+Runs with requests and langdetect installed: python -m unittest test_engine
+"""
+import os
+import threading
+import time
+import unittest
+
+import requests
+
+import engine
+from engine import Channel, EngineClient, EngineError, EngineResponse, SHARED_MEMORY_THRESHOLD
+
+
+def channel_pair():
+    """Two channels connected by a pair of pipes"""
+    a_read, b_write = os.pipe()
+    b_read, a_write = os.pipe()
+    a = Channel(os.fdopen(a_read, "rb"), os.fdopen(a_write, "wb"))
+    b = Channel(os.fdopen(b_read, "rb"), os.fdopen(b_write, "wb"))
+    return a, b
+
+
+def close_channel(channel):
+    channel.close()
+    channel.reader.close()
+    channel.writer.close()
+
+
+class ChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.a, self.b = channel_pair()
+        self.addCleanup(close_channel, self.a)
+        self.addCleanup(close_channel, self.b)
+
+    def send_in_background(self, channel, message):
+        # A frame larger than the pipe buffer only goes through while the other side reads
+        thread = threading.Thread(target=channel.send, args=(message,))
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        return thread
+
+    def test_small_messages_in_order(self):
+        self.a.send({"id": 1, "op": "ping", "kwargs": {}})
+        self.a.send({"id": 2, "text": "ção 😄"})
+        self.assertEqual(self.b.receive(), {"id": 1, "op": "ping", "kwargs": {}})
+        self.assertEqual(self.b.receive(), {"id": 2, "text": "ção 😄"})
+
+    def test_message_just_under_the_threshold_goes_through_the_pipe(self):
+        message = {"payload": b"x" * (SHARED_MEMORY_THRESHOLD - 100)}
+        self.send_in_background(self.a, message).join(5)
+        self.assertEqual(self.b.receive(), message)
+        self.assertEqual(self.a.shared_blocks, {})
+
+    def test_large_message_travels_through_shared_memory(self):
+        message = {"payload": os.urandom(SHARED_MEMORY_THRESHOLD * 2)}
+        self.a.send(message)
+        self.assertEqual(len(self.a.shared_blocks), 1)
+        self.assertEqual(self.b.receive(), message)
+        # The release comes back ahead of the next reply and frees the block
+        self.b.send({"id": 1, "result": "ok"})
+        self.assertEqual(self.a.receive(), {"id": 1, "result": "ok"})
+        self.assertEqual(self.a.shared_blocks, {})
+
+    def test_closed_or_truncated_stream_ends_the_channel(self):
+        self.a.writer.write(engine.HEADER.pack(100) + b"short")
+        self.a.writer.close()
+        self.assertIsNone(self.b.receive())
+
+
+class EngineResponseTest(unittest.TestCase):
+    def test_json_body(self):
+        response = EngineResponse({"status_code": 200, "headers": {}, "text": "", "json": {"a": 1}})
+        self.assertEqual(response.json(), {"a": 1})
+
+    def test_error_body(self):
+        response = EngineResponse({"status_code": 429, "headers": {"retry-after": "2"}, "text": "slow", "json": None})
+        self.assertEqual((response.status_code, response.text), (429, "slow"))
+        with self.assertRaises(ValueError):
+            response.json()
+
+
+class ErrorRelayTest(unittest.TestCase):
+    def test_network_errors_keep_their_type(self):
+        for error, expected in ((requests.Timeout("slow"), requests.Timeout),
+                                (requests.ConnectionError("down"), requests.ConnectionError),
+                                (KeyError("op"), EngineError)):
+            with self.assertRaises(expected):
+                engine.raise_error(*engine.describe_error(error))
+        with self.assertRaises(engine.EngineCrashedError):
+            engine.raise_error("crashed", "gone")
+
+
+class InProcessClientTest(unittest.TestCase):
+    def test_calls_run_in_process_without_a_worker(self):
+        client = EngineClient()
+        self.assertFalse(client.running)
+        self.assertEqual(client.call("ping"), "pong")
+        self.assertEqual(client.detect("Bom dia, pessoal! Tudo certo com vocês hoje?"), "pt")
+        with self.assertRaises(TypeError):
+            client.call("detect")
+
+
+class WorkerProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.client = EngineClient(call_timeout=30)
+        self.client.start()
+        self.addCleanup(self.client.stop)
+
+    def test_calls_and_errors_go_through_the_worker(self):
+        self.assertTrue(self.client.running)
+        self.assertEqual(self.client.call("ping"), "pong")
+        self.assertEqual(self.client.detect("The meeting starts in five minutes, see you there"), "en")
+        with self.assertRaises(EngineError):
+            self.client.call("detect")
+
+    def test_large_arguments_and_concurrent_calls(self):
+        text = "palavra " * (SHARED_MEMORY_THRESHOLD // 4)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.client.detect(text))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.client.channel.shared_blocks, {})
+
+    def test_crashed_worker_is_restarted(self):
+        process = self.client.process
+        process.kill()
+        deadline = time.monotonic() + 10
+        while not (self.client.restarts and self.client.running) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.client.restarts, 1)
+        self.assertIsNot(self.client.process, process)
+        self.assertEqual(self.client.call("ping"), "pong")
+
+    def test_calls_run_in_process_after_stop(self):
+        self.client.stop()
+        self.assertFalse(self.client.running)
+        self.assertEqual(self.client.call("ping"), "pong")
+
+
+if __name__ == "__main__":
+    unittest.main()
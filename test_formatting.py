@@ -0,0 +1,60 @@
+"""Protection and restoration of Discord formatting around the model
+
+Runs with the standard library only: python -m unittest test_formatting
+"""
+import random
+import unittest
+
+from formatting import has_translatable_text, placeholder, protect_formatting, restore_formatting
+
+
+class ProtectFormattingTest(unittest.TestCase):
+    def test_masks_every_kind_of_span(self):
+        text = ("**olha** isso <@123> em <#456> :smile: <:pepe:789> <t:1700000000:R> "
+                "`npm i` https://example.com/a?b=1 ||spoiler||")
+        masked, spans = protect_formatting(text)
+        self.assertEqual(spans, ["**", "**", "<@123>", "<#456>", ":smile:", "<:pepe:789>", "<t:1700000000:R>",
+                                 "`npm i`", "https://example.com/a?b=1", "||", "||"])
+        self.assertNotIn("example.com", masked)
+        self.assertIn("olha", masked)
+        self.assertIn("spoiler", masked)
+
+    def test_code_blocks_are_one_span(self):
+        text = "antes ```python\nprint('**oi**')\n``` depois"
+        masked, spans = protect_formatting(text)
+        self.assertEqual(masked, f"antes {placeholder(0)} depois")
+        self.assertEqual(spans, ["```python\nprint('**oi**')\n```"])
+
+    def test_unclosed_code_fence_is_plain_text(self):
+        text = "so ``` aberto x"
+        masked, spans = protect_formatting(text)
+        self.assertFalse(any(span.startswith("```") for span in spans))
+        self.assertEqual(restore_formatting(masked, spans), text)
+
+    def test_has_translatable_text(self):
+        self.assertFalse(has_translatable_text(protect_formatting("<@123> :smile: https://x.io")[0]))
+        self.assertTrue(has_translatable_text(protect_formatting("<@123> valeu")[0]))
+
+
+class RestoreFormattingTest(unittest.TestCase):
+    def test_round_trip(self):
+        generator = random.Random(3)
+        pieces = ["oi", " ", "**", "`code`", "<@1>", ":ok:", "https://a.b/c", "\n", "```x```", "||", "ção"]
+        for _ in range(500):
+            text = "".join(generator.choice(pieces) for _ in range(generator.randint(0, 30)))
+            masked, spans = protect_formatting(text)
+            self.assertEqual(restore_formatting(masked, spans), text)
+
+    def test_model_spacing_inside_placeholders_is_tolerated(self):
+        self.assertEqual(restore_formatting("hi ⟦ 0 ⟧", ["<@1>"]), "hi <@1>")
+
+    def test_dropped_spans_are_appended_except_markdown(self):
+        masked, spans = protect_formatting("**olha** <@123>")
+        self.assertEqual(restore_formatting("look", spans), "look <@123>")
+
+    def test_unknown_placeholder_is_left_alone(self):
+        self.assertEqual(restore_formatting(f"hi {placeholder(5)}", []), f"hi {placeholder(5)}")
+
+
+if __name__ == "__main__":
+    unittest.main()
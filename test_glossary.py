@@ -0,0 +1,78 @@
+"""Glossary term matching and the Aho-Corasick automaton behind it
+
+Runs with the standard library only: python -m unittest test_glossary
+"""
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from formatting import protect_formatting, restore_formatting
+from glossary import AhoCorasick, Glossary
+
+
+class AhoCorasickTest(unittest.TestCase):
+    def test_finds_overlapping_matches(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        found = sorted((start, end, automaton.patterns[pattern_id])
+                       for start, end, pattern_id in automaton.finditer("ushers"))
+        self.assertEqual(found, [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")])
+
+    def test_matches_naive_search(self):
+        generator = random.Random(5)
+        patterns = list({"".join(generator.choice("ab") for _ in range(generator.randint(1, 4))) for _ in range(12)})
+        automaton = AhoCorasick(patterns)
+        for _ in range(200):
+            text = "".join(generator.choice("abc") for _ in range(generator.randint(0, 40)))
+            expected = sorted(
+                (start, start + len(pattern), pattern_id)
+                for pattern_id, pattern in enumerate(patterns)
+                for start in range(len(text)) if text.startswith(pattern, start)
+            )
+            self.assertEqual(sorted(automaton.finditer(text)), expected)
+
+    def test_no_patterns(self):
+        self.assertEqual(list(AhoCorasick([]).finditer("anything")), [])
+
+
+class GlossaryTest(unittest.TestCase):
+    def make_glossary(self, **kwargs):
+        return Glossary(["Valorant", "Riot Games"],
+                        {"Spike": {"pt": "Spike", "en": "Spike"}, "plantar": {"en": "plant"}}, **kwargs)
+
+    def test_whole_words_longest_first_and_case_insensitive(self):
+        glossary = self.make_glossary()
+        text = "riot games fez o valorant; Valorants não"
+        self.assertEqual(glossary.find_terms(text), [(0, 10, "Riot Games"), (17, 25, "Valorant")])
+
+    def test_case_sensitive(self):
+        glossary = self.make_glossary(case_sensitive=True)
+        self.assertEqual(glossary.find_terms("valorant Valorant"), [(9, 17, "Valorant")])
+
+    def test_protect_uses_renderings_for_the_target_language(self):
+        glossary = self.make_glossary()
+        masked, spans = protect_formatting("**plantar** o spike no Valorant")
+        masked = glossary.protect(masked, spans, "en")
+        self.assertNotIn("plantar", masked)
+        self.assertNotIn("Valorant", masked)
+        self.assertEqual(restore_formatting(masked, spans), "**plant** o Spike no Valorant")
+
+    def test_terms_without_a_rendering_are_left_to_the_model(self):
+        glossary = self.make_glossary()
+        masked, spans = protect_formatting("plantar agora")
+        self.assertEqual(glossary.protect(masked, spans, "es"), "plantar agora")
+        self.assertEqual(spans, [])
+
+    def test_from_config_merges_the_glossary_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "glossary.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"do_not_translate": ["Discord"], "terms": {"clutch": {"pt": "clutch"}}}, f)
+            glossary = Glossary.from_config({"do_not_translate": ["Valorant"], "file": path})
+        self.assertEqual(sorted(glossary.terms), ["Discord", "Valorant", "clutch"])
+        self.assertEqual(glossary.renderings["clutch"], {"pt": "clutch"})
+
+
+if __name__ == "__main__":
+    unittest.main()
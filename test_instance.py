@@ -0,0 +1,101 @@
+"""The single-instance handshake key and command hand-off
+
+Runs with the standard library only, on Unix: python -m unittest test_instance
+"""
+import io
+import os
+import stat
+import sys
+import threading
+import tempfile
+import unittest
+from multiprocessing.connection import Client, AuthenticationError
+from unittest import mock
+
+import instance
+
+
+@unittest.skipIf(sys.platform == "win32", "uses Unix permissions and sockets")
+class InstanceTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.home = directory.name
+        socket_path = os.path.join(self.home, "instance.sock")
+        for patcher in (mock.patch.dict(os.environ, {"HOME": self.home}),
+                        mock.patch.object(instance, "address", lambda: socket_path)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class AuthkeyTest(InstanceTestCase):
+    def test_created_once_and_private(self):
+        self.assertIsNone(instance.authkey())
+        key = instance.authkey(create=True)
+        self.assertEqual(len(key), 32)
+        path = instance.secret_path()
+        self.assertTrue(path.startswith(self.home))
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode), 0o700)
+        self.assertEqual(instance.authkey(), key)
+        self.assertEqual(instance.authkey(create=True), key)
+
+    def test_key_readable_by_others_is_replaced(self):
+        key = instance.authkey(create=True)
+        os.chmod(instance.secret_path(), 0o644)
+        self.assertIsNone(instance.authkey())
+        replacement = instance.authkey(create=True)
+        self.assertNotEqual(replacement, key)
+        self.assertEqual(stat.S_IMODE(os.stat(instance.secret_path()).st_mode), 0o600)
+
+    def test_short_key_is_replaced(self):
+        os.makedirs(os.path.dirname(instance.secret_path()), mode=0o700)
+        with open(instance.secret_path(), "wb") as f:
+            f.write(b"short")
+        os.chmod(instance.secret_path(), 0o600)
+        self.assertIsNone(instance.authkey())
+        self.assertEqual(len(instance.authkey(create=True)), 32)
+
+
+class HandOffTest(InstanceTestCase):
+    def start_server(self):
+        server = instance.InstanceServer()
+        self.addCleanup(server.close)
+        return server
+
+    def test_commands_before_the_handler_are_kept(self):
+        server = self.start_server()
+        self.assertEqual(instance.forward(["--show"]), 0)
+        received = []
+        server.set_handler(received.append)
+        self.assertEqual(received, [["--show"]])
+        self.assertEqual(instance.forward(["--translate", "bom dia"]), 0)
+        self.assertEqual(received, [["--show"], ["--translate", "bom dia"]])
+
+    def test_wrong_key_is_rejected_and_the_server_keeps_serving(self):
+        server = self.start_server()
+        received = []
+        server.set_handler(received.append)
+        with self.assertRaises(AuthenticationError):
+            Client(instance.address(), authkey=b"x" * 32)
+        self.assertEqual(received, [])
+        self.assertEqual(instance.forward(["--settings"]), 0)
+        self.assertEqual(received, [["--settings"]])
+
+    def test_stale_socket_is_replaced(self):
+        with open(instance.address(), "w"):
+            pass
+        server = self.start_server()
+        received = threading.Event()
+        server.set_handler(lambda args: received.set())
+        self.assertEqual(instance.forward([]), 0)
+        self.assertTrue(received.is_set())
+
+    def test_forward_gives_up_without_a_running_instance(self):
+        with mock.patch.object(instance, "CONNECT_TIMEOUT", 0.2), mock.patch("sys.stderr", io.StringIO()) as stderr:
+            self.assertEqual(instance.forward(["--show"]), 1)
+        self.assertIn("did not respond", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
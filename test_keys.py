@@ -0,0 +1,108 @@
+"""API key loading, reset headers and the key pool's rotation and cooldowns
+
+Runs with requests installed: python -m unittest test_keys
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import keys
+from circuit import APIError
+from keys import ApiKeyPool, RateLimiter, load_api_keys, parse_reset_duration
+
+
+class ParseResetDurationTest(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_reset_duration("7"), 7.0)
+        self.assertEqual(parse_reset_duration("0.5"), 0.5)
+        self.assertAlmostEqual(parse_reset_duration("2m59.56s"), 179.56)
+        self.assertAlmostEqual(parse_reset_duration("120ms"), 0.12)
+        self.assertEqual(parse_reset_duration("1h2m3s"), 3723)
+        self.assertIsNone(parse_reset_duration(""))
+        self.assertIsNone(parse_reset_duration(None))
+        self.assertIsNone(parse_reset_duration("soon"))
+
+
+class LoadApiKeysTest(unittest.TestCase):
+    def test_environment_and_key_file_without_duplicates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            key_file = os.path.join(directory, "api_keys.txt")
+            with open(key_file, "w", encoding="utf-8") as f:
+                f.write("gsk_file1  # work account\n\n# gsk_commented\ngsk_shared\n")
+            environment = {"GROQ_API_KEYS": "gsk_env1, gsk_shared gsk_env2", "GROQ_API_KEY": "gsk_env1"}
+            with mock.patch.dict(os.environ, environment):
+                found = load_api_keys(key_file)
+        self.assertEqual(found, ["gsk_env1", "gsk_shared", "gsk_env2", "gsk_file1"])
+
+    def test_placeholder_key_is_ignored(self):
+        with mock.patch.dict(os.environ, {"GROQ_API_KEYS": "", "GROQ_API_KEY": "your_api_key_here"}):
+            self.assertEqual(load_api_keys("missing-file.txt"), [])
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_burst_up_to_capacity(self):
+        limiter = RateLimiter(requests_per_minute=3)
+        for _ in range(3):
+            limiter.wait_for_token()
+        self.assertLess(limiter.tokens, 1)
+
+
+class ApiKeyPoolTest(unittest.TestCase):
+    def make_pool(self, count=2):
+        return ApiKeyPool([f"gsk_test_{i:04d}" for i in range(count)], requests_per_minute=600)
+
+    def test_spreads_concurrent_requests(self):
+        pool = self.make_pool()
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertEqual((first.in_flight, second.in_flight), (1, 1))
+        pool.release(first, 200)
+        self.assertEqual(first.in_flight, 0)
+
+    def test_rate_limited_key_cools_down_until_reset(self):
+        pool = self.make_pool()
+        state = pool.acquire()
+        pool.release(state, 429, {"retry-after": "20"})
+        self.assertFalse(state.available(keys.time.monotonic(), 0))
+        for _ in range(3):
+            other = pool.acquire()
+            self.assertIsNot(other, state)
+            pool.release(other, 200)
+
+    def test_rejected_key_is_out_for_long(self):
+        pool = self.make_pool()
+        state = pool.acquire()
+        pool.release(state, 401)
+        self.assertGreaterEqual(state.cooldown_until - keys.time.monotonic(), ApiKeyPool.INVALID_KEY_COOLDOWN - 1)
+
+    def test_token_headroom_from_headers(self):
+        pool = self.make_pool(1)
+        state = pool.acquire()
+        pool.release(state, 200, {
+            "x-ratelimit-remaining-requests": "99",
+            "x-ratelimit-remaining-tokens": "300",
+            "x-ratelimit-reset-tokens": "30s",
+        })
+        now = keys.time.monotonic()
+        self.assertEqual(state.remaining_requests, 99)
+        self.assertTrue(state.available(now, 300))
+        self.assertFalse(state.available(now, 301))
+        self.assertTrue(state.available(now + 31, 301))
+
+    def test_all_keys_throttled_raises_429(self):
+        pool = self.make_pool()
+        for _ in range(2):
+            pool.release(pool.acquire(), 429, {"retry-after": "600"})
+        with self.assertRaises(APIError) as raised:
+            pool.acquire()
+        self.assertEqual(raised.exception.status_code, 429)
+
+    def test_no_keys(self):
+        with self.assertRaises(ValueError):
+            ApiKeyPool([]).acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Translation memory lookups and the fuzzy index behind few-shot examples
+
+Runs with the standard library only: python -m unittest test_memory
+"""
+import os
+import tempfile
+import unittest
+
+from memory import FuzzyIndex, TranslationMemory
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    def test_punctuation_case_and_emoji_do_not_matter(self):
+        index = FuzzyIndex()
+        index.add("Bom dia pessoal!", "Good morning everyone!", "pt", "en")
+        match = index.lookup("bom dia pessoal!! 😄", "pt", "en", 0.9)
+        self.assertEqual(match, (1.0, "Bom dia pessoal!", "Good morning everyone!"))
+
+    def test_similar_text_is_found_and_language_pairs_are_separate(self):
+        index = FuzzyIndex()
+        index.add("o evento de hoje começa às nove da noite", "today's event starts at nine pm", "pt", "en")
+        match = index.lookup("o evento de hoje começa às dez da noite", "pt", "en", 0.6)
+        self.assertIsNotNone(match)
+        self.assertGreater(match[0], 0.6)
+        self.assertLess(match[0], 1.0)
+        self.assertIsNone(index.lookup("o evento de hoje começa às dez da noite", "pt", "es", 0.6))
+        self.assertIsNone(index.lookup("completely unrelated sentence here", "pt", "en", 0.6))
+
+    def test_oldest_entries_are_evicted(self):
+        index = FuzzyIndex(max_entries=3)
+        for number in range(5):
+            index.add(f"mensagem número {number} do canal", f"message {number}", "pt", "en")
+        self.assertEqual(len(index), 3)
+        self.assertIsNone(index.lookup("mensagem número 0 do canal", "pt", "en", 1.0))
+        self.assertEqual(index.lookup("mensagem número 4 do canal", "pt", "en", 1.0)[2], "message 4")
+
+    def test_adding_the_same_text_replaces_it(self):
+        index = FuzzyIndex()
+        index.add("valeu galera", "thanks guys", "pt", "en")
+        index.add("Valeu, galera!", "thanks everyone", "pt", "en")
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.lookup("valeu galera", "pt", "en", 1.0)[2], "thanks everyone")
+
+    def test_text_without_words_is_ignored(self):
+        index = FuzzyIndex()
+        index.add("!!! 😄", "!!! 😄", "pt", "en")
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.lookup("...", "pt", "en", 0.0))
+
+
+class TranslationMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "memory.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open_memory(self, fuzzy=None):
+        memory = TranslationMemory(self.path, fuzzy)
+        self.addCleanup(memory.connection.close)
+        return memory
+
+    def test_exact_and_normalized_lookups(self):
+        memory = self.open_memory()
+        memory.store([("Bom dia pessoal", "Good morning everyone")], "pt", "en")
+        self.assertEqual(memory.lookup("Bom dia pessoal", "pt", "en"), "Good morning everyone")
+        self.assertEqual(memory.lookup("  bom   DIA pessoal ", "pt", "en"), "Good morning everyone")
+        self.assertIsNone(memory.lookup("Bom dia pessoal", "pt", "es"))
+        self.assertEqual((memory.segment_lookups, memory.segment_hits), (3, 2))
+        self.assertAlmostEqual(memory.hit_rate, 2 / 3)
+
+    def test_entries_persist(self):
+        self.open_memory().store([("valeu", "thanks")], "pt", "en")
+        self.assertEqual(self.open_memory().lookup("valeu", "pt", "en"), "thanks")
+
+    def test_near_duplicates_are_never_answers(self):
+        memory = self.open_memory({"enabled": True})
+        memory.store([("I will be there tomorrow with the whole team", "vou estar lá amanhã com o time todo")], "en", "pt")
+        self.assertIsNone(memory.lookup("I will not be there tomorrow with the whole team", "en", "pt"))
+
+    def test_similar_examples_once_the_index_is_built(self):
+        memory = self.open_memory({"enabled": True, "example_threshold": 0.6})
+        memory.store([("o evento começa às nove da noite", "the event starts at nine pm")], "pt", "en")
+        # The first request starts building the index in the background
+        self.assertIsNone(memory.similar_example("o evento começa às dez da noite", "pt", "en"))
+        memory.store([("o sorteio começa às dez da noite", "the raffle starts at ten pm")], "pt", "en")
+        self.assertTrue(memory.fuzzy_ready.wait(5))
+        self.assertEqual(len(memory.fuzzy_index), 2)
+        self.assertEqual(
+            memory.similar_example("o evento começa às dez da noite", "pt", "en")[1], "the event starts at nine pm"
+        )
+        self.assertEqual(memory.fuzzy_examples, 1)
+
+    def test_disabled_fuzzy_index_is_never_built(self):
+        memory = self.open_memory({"enabled": False})
+        memory.store([("o evento começa às nove da noite", "the event starts at nine pm")], "pt", "en")
+        self.assertIsNone(memory.similar_example("o evento começa às nove da noite", "pt", "en"))
+        self.assertFalse(memory.fuzzy_loading)
+        self.assertIsNone(memory.fuzzy_index)
+
+
+if __name__ == "__main__":
+    unittest.main()
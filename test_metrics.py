@@ -0,0 +1,66 @@
+"""Histogram buckets and the Prometheus exposition of the metrics registry
+
+Runs with the standard library only: python -m unittest test_metrics
+"""
+import unittest
+
+from metrics import Histogram, MetricsRegistry
+
+
+class HistogramTest(unittest.TestCase):
+    def test_bucket_bounds_contain_their_values(self):
+        for micros in list(range(0, 200)) + [1000, 12345, 999999, 10 ** 8]:
+            index = Histogram.bucket_index(micros)
+            self.assertLess(micros, Histogram.bucket_upper_bound(index))
+            if index:
+                self.assertGreaterEqual(micros, Histogram.bucket_upper_bound(index - 1))
+
+    def test_relative_error_is_bounded(self):
+        for micros in range(16, 10 ** 6, 997):
+            upper = Histogram.bucket_upper_bound(Histogram.bucket_index(micros))
+            self.assertLessEqual((upper - micros) / micros, 0.13)
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for millis in range(1, 101):
+            histogram.observe(millis / 1000)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.sum, 5.05)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.050, delta=0.007)
+        self.assertAlmostEqual(histogram.percentile(0.99), 0.099, delta=0.013)
+        self.assertEqual(Histogram().percentile(0.5), 0.0)
+
+    def test_timer_records_one_sample(self):
+        histogram = Histogram()
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.count, 1)
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_same_name_and_labels_share_a_metric(self):
+        registry = MetricsRegistry()
+        first = registry.counter("requests_total", "Requests", {"b": "2", "a": "1"})
+        second = registry.counter("requests_total", labels={"a": "1", "b": "2"})
+        self.assertIs(first, second)
+        self.assertIsNot(first, registry.counter("requests_total", labels={"a": "2"}))
+
+    def test_exposition(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests", {"result": "ok"}).inc(3)
+        registry.gauge("queue_depth", "Queued items", callback=lambda: 7)
+        registry.gauge("broken", "Raises", callback=lambda: 1 / 0)
+        registry.histogram("latency_seconds", "Latency").observe(0.002)
+        text = registry.exposition()
+
+        self.assertIn("# HELP requests_total Requests\n# TYPE requests_total counter\n", text)
+        self.assertIn('requests_total{result="ok"} 3\n', text)
+        self.assertIn("queue_depth 7\n", text)
+        self.assertIn("broken nan\n", text)
+        self.assertIn("# TYPE latency_seconds histogram\n", text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1\n', text)
+        self.assertIn("latency_seconds_count 1\n", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""The SQLite store behind the offline outbox
+
+Runs with the standard library only: python -m unittest test_outbox
+"""
+import os
+import tempfile
+import unittest
+
+from outbox import OutboxStore
+
+
+class OutboxStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "outbox.db")
+
+    def open_store(self):
+        store = OutboxStore(self.path)
+        self.addCleanup(store.connection.close)
+        return store
+
+    def test_items_come_back_oldest_first(self):
+        store = self.open_store()
+        first, _ = store.add("bom dia", "pt", "en")
+        second, _ = store.add("boa noite", "pt", "en")
+        self.assertEqual(store.pending(), [(first, "bom dia", "pt", "en"), (second, "boa noite", "pt", "en")])
+        self.assertEqual(len(store), 2)
+
+    def test_same_text_and_pair_is_stored_once(self):
+        store = self.open_store()
+        item_id, added = store.add("bom  dia\n", "pt", "en")
+        self.assertTrue(added)
+        self.assertEqual(store.add(" bom dia", "pt", "en"), (item_id, False))
+        other_id, added = store.add("bom dia", "pt", "es")
+        self.assertTrue(added)
+        self.assertNotEqual(other_id, item_id)
+        self.assertEqual(len(store), 2)
+
+    def test_attempts_and_removal(self):
+        store = self.open_store()
+        item_id, _ = store.add("bom dia", "pt", "en")
+        self.assertEqual(store.attempts(item_id), 0)
+        store.record_attempt(item_id)
+        store.record_attempt(item_id)
+        self.assertEqual(store.attempts(item_id), 2)
+        store.remove(item_id)
+        self.assertEqual(len(store), 0)
+        self.assertIsNone(store.attempts(item_id))
+
+    def test_items_survive_a_restart(self):
+        item_id, _ = self.open_store().add("bom dia", "pt", "en")
+        self.assertEqual(self.open_store().pending(), [(item_id, "bom dia", "pt", "en")])
+
+
+if __name__ == "__main__":
+    unittest.main()
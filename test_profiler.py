@@ -0,0 +1,67 @@
+"""Collapsed-stack output of the sampling profiler
+
+Runs with the standard library only: python -m unittest test_profiler
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from profiler import StackSampler, collapse_stack
+
+
+def inner_frame():
+    return sys._getframe()
+
+
+def outer_frame():
+    return inner_frame()
+
+
+class CollapseStackTest(unittest.TestCase):
+    def test_root_first_with_file_and_line(self):
+        stack = collapse_stack(outer_frame())
+        labels = stack.split(";")
+        self.assertTrue(labels[-1].startswith("inner_frame (test_profiler.py:"))
+        self.assertTrue(labels[-2].startswith("outer_frame (test_profiler.py:"))
+
+
+class StackSamplerTest(unittest.TestCase):
+    def test_samples_other_threads_and_writes_folded_file(self):
+        stop = threading.Event()
+
+        def busy_worker():
+            while not stop.is_set():
+                time.sleep(0.001)
+
+        worker = threading.Thread(target=busy_worker, name="busy worker")
+        worker.start()
+        done = threading.Event()
+        paths = []
+        with tempfile.TemporaryDirectory() as directory:
+            sampler = StackSampler(0.1, interval=0.005, output_dir=directory)
+            sampler.start(on_done=lambda path: (paths.append(path), done.set()))
+            self.assertTrue(done.wait(5))
+            stop.set()
+            worker.join()
+            sampler.thread.join()
+
+            self.assertFalse(sampler.running)
+            self.assertGreater(sampler.samples, 0)
+            self.assertEqual(paths, [sampler.path])
+            self.assertEqual(os.path.dirname(sampler.path), directory)
+            with open(sampler.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        worker_lines = [line for line in lines if line.startswith("busy_worker;")]
+        self.assertTrue(worker_lines)
+        self.assertTrue(any("busy_worker (test_profiler.py:" in line for line in worker_lines))
+        self.assertFalse(any(line.startswith("StackSampler;") for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
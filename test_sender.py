@@ -0,0 +1,287 @@
+"""Drives MessageSender's send and capture state machines with fake backends
+
+Runs on any platform with PyQt5 installed: python -m unittest test_sender
+"""
+import os
+import time
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QCoreApplication
+
+from sender import MessageSender
+
+
+class FakeInput:
+    """Focused chat input: Ctrl+A selects its text and Ctrl+C copies the selection"""
+
+    def __init__(self, clipboard, text="", selection=None):
+        self.clipboard = clipboard
+        self.text = text
+        self.selection = selection
+        self.keys = []
+        self.pasted = []
+        # Called with each key name, like a keyboard hook seeing the press
+        self.hook = None
+
+    def send(self, keys):
+        self.keys.append(keys)
+        if self.hook is not None:
+            for key in keys.split('+'):
+                self.hook(key)
+        if keys == 'ctrl+v':
+            self.pasted.append(self.clipboard.paste())
+        elif keys == 'ctrl+a':
+            self.selection = self.text
+        elif keys == 'ctrl+c' and self.selection:
+            self.clipboard.copy(self.selection)
+        elif keys == 'right':
+            self.selection = None
+
+
+class FakeClipboard:
+    """Clipboard whose copies only become visible after ack_delay seconds"""
+
+    def __init__(self, text="", ack_delay=0.0):
+        self.text = text
+        self.pending = None
+        self.ack_delay = ack_delay
+        self.copied_at = 0.0
+
+    def copy(self, text):
+        self.pending = text
+        self.copied_at = time.monotonic()
+
+    def paste(self):
+        if self.pending is not None and time.monotonic() - self.copied_at >= self.ack_delay:
+            self.text = self.pending
+            self.pending = None
+        return self.text
+
+
+class SenderTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def make_sender(self, clipboard, **input_state):
+        keys = FakeInput(clipboard, **input_state)
+        sender = MessageSender(input_backend=keys, clipboard_backend=clipboard)
+        sent = []
+        sender.message_sent.connect(sent.append)
+        return sender, keys, sent
+
+    def run_until_idle(self, sender, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while sender.busy and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.001)
+        self.assertFalse(sender.busy, "sender did not finish")
+
+
+class MessageSenderTest(SenderTestCase):
+    def test_sends_message_and_restores_clipboard(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard)
+
+        sender.enqueue("hello")
+        self.run_until_idle(sender)
+
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+v', 'enter'])
+        self.assertEqual(keys.pasted, ["hello"])
+        self.assertEqual(sent, ["hello"])
+        self.assertEqual(clipboard.paste(), "user text")
+
+    def test_queued_messages_are_sent_in_order(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard)
+
+        for text in ("one", "two", "three"):
+            sender.enqueue(text)
+        self.run_until_idle(sender)
+
+        self.assertEqual(sent, ["one", "two", "three"])
+        self.assertEqual(keys.pasted, ["one", "two", "three"])
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+v', 'enter'] * 3)
+        self.assertEqual(clipboard.paste(), "user text")
+
+    def test_waits_for_slow_clipboard_and_adapts_delay(self):
+        clipboard = FakeClipboard("user text", ack_delay=0.1)
+        sender, keys, sent = self.make_sender(clipboard)
+        fast_delay = sender.step_delay_ms()
+
+        sender.enqueue("hello")
+        self.run_until_idle(sender)
+
+        self.assertEqual(keys.pasted, ["hello"])
+        self.assertGreater(sender.step_delay_ms(), fast_delay)
+
+    def test_pastes_anyway_when_clipboard_never_confirms(self):
+        clipboard = FakeClipboard("user text", ack_delay=60)
+        sender, keys, sent = self.make_sender(clipboard)
+
+        sender.enqueue("hello")
+        self.run_until_idle(sender)
+
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+v', 'enter'])
+        self.assertEqual(sent, ["hello"])
+        self.assertGreater(sender.ack_estimate, 0.05)
+
+    def test_keeps_clipboard_the_user_changed_meanwhile(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard)
+        original_enter = sender.press_enter
+
+        def copy_then_enter():
+            clipboard.copy("copied during send")
+            original_enter()
+
+        sender.press_enter = copy_then_enter
+        sender.enqueue("hello")
+        self.run_until_idle(sender)
+
+        self.assertEqual(clipboard.paste(), "copied during send")
+
+
+class CaptureTest(SenderTestCase):
+    def capture(self, sender, **kwargs):
+        captured = []
+        sender.capture(captured.append, **kwargs)
+        self.run_until_idle(sender)
+        self.assertEqual(len(captured), 1)
+        return captured[0]
+
+    def test_captures_selection_and_restores_clipboard(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard, selection="bom dia")
+
+        self.assertEqual(self.capture(sender), "bom dia")
+        self.assertEqual(keys.keys, ['ctrl+c'])
+        self.assertEqual(clipboard.paste(), "user text")
+
+    def test_selection_matching_the_clipboard_is_captured(self):
+        clipboard = FakeClipboard("bom dia")
+        sender, keys, sent = self.make_sender(clipboard, selection="bom dia")
+
+        self.assertEqual(self.capture(sender), "bom dia")
+        self.assertEqual(clipboard.paste(), "bom dia")
+
+    def test_nothing_selected(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard)
+
+        started = time.monotonic()
+        self.assertIsNone(self.capture(sender))
+        self.assertGreaterEqual(time.monotonic() - started, sender.CAPTURE_TIMEOUT)
+        self.assertEqual(clipboard.paste(), "user text")
+
+    def test_slow_clipboard(self):
+        clipboard = FakeClipboard("user text", ack_delay=0.1)
+        sender, keys, sent = self.make_sender(clipboard, selection="bom dia")
+
+        self.assertEqual(self.capture(sender), "bom dia")
+
+    def test_select_all_puts_the_caret_back(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard, text="ainda digitando")
+
+        self.assertEqual(self.capture(sender, select_all=True), "ainda digitando")
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+c', 'right'])
+        self.assertIsNone(keys.selection)
+        self.assertEqual(clipboard.paste(), "user text")
+
+    def test_sends_and_captures_never_interleave(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard, text="bom dia", selection="bom dia")
+        captured = []
+
+        sender.enqueue("hello")
+        sender.capture(captured.append)
+        sender.enqueue("bye")
+        self.run_until_idle(sender)
+
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+v', 'enter', 'ctrl+c', 'ctrl+a', 'ctrl+v', 'enter'])
+        self.assertEqual(sent, ["hello", "bye"])
+        self.assertEqual(captured, ["bom dia"])
+        self.assertEqual(clipboard.paste(), "user text")
+
+    def test_callback_can_queue_a_send(self):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard, selection="bom dia")
+
+        sender.capture(lambda text: sender.enqueue(text.upper()))
+        self.run_until_idle(sender)
+
+        self.assertEqual(sent, ["BOM DIA"])
+        self.assertEqual(clipboard.paste(), "user text")
+
+
+class KeyPressTest(SenderTestCase):
+    def make_hooked_sender(self, **input_state):
+        clipboard = FakeClipboard("user text")
+        sender, keys, sent = self.make_sender(clipboard, **input_state)
+        self.user_keys = []
+        keys.hook = lambda key: sender.own_key_press(key) or self.user_keys.append(key)
+        return sender, keys
+
+    def capture(self, sender, **kwargs):
+        captured = []
+        sender.capture(captured.append, **kwargs)
+        self.run_until_idle(sender)
+        return captured
+
+    def test_own_keys_are_not_user_input(self):
+        sender, keys = self.make_hooked_sender(text="ainda digitando")
+
+        sender.enqueue("hello")
+        self.assertEqual(self.capture(sender, select_all=True), ["ainda digitando"])
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+v', 'enter', 'ctrl+a', 'ctrl+c', 'right'])
+        self.assertEqual(self.user_keys, [])
+        self.assertEqual(len(sender.synthetic_keys), 0)
+
+    def test_hook_may_name_the_side_of_a_modifier(self):
+        sender, keys = self.make_hooked_sender()
+        keys.hook = None
+        sender.press('ctrl+a')
+        self.assertTrue(sender.own_key_press("left ctrl"))
+        self.assertTrue(sender.own_key_press("a"))
+        self.assertFalse(sender.own_key_press("a"))
+
+    def test_key_press_during_select_all_capture_discards_it(self):
+        sender, keys = self.make_hooked_sender(text="ainda digitando")
+        own_hook = keys.hook
+
+        def user_moves_caret(key):
+            own_hook(key)
+            if key == 'c':
+                sender.own_key_press("left")
+
+        keys.hook = user_moves_caret
+        self.assertEqual(self.capture(sender, select_all=True), [None])
+        # The caret is wherever the user put it
+        self.assertEqual(keys.keys, ['ctrl+a', 'ctrl+c'])
+        self.assertEqual(len(sender.synthetic_keys), 0)
+
+    def test_key_press_does_not_cancel_a_plain_capture(self):
+        sender, keys = self.make_hooked_sender(selection="bom dia")
+        keys.hook = lambda key: sender.own_key_press("t")
+        self.assertEqual(self.capture(sender), ["bom dia"])
+
+    def test_key_press_between_captures_is_forgotten(self):
+        sender, keys = self.make_hooked_sender(text="ainda digitando")
+        self.assertFalse(sender.own_key_press("x"))
+        self.assertEqual(self.capture(sender, select_all=True), ["ainda digitando"])
+
+    def test_old_synthetic_keys_expire(self):
+        sender, keys = self.make_hooked_sender()
+        keys.hook = None
+        sender.SYNTHETIC_KEY_WINDOW = 0.0
+        sender.press('ctrl+a')
+        time.sleep(0.01)
+        self.assertFalse(sender.own_key_press("a"))
+        self.assertEqual(len(sender.synthetic_keys), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Usage ledger totals, the daily token budget and prompt overhead accounting
+
+Runs with the standard library only: python -m unittest test_usage
+"""
+import os
+import tempfile
+import unittest
+
+from usage import BudgetExceededError, TokenStats, UsageLedger
+
+
+class UsageLedgerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "usage.db")
+
+    def open_ledger(self, **config):
+        # A long flush interval keeps the background thread out of the way
+        ledger = UsageLedger(self.path, dict({"flush_seconds": 3600}, **config), user="tester")
+        self.addCleanup(ledger.connection.close)
+        self.addCleanup(ledger.close)
+        return ledger
+
+    def test_summary_groups_pending_and_flushed_usage(self):
+        ledger = self.open_ledger()
+        ledger.record("llama3-70b-8192", "pt", "en", "hotkey", {"prompt_tokens": 100, "completion_tokens": 20}, 0.4)
+        ledger.flush()
+        ledger.record("llama3-70b-8192", "pt", "en", "hotkey", {"prompt_tokens": 50, "completion_tokens": 10}, 0.2)
+        ledger.record("llama3-8b-8192", "en", "pt", None, {"prompt_tokens": 30, "completion_tokens": 5}, 0.1)
+        by_model = ledger.summary("model")
+        self.assertEqual(by_model[0][:4], ("llama3-8b-8192", 1, 30, 5))
+        self.assertEqual(by_model[1][:4], ("llama3-70b-8192", 2, 150, 30))
+        self.assertAlmostEqual(by_model[1][4], 0.3)
+        self.assertEqual([row[0] for row in ledger.summary("origin")], ["hotkey", "app"])
+        self.assertEqual(ledger.summary("user")[0][:2], ("tester", 3))
+
+    def test_totals_persist(self):
+        ledger = self.open_ledger()
+        ledger.record("llama3-70b-8192", "pt", "en", "app", {"prompt_tokens": 70, "completion_tokens": 30}, 0.1)
+        ledger.close()
+        self.assertEqual(self.open_ledger().tokens_today, 100)
+
+    def test_unknown_column_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.open_ledger().summary("prompt_tokens; DROP TABLE usage")
+
+    def test_budget_degrades_then_refuses(self):
+        ledger = self.open_ledger(daily_token_budget=1000, degrade_at=0.8, cheaper_model="llama3-8b-8192")
+        self.assertEqual(ledger.model_for("llama3-70b-8192"), "llama3-70b-8192")
+        ledger.record("llama3-70b-8192", "pt", "en", "app", {"prompt_tokens": 700, "completion_tokens": 100}, 0.1)
+        self.assertAlmostEqual(ledger.budget_used(), 0.8)
+        self.assertEqual(ledger.model_for("llama3-70b-8192"), "llama3-8b-8192")
+        ledger.record("llama3-8b-8192", "pt", "en", "app", {"prompt_tokens": 200, "completion_tokens": 0}, 0.1)
+        with self.assertRaises(BudgetExceededError):
+            ledger.model_for("llama3-70b-8192")
+
+    def test_no_budget(self):
+        ledger = self.open_ledger()
+        ledger.record("llama3-70b-8192", "pt", "en", "app", {"prompt_tokens": 10 ** 9}, 0.1)
+        self.assertEqual(ledger.budget_used(), 0.0)
+        self.assertEqual(ledger.model_for("llama3-70b-8192"), "llama3-70b-8192")
+
+
+class TokenStatsTest(unittest.TestCase):
+    def test_overhead_and_cached_tokens(self):
+        stats = TokenStats()
+        self.assertEqual(stats.overhead_ratio, 0.0)
+        stats.record(300, 100, {"prompt_tokens": 410, "completion_tokens": 90,
+                                "prompt_tokens_details": {"cached_tokens": 256}})
+        stats.record(300, 300, {"prompt_tokens": 610, "completion_tokens": 280, "prompt_tokens_details": None})
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual((stats.prompt_tokens, stats.completion_tokens, stats.cached_tokens), (1020, 370, 256))
+        self.assertAlmostEqual(stats.overhead_ratio, 0.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""Token accounting: the per-day usage ledger, its budget and prompt overhead totals"""
+import time
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger("AITranslator.usage")
+
+
+class BudgetExceededError(Exception):
+    """The daily token budget is used up; only cached translations are available"""
+
+
+class UsageLedger:
+    """Per-request token usage, aggregated by day, model, language pair and origin
+
+    record() only updates in-memory totals; a background thread adds them to
+    the SQLite ledger every flush_seconds (and flush() does so on exit), so
+    the translation path never waits for the disk. With a daily budget set,
+    model_for() switches to the cheaper model once degrade_at of the budget
+    is used and raises BudgetExceededError once all of it is.
+    """
+
+    def __init__(self, path="usage.db", config=None, user=""):
+        config = config or {}
+        self.daily_budget = config.get("daily_token_budget", 0)
+        self.degrade_at = config.get("degrade_at", 0.8)
+        self.cheaper_model = config.get("cheaper_model", "")
+        self.user = user
+        self.lock = threading.Lock()
+        # Serializes use of the connection between the flush thread and the UI
+        self.db_lock = threading.Lock()
+        # (day, model, pair, origin) -> [requests, prompt tokens, completion tokens, latency seconds]
+        self.pending = defaultdict(lambda: [0, 0, 0, 0.0])
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                day TEXT NOT NULL,
+                user TEXT NOT NULL,
+                model TEXT NOT NULL,
+                pair TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                latency_seconds REAL NOT NULL,
+                PRIMARY KEY (day, user, model, pair, origin)
+            )
+        """)
+        self.connection.commit()
+        self.day = self.today()
+        self.tokens_today = self.connection.execute(
+            "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM usage WHERE day = ?", (self.day,)
+        ).fetchone()[0]
+
+        self.stopping = threading.Event()
+        self.flusher = threading.Thread(
+            target=self.flush_loop, args=(config.get("flush_seconds", 10),), name="UsageLedger", daemon=True
+        )
+        self.flusher.start()
+
+    @staticmethod
+    def today():
+        return time.strftime("%Y-%m-%d")
+
+    def record(self, model, source_lang, target_lang, origin, usage, latency):
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        day = self.today()
+        with self.lock:
+            if day != self.day:
+                self.day = day
+                self.tokens_today = 0
+            totals = self.pending[(day, model, f"{source_lang}->{target_lang}", origin or "app")]
+            totals[0] += 1
+            totals[1] += prompt_tokens
+            totals[2] += completion_tokens
+            totals[3] += latency
+            self.tokens_today += prompt_tokens + completion_tokens
+
+    def budget_used(self):
+        """Fraction of today's token budget used, 0 without a budget"""
+        if not self.daily_budget:
+            return 0.0
+        with self.lock:
+            tokens = self.tokens_today if self.day == self.today() else 0
+        return tokens / self.daily_budget
+
+    def model_for(self, model):
+        """Model to use for the next request under the daily budget"""
+        used = self.budget_used()
+        if used >= 1:
+            raise BudgetExceededError(
+                f"Daily budget of {self.daily_budget} tokens used; only cached translations until tomorrow"
+            )
+        if used >= self.degrade_at and self.cheaper_model:
+            return self.cheaper_model
+        return model
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(lambda: [0, 0, 0, 0.0])
+        if not pending:
+            return
+        with self.db_lock, self.connection:
+            self.connection.executemany("""
+                INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (day, user, model, pair, origin) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                    completion_tokens = completion_tokens + excluded.completion_tokens,
+                    latency_seconds = latency_seconds + excluded.latency_seconds
+            """, [(day, self.user, model, pair, origin, *totals) for (day, model, pair, origin), totals in pending.items()])
+
+    def flush_loop(self, interval):
+        while not self.stopping.wait(interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error("Could not write usage ledger: %s", e)
+
+    def close(self):
+        self.stopping.set()
+        self.flush()
+
+    def summary(self, column, days=1):
+        """[(value, requests, prompt tokens, completion tokens, average latency)] grouped by a column"""
+        if column not in ("day", "user", "model", "pair", "origin"):
+            raise ValueError(f"Unknown usage column: {column}")
+        self.flush()
+        since = time.strftime("%Y-%m-%d", time.localtime(time.time() - (days - 1) * 86400))
+        with self.db_lock:
+            return self.connection.execute(f"""
+                SELECT {column}, SUM(requests), SUM(prompt_tokens), SUM(completion_tokens),
+                       SUM(latency_seconds) / MAX(SUM(requests), 1)
+                FROM usage WHERE day >= ? GROUP BY {column} ORDER BY {column} DESC
+            """, (since,)).fetchall()
+
+
+class TokenStats:
+    """Running totals of prompt overhead versus payload tokens"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prefix_tokens = 0
+        self.payload_tokens = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, prefix_tokens, payload_tokens, usage):
+        """Record one request; usage is the usage block of the API response"""
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        with self.lock:
+            self.requests += 1
+            self.prefix_tokens += prefix_tokens
+            self.payload_tokens += payload_tokens
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            self.cached_tokens += cached
+        logger.debug(
+            "Request tokens: ~%d prefix, ~%d payload, %s prompt / %s completion reported, %d cached",
+            prefix_tokens, payload_tokens, usage.get("prompt_tokens", "?"), usage.get("completion_tokens", "?"), cached
+        )
+
+    @property
+    def overhead_ratio(self):
+        """Share of estimated prompt tokens spent on the fixed prefix"""
+        total = self.prefix_tokens + self.payload_tokens
+        return self.prefix_tokens / total if total else 0.0